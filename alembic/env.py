@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel
 from alembic import context
 from app.core.config import get_settings
-from app.model import TestResult  # <-- Добавь все модели
+from app.model import TestResult, SyncRun, CollectionUnit, FailedResult, DepartmentProfile, CollectionFingerprint, ArchivedPatientIndex, TestResultStats, TestResultAnalyte  # <-- Добавь все модели
 
 
 settings = get_settings()
@@ -1,6 +1,6 @@
 from .config import get_settings
 from .logger_setup import logger
-from .dependencies import get_gateway_service, get_api_key
+from .dependencies import get_gateway_service, get_bulk_gateway_service, get_api_key
 from .client import init_gateway_client, shutdown_gateway_client
 from .exceptions import global_exception_handler
 from .scheduler import init_scheduler, shutdown_scheduler
@@ -10,6 +10,7 @@ __all__ = [
     "init_gateway_client",
     "shutdown_gateway_client",
     "get_gateway_service",
+    "get_bulk_gateway_service",
     "get_api_key",
     "logger",
     "global_exception_handler",
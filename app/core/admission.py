@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import AsyncGenerator, Callable
+
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.core.logger_setup import logger
+from app.core.metrics import ADMISSION_SERVED_TOTAL, ADMISSION_SHED_TOTAL, ADMISSION_QUEUE_WAIT, ADMISSION_IN_FLIGHT
+
+settings = get_settings()
+
+SHED_QUEUE_FULL = "queue_full"
+SHED_TIMEOUT = "timeout"
+
+
+class AdmissionController:
+    """
+    Ограничивает число одновременно обрабатываемых запросов роута.
+    - Свободный слот выдается сразу, иначе запрос ждет в очереди не дольше queue_timeout.
+    - Если очередь длиннее max_queue или слот не освободился вовремя, запрос отклоняется
+      немедленно (503 + Retry-After), а не копит бесконечный хвост до таймаута клиента.
+    """
+
+    def __init__(self, name: str, limit: int, queue_timeout: float, max_queue: int):
+        self.name = name
+        self._semaphore = asyncio.Semaphore(limit)
+        self._queue_timeout = queue_timeout
+        self._max_queue = max_queue
+        self._waiting = 0
+
+    async def acquire(self):
+        if self._semaphore.locked() and self._waiting >= self._max_queue:
+            self._shed(SHED_QUEUE_FULL)
+
+        start_time = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._shed(SHED_TIMEOUT)
+        finally:
+            self._waiting -= 1
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - start_time)
+
+        ADMISSION_SERVED_TOTAL.labels(self.name).inc()
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+
+    def release(self):
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+        self._semaphore.release()
+
+    def _shed(self, reason: str):
+        ADMISSION_SHED_TOTAL.labels(self.name, reason).inc()
+        logger.warning(f"Контроль допуска: запрос к '{self.name}' отклонен ({reason}), в очереди {self._waiting}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис перегружен, повторите запрос позже.",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+        )
+
+
+_controllers: dict[str, AdmissionController] = {}
+
+
+def _get_controller(name: str) -> AdmissionController:
+    controller = _controllers.get(name)
+    if controller is None:
+        controller = AdmissionController(
+            name,
+            limit=settings.ADMISSION_LIMITS.get(name, 10),
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+        )
+        _controllers[name] = controller
+    return controller
+
+
+def admission(name: str) -> Callable[[], AsyncGenerator]:
+    """
+    Зависимость FastAPI, которая пропускает запрос к роуту через контроль допуска:
+    dependencies=[Depends(admission("find_patient"))]
+    """
+    async def dependency() -> AsyncGenerator:
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+
+        controller = _get_controller(name)
+        await controller.acquire()
+        try:
+            yield
+        finally:
+            controller.release()
+
+    return dependency
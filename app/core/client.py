@@ -14,7 +14,10 @@ async def init_gateway_client(app: FastAPI):
     # Устанавливаем лимиты для клиента
     # max_connections: сколько всего соединений может быть в пуле
     # max_keepalive_connections: сколько из них могут быть "простаивающими" (keep-alive)
-    limits = httpx.Limits(max_connections=50, max_keepalive_connections=25)
+    limits = httpx.Limits(
+        max_connections=settings.GATEWAY_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GATEWAY_MAX_CONNECTIONS // 2
+    )
 
     gateway_client = httpx.AsyncClient(
         base_url=settings.GATEWAY_URL,
@@ -40,3 +43,17 @@ async def shutdown_gateway_client(app: FastAPI):
     if hasattr(app.state, 'gateway_client'):
         await app.state.gateway_client.aclose()
         logger.info("Gateway client closed.")
+
+
+def create_background_gateway_client() -> httpx.AsyncClient:
+    """
+    Создает отдельный HTTPX клиент для фоновых задач (синхронизация, воркеры очереди, повтор dead-letter),
+    чтобы они не занимали соединения клиента, обслуживающего API.
+    """
+    settings = get_settings()
+    return httpx.AsyncClient(
+        base_url=settings.GATEWAY_URL,
+        headers={"X-API-KEY": settings.GATEWAY_API_KEY},
+        timeout=settings.REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=10)
+    )
@@ -9,24 +9,120 @@ class Settings(BaseSettings):
     GATEWAY_REQUEST_ENDPOINT: str
     REQUEST_TIMEOUT: float
     REQUEST_PAGINATOR_LIMIT: int
+    # Идентичные одновременные запросы к шлюзу разделяют один запрос и его результат
+    GATEWAY_COALESCE_ENABLED: bool = True
+    # Пул соединений клиента API и слоты, зарезервированные под интерактивные запросы
+    # (health, debug); остальные слоты достаются массовому сбору
+    GATEWAY_MAX_CONNECTIONS: int = 50
+    GATEWAY_INTERACTIVE_SLOTS: int = 5
+    # Сколько страниц поиска запрашивать одновременно (1 - последовательная пагинация)
+    REQUEST_PREFETCH_PAGES: int = 3
+    # Планировщик многодневных окон поиска для малозагруженных отделений
+    RANGE_PLANNER_ENABLED: bool = True
+    RANGE_PLANNER_LOOKBACK_DAYS: int = 60
+    RANGE_PLANNER_MAX_DAYS: int = 31
 
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     POSTGRES_HOST: str
     POSTGRES_PORT: int
+    # Пул основного движка (запись, сбор, фоновые задачи)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # Кэш подготовленных выражений asyncpg на соединение (0 - выключен, нужно за pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Отдельный пул только для чтения (поиск пациента, отчеты); опционально - реплика
+    DB_READ_POOL_SIZE: int = 5
+    DB_READ_MAX_OVERFLOW: int = 5
+    DATABASE_REPLICA_URL: Optional[str] = None
 
     TELEGRAM_BOT_TOKEN: Optional[str] = None
     TELEGRAM_CHAT_ID: Optional[str] = None
+    # Диспетчер алертов: размер очереди, интервал дайджеста и пауза между сообщениями (сек)
+    ALERT_QUEUE_SIZE: int = 1000
+    ALERT_DIGEST_INTERVAL: float = 300.0
+    ALERT_MIN_SEND_INTERVAL: float = 3.0
+    ALERT_DIGEST_MAX_ITEMS: int = 30
 
     UPDATE_RETRY_ATTEMPTS: int = 8
 
+    # Проверка регрессии этапов синхронизации относительно медианы последних запусков
+    SYNC_REGRESSION_WINDOW: int = 14
+    SYNC_REGRESSION_FACTOR: float = 2.0
+    SYNC_REGRESSION_MIN_SECONDS: float = 5.0
+
     ALLOW_SERVICE_ROUTE: bool = False
 
     LOGS_LEVEL: str = "INFO"
     DEBUG_MODE: bool = True
+    # Доля запросов (0.0 - 1.0), для которых route_handle логирует аргументы, ответ и спаны
+    TRACE_SAMPLE_RATE: float = 0.01
+    METRICS_ENABLED: bool = True
+    # Контроль допуска к роутам чтения: не больше N одновременных запросов на роут,
+    # ожидание слота не дольше ADMISSION_QUEUE_TIMEOUT, иначе 503 с Retry-After
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: dict[str, int] = {"find_patient": 10}
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_MAX_QUEUE: int = 50
+    ADMISSION_RETRY_AFTER: int = 5
     OUTPUT_FOLDER: str
     BACKUP_HOUR: int = 20
+    # Ночной бэкап: full - полный pg_dump в daily_latest.dump, incremental - база раз в
+    # SNAPSHOT_BASE_INTERVAL_DAYS дней и дельты новых записей (OUTPUT_FOLDER/dumps/snapshots)
+    BACKUP_MODE: str = "full"
+    SNAPSHOT_BASE_INTERVAL_DAYS: int = 7
+    # pg_dump: custom - один файл, directory - каталог с параллельной выгрузкой в DUMP_JOBS потоков
+    DUMP_FORMAT: str = "custom"
+    DUMP_JOBS: int = 4
+    DUMP_COMPRESSION: int = 6
+    # Массовый импорт JSON/NDJSON: размер пакета проверки, шифрования и COPY
+    IMPORT_BATCH_SIZE: int = 5000
+    # Отделения, из результатов которых извлекаются показатели (test_result_analytes)
+    ANALYTE_PREFIXES: list[str] = ["tests"]
+    ANALYTE_BACKFILL_BATCH_SIZE: int = 500
+    # Сколько месячных секций test_results создавать заранее
+    PARTITION_MONTHS_AHEAD: int = 3
+    # Холодный архив: месяцы старше ARCHIVE_AFTER_MONTHS переносятся в parquet (OUTPUT_FOLDER/archive)
+    ARCHIVE_AFTER_MONTHS: int = 36
+
+    # Выбор лидера: только процесс-лидер запускает планировщик
+    LEADER_LOCK_KEY: int = 73100526
+    LEADER_RENEW_INTERVAL: float = 15.0
+    LEADER_NOTIFY_CHANNEL: str = "medtests_leader"
+    # Задача, время которой пришлось на паузу планировщика (процесс еще не был лидером) или
+    # занятый event loop, выполняется один раз, если опоздала не больше чем на это время
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 6 * 3600
+
+    # Режим сбора: inline - синхронизация собирает данные сама, queue - ставит единицы в очередь воркеров
+    COLLECTION_MODE: str = "inline"
+    # Конвейер сбора: число воркеров стадий, размер очередей и пакета записи в БД
+    PIPELINE_FETCH_WORKERS: int = 30
+    PIPELINE_PARSE_WORKERS: int = 2
+    PIPELINE_QUEUE_SIZE: int = 100
+    PIPELINE_BATCH_SIZE: int = 200
+    # Реестр отделений: ручные настройки имеют приоритет над подобранными автотюнером, пример:
+    # DEPARTMENT_OVERRIDES='{"tests": {"page_size": 200, "concurrency": 20, "priority": 10}}'
+    DEPARTMENT_OVERRIDES: dict[str, dict[str, int]] = {}
+    DEPARTMENT_AUTOTUNE: bool = True
+    DEPARTMENT_PAGE_SIZE_MIN: int = 50
+    DEPARTMENT_PAGE_SIZE_MAX: int = 500
+    DEPARTMENT_PAGE_LATENCY_TARGET: float = 3.0
+    DEPARTMENT_CONCURRENCY_MIN: int = 2
+    # Пропуск дней, состав которых (EvnUslugaPar_id/EvnXml_id) не изменился с прошлого сбора
+    FINGERPRINT_ENABLED: bool = True
+    QUEUE_LEASE_SECONDS: int = 600
+    QUEUE_MAX_ATTEMPTS: int = 5
+    QUEUE_RETRY_DELAY_SECONDS: int = 300
+    QUEUE_POLL_INTERVAL: float = 5.0
+    QUEUE_WAIT_TIMEOUT: int = 6 * 3600
+
+    # Повтор результатов из dead-letter таблицы failed_results
+    FAILED_RESULTS_RETRY_MINUTES: int = 30
+    FAILED_RESULTS_MAX_ATTEMPTS: int = 10
+    FAILED_RESULTS_BATCH_SIZE: int = 200
 
     ENCRYPTION_KEY: str
 
@@ -1,13 +1,78 @@
+import time
 from typing import AsyncGenerator
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import get_settings
+from app.core.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CHECKED_OUT, DB_POOL_CAPACITY
 
 settings = get_settings()
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который замеряет время ожидания свободного соединения.
+    Метрики помечаются именем пула (write / read).
+    """
+    metrics_label = "write"
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - start_time)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+def _create_engine(url: str, label: str, pool_size: int, max_overflow: int, read_only: bool = False) -> AsyncEngine:
+    connect_args = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    if read_only:
+        # Сервер сам отклонит случайную запись через пул чтения
+        connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+    new_engine.sync_engine.pool.metrics_label = label
+    DB_POOL_CAPACITY.labels(label).set(pool_size + max_overflow)
+
+    @event.listens_for(new_engine.sync_engine, "checkout")
+    def _on_checkout(*_):
+        DB_POOL_CHECKED_OUT.labels(label).inc()
+
+    @event.listens_for(new_engine.sync_engine, "checkin")
+    def _on_checkin(*_):
+        DB_POOL_CHECKED_OUT.labels(label).dec()
+
+    return new_engine
+
+
+engine = _create_engine(settings.DATABASE_URL, "write", settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+# Чтение для API идет через свой пул, поэтому массовая запись не забирает у него соединения
+read_engine = _create_engine(
+    settings.DATABASE_REPLICA_URL or settings.DATABASE_URL,
+    "read",
+    settings.DB_READ_POOL_SIZE,
+    settings.DB_READ_MAX_OVERFLOW,
+    read_only=True,
+)
 
 
 async def init_db():
@@ -17,4 +82,10 @@ async def init_db():
 
 async def get_session() -> AsyncGenerator:
     async with AsyncSession(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_session() -> AsyncGenerator:
+    """Сессия только для чтения (отдельный пул, при DATABASE_REPLICA_URL - реплика)."""
+    async with AsyncSession(read_engine) as session:
+        yield session
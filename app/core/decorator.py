@@ -1,66 +1,117 @@
 import inspect
 import json
+import time
+from datetime import date, datetime
 from functools import wraps
+from typing import Iterator
 from fastapi.responses import JSONResponse
 from fastapi import status, HTTPException
 from pydantic import BaseModel
-from fastapi.encoders import jsonable_encoder
 from app.core.logger_setup import logger
 from app.core.config import get_settings
+from app.core.metrics import ROUTE_DURATION
+from app.core.tracing import start_trace, finish_trace, trace_span
 
 settings = get_settings()
 
 
-def _truncate_for_log(data: any, max_length: int = 300) -> str:
+def _iter_log_chunks(data: any, max_length: int) -> Iterator[str]:
     """
-    Преобразует данные в строку (предпочтительно JSON) и обрезает их
-    для безопасного логирования, добавляя маркер обрезки.
+    Лениво превращает данные в JSON-подобные фрагменты строки.
+    Обход структуры прекращается, как только потребитель перестает забирать фрагменты,
+    поэтому большой ответ (например, расшифрованный HTML) не сериализуется целиком.
     """
-    try:
-        json_compatible_data = jsonable_encoder(data)
-        data_str = json.dumps(json_compatible_data, ensure_ascii=False)
+    if isinstance(data, BaseModel):
+        data = dict(data)
+
+    if isinstance(data, dict):
+        yield "{"
+        for index, (key, value) in enumerate(data.items()):
+            if index:
+                yield ", "
+            yield json.dumps(str(key), ensure_ascii=False) + ": "
+            yield from _iter_log_chunks(value, max_length)
+        yield "}"
+    elif isinstance(data, (list, tuple, set)):
+        yield "["
+        for index, value in enumerate(data):
+            if index:
+                yield ", "
+            yield from _iter_log_chunks(value, max_length)
+        yield "]"
+    elif isinstance(data, str):
+        # Длинные строки обрезаем ДО экранирования
+        yield json.dumps(data[:max_length], ensure_ascii=False)
+    elif data is None or isinstance(data, (bool, int, float)):
+        yield json.dumps(data)
+    elif isinstance(data, (date, datetime)):
+        yield f'"{data.isoformat()}"'
+    else:
+        yield f"<Объект {type(data).__name__}>"
 
-    except TypeError:
-        data_str = f"<Несериализуемый объект типа {type(data).__name__}>"
 
-    if len(data_str) > max_length:
-        return data_str[:max_length] + "... [обрезано]"
-
-    return data_str
+def _truncate_for_log(data: any, max_length: int = 300) -> str:
+    """
+    Преобразует данные в строку (в стиле JSON) и обрезает их
+    для безопасного логирования, добавляя маркер обрезки.
+    """
+    parts = []
+    length = 0
+    for chunk in _iter_log_chunks(data, max_length):
+        parts.append(chunk)
+        length += len(chunk)
+        if length > max_length:
+            return "".join(parts)[:max_length] + "... [обрезано]"
+
+    return "".join(parts)
+
+
+def _format_args(signature: inspect.Signature, args: tuple, kwargs: dict) -> dict:
+    """Сопоставляет имена аргументов роута с их значениями для лога."""
+    bound_args = signature.bind(*args, **kwargs)
+    bound_args.apply_defaults()
+
+    log_args = {}
+    for name, value in bound_args.arguments.items():
+        # Не логгируем 'self' или сложные объекты, которые не хотим видеть в логах
+        if name in ['self', 'request'] or hasattr(value, '_client'):  # Пример фильтрации сервиса
+            log_args[name] = f"<Объект {type(value).__name__}>"
+        elif isinstance(value, BaseModel):
+            log_args[name] = _truncate_for_log(value)
+        else:
+            log_args[name] = _truncate_for_log(value, max_length=100)
+    return log_args
 
 
 def route_handle(func):
     """
     Декоратор для асинхронных роутов FastAPI, который:
     1. Отлавливает и логирует все необработанные исключения.
-    2. Если включен DEBUG_MODE, логирует аргументы запроса и тело ответа.
+    2. Для доли запросов TRACE_SAMPLE_RATE логирует время по спанам; аргументы и начало ответа
+       (ФИО, даты рождения, расшифрованные результаты) - только в режиме DEBUG_MODE на уровне debug.
+    3. Замеряет длительность выполнения роута для метрик.
     """
+    route_duration = ROUTE_DURATION.labels(func.__name__)
+    # Сигнатура вычисляется один раз на роут, а не на каждый вызов
+    signature = inspect.signature(func)
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        if settings.DEBUG_MODE:
-            # Используем inspect, чтобы красиво сопоставить имена аргументов с их значениями
-            sig = inspect.signature(func)
-            bound_args = sig.bind(*args, **kwargs)
-            bound_args.apply_defaults()
-
-            log_args = {}
-            for name, value in bound_args.arguments.items():
-                # Не логгируем 'self' или сложные объекты, которые не хотим видеть в логах
-                if name in ['self', 'request'] or hasattr(value, '_client'):  # Пример фильтрации сервиса
-                    log_args[name] = f"<Объект {type(value).__name__}>"
-                elif isinstance(value, BaseModel):
-                    log_args[name] = value.model_dump()  # Для Pydantic моделей выводим dict
-                else:
-                    log_args[name] = repr(value)  # repr() безопаснее str() для логирования
-            logger.debug(f"Вызов роута '{func.__name__}'. Аргументы: {log_args}")
+        start_time = time.perf_counter()
+        trace = start_trace(func.__name__)
 
         try:
             response = await func(*args, **kwargs)
 
-            if settings.DEBUG_MODE:
-                truncated_response = _truncate_for_log(response, max_length=300)
-                logger.debug(f"Роут '{func.__name__}' завершен. Ответ: {truncated_response}")
+            if trace is not None:
+                if settings.DEBUG_MODE:
+                    with trace_span("log"):
+                        log_args = _format_args(signature, args, kwargs)
+                        truncated_response = _truncate_for_log(response, max_length=300)
+                    logger.debug(
+                        f"Роут '{func.__name__}'. Аргументы: {log_args}. Ответ: {truncated_response}"
+                    )
+                logger.info(f"Трассировка роута '{func.__name__}': {trace.summary()}")
             return response
 
         except Exception as e:
@@ -85,5 +136,9 @@ def route_handle(func):
                     }
                 },
             )
+        finally:
+            if trace is not None:
+                finish_trace()
+            route_duration.observe(time.perf_counter() - start_time)
 
     return wrapper
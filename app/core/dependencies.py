@@ -1,14 +1,15 @@
-from typing import Annotated, Optional
+from typing import Annotated, Optional, TYPE_CHECKING
 import httpx
 from fastapi import Request, Depends, HTTPException, status, Security
 from fastapi.security import APIKeyHeader
-from typing import AsyncGenerator
-from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.database import engine
-from app.service import GatewayService
+from app.core.database import get_session, get_read_session  # noqa: F401 - реэкспорт для роутов
 from app.core.config import get_settings, Settings
 
+if TYPE_CHECKING:
+    # app.service сам импортирует app.core, поэтому сервис шлюза подключается при вызове зависимости
+    from app.service import GatewayService
+
 
 async def check_permission(settings: Annotated[Settings, Depends(get_settings)]):
     """
@@ -36,15 +37,32 @@ def get_base_http_client(request: Request) -> httpx.AsyncClient:
 
 async def get_gateway_service(
         client: Annotated[httpx.AsyncClient, Depends(get_base_http_client)]
-) -> GatewayService:
+) -> "GatewayService":
     """
-    Создаёт и возвращает экземпляр сервиса для работы с API-шлюзом.
+    Создаёт и возвращает экземпляр сервиса для работы с API-шлюзом в интерактивной полосе
+    (зарезервированные слоты, не вытесняются массовым сбором).
     Args:
         client (httpx.AsyncClient): HTTP-клиент, внедрённый через зависимость.
     Returns:
         GatewayService: Сервис для взаимодействия с API-шлюзом.
     """
-    return GatewayService(client=client)
+    from app.service.gateway.gateway import GatewayService, LANE_INTERACTIVE
+    return GatewayService(client=client, lane=LANE_INTERACTIVE)
+
+
+async def get_bulk_gateway_service(
+        client: Annotated[httpx.AsyncClient, Depends(get_base_http_client)]
+) -> "GatewayService":
+    """
+    Создаёт и возвращает экземпляр сервиса для работы с API-шлюзом в полосе массового сбора.
+    Используется роутами, которые собирают данные за день/месяц.
+    Args:
+        client (httpx.AsyncClient): HTTP-клиент, внедрённый через зависимость.
+    Returns:
+        GatewayService: Сервис для взаимодействия с API-шлюзом.
+    """
+    from app.service.gateway.gateway import GatewayService, LANE_BULK
+    return GatewayService(client=client, lane=LANE_BULK)
 
 
 api_key_header_scheme = APIKeyHeader(name="X-API-KEY", auto_error=False)
@@ -77,7 +95,3 @@ async def get_api_key(
         },
     )
 
-
-async def get_session() -> AsyncGenerator:
-    async with AsyncSession(engine) as session:
-        yield session
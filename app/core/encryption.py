@@ -1,9 +1,13 @@
+import time
+
 from cryptography.fernet import Fernet, InvalidToken
 from sqlalchemy import TypeDecorator, String
 from sqlalchemy.engine import Dialect
 
 from app.core.config import get_settings
 from app.core.logger_setup import logger
+from app.core.metrics import ENCRYPTION_DURATION
+from app.core.tracing import add_span_time
 
 settings = get_settings()
 ENCRYPTION_KEY = settings.ENCRYPTION_KEY.encode()
@@ -32,7 +36,9 @@ class EncryptedString(TypeDecorator):
             return None
 
         # Преобразуем строку в байты и шифруем
+        start_time = time.perf_counter()
         encrypted_value = fernet.encrypt(value.encode('utf-8'))
+        ENCRYPTION_DURATION.labels("encrypt").observe(time.perf_counter() - start_time)
         return encrypted_value.decode('utf-8')  # Храним в БД как строку
 
     def process_result_value(self, value: str | None, dialect: Dialect) -> str | None:
@@ -43,9 +49,13 @@ class EncryptedString(TypeDecorator):
         if value is None or fernet is None:
             return None
 
+        start_time = time.perf_counter()
         try:
             # Преобразуем строку из БД в байты и расшифровываем
             decrypted_value = fernet.decrypt(value.encode('utf-8'))
+            elapsed = time.perf_counter() - start_time
+            ENCRYPTION_DURATION.labels("decrypt").observe(elapsed)
+            add_span_time("decrypt", elapsed)
             return decrypted_value.decode('utf-8')
         except InvalidToken:
             # Если в БД хранится нешифрованное или поврежденное значение
@@ -53,4 +63,18 @@ class EncryptedString(TypeDecorator):
             return value  # Возвращаем как есть
         except Exception as e:
             logger.error(f"Ошибка при расшифровке значения: {e}")
-            return None  # Возвращаем None в случае серьезной ошибки
\ No newline at end of file
+            return None  # Возвращаем None в случае серьезной ошибки
+
+class EncryptedFloat(EncryptedString):
+    """
+    Число, которое хранится в БД как зашифрованная строка (EncryptedString).
+    Сравнения и сортировки по такому столбцу в SQL невозможны - только после расшифровки.
+    """
+    cache_ok = True
+
+    def process_bind_param(self, value: float | None, dialect: Dialect) -> str | None:
+        return super().process_bind_param(None if value is None else repr(float(value)), dialect)
+
+    def process_result_value(self, value: str | None, dialect: Dialect) -> float | None:
+        decrypted_value = super().process_result_value(value, dialect)
+        return None if decrypted_value is None else float(decrypted_value)
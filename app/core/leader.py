@@ -0,0 +1,139 @@
+import asyncio
+import os
+import socket
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import get_settings
+from app.core.logger_setup import logger
+
+settings = get_settings()
+
+# Отдельный движок без пула: соединение лидера живет все время лидерства
+# и не должно занимать место в общем пуле приложения.
+leader_engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+
+
+class LeaderElector:
+    """
+    Выбор лидера среди процессов приложения через advisory lock Postgres.
+    - Лидер держит сессионную блокировку pg_try_advisory_lock на выделенном соединении.
+    - Раз в LEADER_RENEW_INTERVAL лидер проверяет, что соединение (а значит и блокировка) живо.
+      Если соединение потеряно, Postgres сам снимает блокировку, а процесс слагает полномочия.
+    - Остальные процессы с тем же интервалом пытаются захватить блокировку и подхватывают лидерство.
+    - Лидер слушает канал LISTEN/NOTIFY, через который остальные процессы передают ему команды.
+    """
+
+    def __init__(
+            self,
+            on_elected: Callable[[], Awaitable[None]],
+            on_demoted: Callable[[], Awaitable[None]],
+            on_command: Callable[[str], Awaitable[None]],
+    ):
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._on_command = on_command
+        self._conn: Optional[AsyncConnection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.is_leader:
+            await self._release()
+
+    async def leader_exists(self) -> bool:
+        """Проверяет, держит ли какой-либо процесс блокировку лидера (pg_locks)."""
+        async with leader_engine.connect() as conn:
+            return (await conn.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+                    "AND objsubid = 1 AND ((classid::bigint << 32) | objid::bigint) = :key)"
+                ),
+                {"key": settings.LEADER_LOCK_KEY}
+            )).scalar()
+
+    async def notify_leader(self, command: str):
+        """Передает команду текущему лидеру через NOTIFY."""
+        async with leader_engine.connect() as conn:
+            await conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": settings.LEADER_NOTIFY_CHANNEL, "payload": command}
+            )
+            await conn.commit()
+
+    async def _run(self):
+        while True:
+            try:
+                if self.is_leader:
+                    await self._renew()
+                else:
+                    await self._try_acquire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Лидер] Ошибка цикла выбора лидера: {e}", exc_info=True)
+
+            await asyncio.sleep(settings.LEADER_RENEW_INTERVAL)
+
+    async def _try_acquire(self):
+        conn = await leader_engine.connect()
+        try:
+            # AUTOCOMMIT, чтобы соединение лидера не висело в открытой транзакции
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": settings.LEADER_LOCK_KEY}
+            )).scalar()
+        except Exception:
+            await conn.close()
+            raise
+
+        if not acquired:
+            await conn.close()
+            return
+
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.add_listener(settings.LEADER_NOTIFY_CHANNEL, self._handle_notify)
+
+        self._conn = conn
+        logger.info(f"[Лидер] Процесс {self.node_id} стал лидером.")
+        await self._on_elected()
+
+    async def _renew(self):
+        try:
+            await self._conn.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning(f"[Лидер] Соединение лидера потеряно ({e}). Слагаю полномочия.")
+            await self._release()
+
+    async def _release(self):
+        conn, self._conn = self._conn, None
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": settings.LEADER_LOCK_KEY})
+        except Exception:
+            # Соединение уже мертво - блокировка снята вместе с ним
+            pass
+        try:
+            await conn.close()
+        except Exception:
+            pass
+        logger.info(f"[Лидер] Процесс {self.node_id} больше не лидер.")
+        await self._on_demoted()
+
+    def _handle_notify(self, _connection, _pid, _channel, payload: str):
+        asyncio.create_task(self._on_command(payload))
@@ -0,0 +1,145 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Бакеты для быстрых операций (шифрование, парсинг, ожидание пула)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Бакеты для сетевых и пакетных операций
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# --- Шлюз ---
+GATEWAY_REQUEST_DURATION = Histogram(
+    "gateway_request_duration_seconds",
+    "Длительность запросов к API-шлюзу",
+    ["c", "m"],
+    buckets=SLOW_BUCKETS,
+)
+GATEWAY_RESPONSES_TOTAL = Counter(
+    "gateway_responses_total",
+    "Ответы API-шлюза по HTTP-статусам",
+    ["c", "m", "status"],
+)
+GATEWAY_ERRORS_TOTAL = Counter(
+    "gateway_errors_total",
+    "Ошибки при обращении к API-шлюзу",
+    ["c", "m", "error"],
+)
+GATEWAY_LANE_WAIT = Histogram(
+    "gateway_lane_wait_seconds",
+    "Ожидание свободного слота в полосе приоритета шлюза",
+    ["lane"],
+    buckets=SLOW_BUCKETS,
+)
+GATEWAY_LANE_QUEUED = Gauge(
+    "gateway_lane_queued",
+    "Запросы, ожидающие слота в полосе приоритета шлюза",
+    ["lane"],
+)
+GATEWAY_LANE_IN_FLIGHT = Gauge(
+    "gateway_lane_in_flight",
+    "Запросы к шлюзу, выполняющиеся в полосе приоритета",
+    ["lane"],
+)
+GATEWAY_COALESCED_TOTAL = Counter(
+    "gateway_coalesced_total",
+    "Вызовы, присоединившиеся к уже выполняющемуся идентичному запросу к шлюзу",
+    ["c", "m"],
+)
+
+# --- Сбор результатов ---
+FETCH_SEMAPHORE_WAIT = Histogram(
+    "collector_fetch_semaphore_wait_seconds",
+    "Время ожидания слота семафора при получении результатов",
+    buckets=SLOW_BUCKETS,
+)
+FETCH_IN_FLIGHT = Gauge(
+    "collector_fetch_in_flight",
+    "Количество результатов, получаемых в данный момент",
+)
+PIPELINE_QUEUE_SIZE = Gauge(
+    "collector_pipeline_queue_size",
+    "Заполненность очередей конвейера сбора по стадиям",
+    ["stage"],
+)
+HTML_PARSE_DURATION = Histogram(
+    "collector_html_parse_duration_seconds",
+    "Длительность очистки HTML результата исследования",
+    buckets=FAST_BUCKETS,
+)
+
+# --- Шифрование ---
+ENCRYPTION_DURATION = Histogram(
+    "encryption_duration_seconds",
+    "Длительность шифрования/расшифровки значений EncryptedString",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+
+# --- База данных ---
+DB_BATCH_DURATION = Histogram(
+    "db_batch_insert_duration_seconds",
+    "Длительность вставки одного пакета в process_and_save_in_batches",
+    buckets=SLOW_BUCKETS,
+)
+DB_BATCH_ROWS_TOTAL = Counter(
+    "db_batch_rows_total",
+    "Записи, прошедшие через пакетную вставку",
+    ["outcome"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время ожидания свободного соединения в пуле БД",
+    ["pool"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Количество соединений, выданных из пула БД",
+    ["pool"],
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "Максимум соединений пула БД (pool_size + max_overflow), для расчета загрузки",
+    ["pool"],
+)
+
+# --- Уведомления ---
+ALERTS_QUEUED_TOTAL = Counter(
+    "alerts_queued_total",
+    "Алерты о пустых результатах, поставленные в очередь диспетчера",
+)
+ALERTS_DROPPED_TOTAL = Counter(
+    "alerts_dropped_total",
+    "Алерты, отброшенные из-за переполнения очереди диспетчера",
+)
+ALERT_MESSAGES_SENT_TOTAL = Counter(
+    "alert_messages_sent_total",
+    "Сообщения-дайджесты, отправленные в Telegram",
+)
+
+# --- Роуты ---
+ADMISSION_SERVED_TOTAL = Counter(
+    "admission_served_total",
+    "Запросы, допущенные контролем допуска к обработке",
+    ["route"],
+)
+ADMISSION_SHED_TOTAL = Counter(
+    "admission_shed_total",
+    "Запросы, отклоненные контролем допуска с ответом 503",
+    ["route", "reason"],
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Ожидание слота контроля допуска",
+    ["route"],
+    buckets=FAST_BUCKETS,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Запросы, обрабатываемые роутом под контролем допуска",
+    ["route"],
+)
+ROUTE_DURATION = Histogram(
+    "route_duration_seconds",
+    "Длительность обработки роутов, обернутых route_handle",
+    ["route"],
+    buckets=SLOW_BUCKETS,
+)
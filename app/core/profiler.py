@@ -0,0 +1,66 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class SyncProfile:
+    """
+    Профиль одного запуска синхронизации: время по этапам и счетчики.
+    Время этапов накапливается, поэтому для этапов, выполняемых конкурентно
+    (например, html_parse внутри result_fetch), сумма может превышать общее время.
+    """
+    stages: dict[str, float] = field(default_factory=dict)
+    gateway_requests: int = 0
+    gateway_retries: int = 0
+    empty_results: int = 0
+    records_inserted: int = 0
+    bytes_stored: int = 0
+
+    def add_stage_time(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def rounded_stages(self) -> dict[str, float]:
+        return {stage: round(seconds, 3) for stage, seconds in self.stages.items()}
+
+
+_current_profile: ContextVar[Optional[SyncProfile]] = ContextVar("sync_profile", default=None)
+
+
+def current_profile() -> Optional[SyncProfile]:
+    """Возвращает профиль активной синхронизации или None, если код выполняется вне нее."""
+    return _current_profile.get()
+
+
+@contextmanager
+def activate_profile(profile: SyncProfile):
+    """Делает профиль активным для текущего контекста (и порожденных из него задач asyncio)."""
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def profile_stage(stage: str):
+    """Замеряет время блока и добавляет его к этапу активного профиля."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage_time(stage, time.perf_counter() - start_time)
+
+
+def profile_count(counter: str, value: int = 1):
+    """Увеличивает счетчик активного профиля (gateway_requests, empty_results и т.д.)."""
+    profile = _current_profile.get()
+    if profile is not None:
+        setattr(profile, counter, getattr(profile, counter) + value)
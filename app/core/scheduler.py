@@ -1,42 +1,134 @@
+import datetime
+from typing import Optional
+
 from fastapi import FastAPI
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from app.core.logger_setup import logger
-from app.service.scheduler.sync_database import sync_database
+from app.core.leader import LeaderElector
 from app.core.config import get_settings
 
 settings = get_settings()
 
+FORCE_UPDATE_COMMAND = "force-update"
+
+
 async def init_scheduler(app: FastAPI):
     """
-    Инициализирует планировщик, сохраняет его в state приложения и запускает.
+    Инициализирует планировщик, сохраняет его в state приложения и запускает на паузе.
+    Задачи начинают выполняться, только когда процесс становится лидером.
     """
-    scheduler = AsyncIOScheduler()
+    # Задачи импортируются здесь, а не на уровне модуля: app.core не должен тянуть сервисный слой,
+    # иначе запуск модулей app.service через python -m упирается в циклический импорт
+    from app.service.scheduler.coordinator import sync_coordinator
+    from app.service.scheduler.retry_failed import retry_failed_results_job
+    from app.service.dbase.partitions import ensure_partitions_job
+    from app.service.dbase.archive import archive_old_results_job
+
+    # Планировщик стартует на паузе, а event loop бывает занят разбором HTML: без запаса на опоздание
+    # (по умолчанию 1 с) процесс, ставший лидером после 20:00, пропустил бы ночную синхронизацию
+    scheduler = AsyncIOScheduler(job_defaults={
+        "coalesce": True,
+        "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+    })
 
     # --- ЗАДАЧА 1: Подготовка для Force-Update ---
     # Сохраняем в state, чтобы роут /service/force-update мог
-    # достать планировщик и добавить задачу "прямо сейчас".
+    # достать планировщик и запросить синхронизацию "прямо сейчас".
     app.state.scheduler = scheduler
 
     # --- ЗАДАЧА 2: Регистрация Daily-Update ---
     # Запускаем каждый день в settings.BACKUP_HOUR:00 по МСК.
     # timezone='Europe/Moscow' позволяет игнорировать время контейнера (UTC).
+    # Запуск идет через координатор: если синхронизация уже идет, запрос сольется с ней.
     scheduler.add_job(
-        sync_database,
+        sync_coordinator.request_sync,
         CronTrigger(hour=settings.BACKUP_HOUR, minute=0, timezone='Europe/Moscow'),
-        args=[scheduler, 0],  # Передаем сам scheduler и счетчик попыток (0)
+        args=[scheduler, "scheduled"],  # Передаем сам scheduler и источник запуска
         id="daily_sync_task",
         replace_existing=True
     )
 
-    scheduler.start()
-    logger.info(f"Scheduler запущен. Ежедневная задача по сбору данных ({settings.BACKUP_HOUR}:00 MSK) запланирована.")
+    # --- ЗАДАЧА 3: Повтор результатов из dead-letter таблицы ---
+    scheduler.add_job(
+        retry_failed_results_job,
+        IntervalTrigger(minutes=settings.FAILED_RESULTS_RETRY_MINUTES),
+        id="retry_failed_results",
+        replace_existing=True
+    )
+
+    # --- ЗАДАЧА 3.1: Секции test_results на следующие месяцы ---
+    scheduler.add_job(
+        ensure_partitions_job,
+        CronTrigger(hour=3, minute=0, timezone='Europe/Moscow'),
+        id="ensure_partitions",
+        replace_existing=True
+    )
+
+    # --- ЗАДАЧА 3.2: Перенос старых месяцев в холодный архив (раз в месяц) ---
+    scheduler.add_job(
+        archive_old_results_job,
+        CronTrigger(day=1, hour=4, minute=0, timezone='Europe/Moscow'),
+        id="archive_old_results",
+        replace_existing=True
+    )
+
+    scheduler.start(paused=True)
+
+    # --- ЗАДАЧА 4: Выбор лидера ---
+    # При нескольких воркерах/репликах задачи выполняет только процесс, держащий advisory lock.
+    async def on_elected():
+        scheduler.resume()
+        logger.info(f"Scheduler активен. Ежедневная задача по сбору данных ({settings.BACKUP_HOUR}:00 MSK) запланирована.")
+        # Повторы через 30 минут живут в памяти прежнего лидера: восстанавливаем их по sync_runs
+        await sync_coordinator.resume_failed_sync(scheduler)
+
+    async def on_demoted():
+        scheduler.pause()
+        logger.info("Scheduler приостановлен: процесс больше не лидер.")
+
+    async def on_command(command: str):
+        name, _, argument = command.partition(":")
+        if name == FORCE_UPDATE_COMMAND:
+            logger.info("[Лидер] Получен запрос force-update от другого процесса.")
+            date_from = datetime.date.fromisoformat(argument) if argument else None
+            await sync_coordinator.request_sync(scheduler, "manual", date_from)
+
+    elector = LeaderElector(on_elected=on_elected, on_demoted=on_demoted, on_command=on_command)
+    app.state.leader_elector = elector
+    elector.start()
+    logger.info(f"Scheduler создан. Процесс {elector.node_id} ожидает выбора лидера.")
+
+
+async def request_force_update(app: FastAPI, date_from: Optional[datetime.date] = None) -> str:
+    """
+    Запускает синхронизацию немедленно: на лидере - через координатор, на остальных процессах -
+    пересылает команду лидеру через NOTIFY.
+    Возвращает "started", "merged" (уже идет синхронизация, запрос добавлен к следующему запуску),
+    "forwarded" или "no_leader" (блокировку лидера никто не держит, команду некому принять).
+    """
+    from app.service.scheduler.coordinator import sync_coordinator
+
+    elector: LeaderElector = app.state.leader_elector
+    if elector.is_leader:
+        return await sync_coordinator.request_sync(app.state.scheduler, "manual", date_from)
+
+    if not await elector.leader_exists():
+        logger.warning("Force-update: лидер не выбран, команда не отправлена.")
+        return "no_leader"
+
+    argument = date_from.isoformat() if date_from else ""
+    await elector.notify_leader(f"{FORCE_UPDATE_COMMAND}:{argument}")
+    return "forwarded"
 
 
 async def shutdown_scheduler(app: FastAPI):
     """
-    Корректно останавливает планировщик при выключении приложения.
+    Корректно останавливает планировщик и освобождает лидерство при выключении приложения.
     """
+    if hasattr(app.state, "leader_elector"):
+        await app.state.leader_elector.stop()
     if hasattr(app.state, "scheduler"):
         app.state.scheduler.shutdown()
-        logger.info("Scheduler остановлен.")
\ No newline at end of file
+        logger.info("Scheduler остановлен.")
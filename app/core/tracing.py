@@ -0,0 +1,70 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class RequestTrace:
+    """
+    Трассировка одного запроса: накопленное время по спанам (db, decrypt, serialize...).
+    Спаны могут быть вложенными, например decrypt выполняется внутри db.
+    """
+    route: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: dict[str, float] = field(default_factory=dict)
+
+    def add_span_time(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def summary(self) -> str:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        spans = " ".join(f"{name}={seconds * 1000:.1f}мс" for name, seconds in self.spans.items())
+        return f"{total_ms:.1f}мс" + (f" [{spans}]" if spans else "")
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def start_trace(route: str) -> Optional[RequestTrace]:
+    """
+    Решает, трассировать ли запрос, с вероятностью TRACE_SAMPLE_RATE.
+    Возвращает активную трассировку или None, если запрос не попал в выборку.
+    """
+    if settings.TRACE_SAMPLE_RATE <= 0 or random.random() >= settings.TRACE_SAMPLE_RATE:
+        return None
+    trace = RequestTrace(route=route)
+    _current_trace.set(trace)
+    return trace
+
+
+def finish_trace():
+    _current_trace.set(None)
+
+
+@contextmanager
+def trace_span(name: str):
+    """Замеряет время блока в рамках активной трассировки. Без трассировки ничего не делает."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span_time(name, time.perf_counter() - start_time)
+
+
+def add_span_time(name: str, seconds: float):
+    """Добавляет уже измеренное время к спану активной трассировки."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span_time(name, seconds)
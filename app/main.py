@@ -12,7 +12,8 @@ from app.core import (
     get_settings,
     logger
 )
-from app.route import health_router, collector_router, debug_router, service_router
+from app.service.utils.telegram import alert_dispatcher
+from app.route import health_router, collector_router, debug_router, service_router, metrics_router
 
 settings = get_settings()
 tags_metadata = []
@@ -25,6 +26,7 @@ async def lifespan(app: FastAPI):
     await init_scheduler(app)
     yield
     await shutdown_scheduler(app)
+    await alert_dispatcher.shutdown()
     await shutdown_gateway_client(app)
 
 
@@ -57,6 +59,9 @@ app.include_router(health_router)
 app.include_router(collector_router)
 app.include_router(service_router)
 
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router)
+
 if settings.DEBUG_MODE:
     logger.debug("ВКЛЮЧЕН РЕЖИМ ОТКЛАДКИ!")
     app.include_router(debug_router)
@@ -1,15 +1,33 @@
-from .route import GatewayRequest, RequestPeriod, RequestByMonth, RequestByDay, RequestByPatient
-from .dbase import TestResult, TestResultCreate, TestResultRead
+from .route import GatewayRequest, RequestPeriod, RequestByMonth, RequestByDay, RequestByPatient, RequestPatientTrends
+from .dbase import TestResult, TestResultBase, TestResultCreate, TestResultRead
 from .response import TestResultResponse
+from .sync_run import SyncRun
+from .work_queue import CollectionUnit
+from .dead_letter import FailedResult
+from .department_profile import DepartmentProfile
+from .fingerprint import CollectionFingerprint
+from .archive import ArchivedPatientIndex
+from .stats import TestResultStats
+from .analyte import TestResultAnalyte
 
 __all__ = [
     "GatewayRequest",
     "RequestPeriod",
     "TestResult",
+    "TestResultBase",
     "TestResultCreate",
     "TestResultRead",
     "RequestByMonth",
     "RequestByDay",
     "RequestByPatient",
-    "TestResultResponse"
+    "RequestPatientTrends",
+    "TestResultResponse",
+    "SyncRun",
+    "CollectionUnit",
+    "FailedResult",
+    "DepartmentProfile",
+    "CollectionFingerprint",
+    "ArchivedPatientIndex",
+    "TestResultStats",
+    "TestResultAnalyte"
 ]
@@ -0,0 +1,34 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Integer
+from sqlalchemy.schema import UniqueConstraint, Index
+from app.core.encryption import EncryptedString, EncryptedFloat
+
+
+class TestResultAnalyte(SQLModel, table=True):
+    """
+    Показатели лабораторных результатов, извлеченные из HTML test_results (одна строка таблицы бланка).
+    Связь с test_results по (result_id, test_date) без внешнего ключа: секционированная таблица
+    не может быть целью FK по одному id. Название, значения, единицы и норма шифруются, как
+    test_name и test_result: по result_id строка связывается с пациентом. Динамика читается по ключу
+    пациента, поэтому фильтр по показателю и сортировка выполняются после расшифровки.
+    """
+    __tablename__ = "test_result_analytes"  # noqa
+    id: Optional[int] = Field(default=None, primary_key=True)
+    result_id: int = Field(sa_column=Column(Integer, nullable=False))
+    test_date: datetime.date
+    position: int  # номер строки в бланке, вместе с result_id делает повторное извлечение безопасным
+    analyte: str = Field(sa_column=Column(EncryptedString, nullable=False))
+    value: Optional[float] = Field(default=None, sa_column=Column(EncryptedFloat))
+    value_text: Optional[str] = Field(default=None, sa_column=Column(EncryptedString))
+    unit: Optional[str] = Field(default=None, sa_column=Column(EncryptedString))
+    reference: Optional[str] = Field(default=None, sa_column=Column(EncryptedString))
+    ref_low: Optional[float] = Field(default=None, sa_column=Column(EncryptedFloat))
+    ref_high: Optional[float] = Field(default=None, sa_column=Column(EncryptedFloat))
+
+    __table_args__ = (
+        UniqueConstraint('result_id', 'test_date', 'position', name='uq_test_result_analytes_position'),
+        Index('ix_test_result_analytes_test_date', 'test_date'),
+    )
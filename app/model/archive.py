@@ -0,0 +1,31 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, DateTime, func
+from sqlalchemy.schema import Index
+
+
+class ArchivedPatientIndex(SQLModel, table=True):
+    """
+    Индекс холодного архива: в каком parquet-файле (один файл на месяц) есть записи пациента.
+    Позволяет читать только нужные файлы архива при поиске по полной истории.
+    """
+    __tablename__ = "archive_patient_index"  # noqa
+    id: Optional[int] = Field(default=None, primary_key=True)
+    last_name: str
+    first_name: str
+    middle_name: str = Field(default="")
+    birthday: datetime.date
+    month: datetime.date  # первое число архивного месяца
+    file_name: str
+    records: int = Field(default=0)
+    created_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+
+    __table_args__ = (
+        Index('ix_archive_patient_index_patient', 'last_name', 'first_name', 'middle_name', 'birthday'),
+        Index('ix_archive_patient_index_month', 'month'),
+    )
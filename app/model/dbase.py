@@ -25,10 +25,15 @@ class TestResultBase(SQLModel):
 
 
 class TestResult(TestResultBase, table=True):
+    """
+    Таблица секционирована по месяцам test_date (RANGE), поэтому test_date входит в первичный ключ
+    и во все уникальные ограничения. Секции создает app.service.dbase.partitions.
+    """
     __tablename__ = "test_results"  # noqa
     test_name: str = Field(sa_column=Column(EncryptedString))
     test_result: Optional[str] = Field(default=None, sa_column=Column(EncryptedString))
-    id: Optional[int] = Field(default=None, primary_key=True, index=True)
+    id: Optional[int] = Field(default=None, primary_key=True, index=True, sa_column_kwargs={"autoincrement": True})
+    test_date: datetime.date = Field(primary_key=True)
     created_at: Optional[datetime.datetime] = Field(
         default=None,
         sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -54,6 +59,7 @@ class TestResult(TestResultBase, table=True):
             'middle_name',
             'birthday'
         ),
+        {"postgresql_partition_by": "RANGE (test_date)"},
     )
 
 
@@ -0,0 +1,36 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, DateTime, Text, func
+from sqlalchemy.schema import UniqueConstraint
+from app.core.encryption import EncryptedString
+
+
+class FailedResult(SQLModel, table=True):
+    """
+    Dead-letter запись: исследование, результат которого не удалось получить при сборе.
+    payload - подготовленная запись (после sanitize_data) в JSON, хранится зашифрованной.
+    Статусы: pending (ждет повтора) и dead (попытки исчерпаны).
+    """
+    __tablename__ = "failed_results"  # noqa
+    id: Optional[int] = Field(default=None, primary_key=True)
+    result_id: str  # EvnXml_id
+    prefix: Optional[str] = None
+    test_date: Optional[datetime.date] = None
+    payload: str = Field(sa_column=Column(EncryptedString, nullable=False))
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    attempts: int = Field(default=1)
+    status: str = Field(default="pending", index=True)
+    created_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+    updated_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+
+    __table_args__ = (
+        UniqueConstraint('result_id', name='uq_failed_result_id'),
+    )
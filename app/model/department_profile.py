@@ -0,0 +1,25 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, DateTime, func
+
+
+class DepartmentProfile(SQLModel, table=True):
+    """
+    Параметры сбора для отделения, подобранные автотюнером по прошлым запускам.
+    page_size - размер страницы поиска, concurrency - сколько результатов отделения
+    запрашивается одновременно, priority - чем больше, тем раньше отделение в очереди сбора.
+    """
+    __tablename__ = "department_profiles"  # noqa
+    prefix: str = Field(primary_key=True)
+    page_size: int
+    concurrency: int
+    priority: int = Field(default=0)
+    # Наблюдения последнего запуска (скользящее среднее)
+    page_latency: Optional[float] = None  # среднее время страницы поиска, сек
+    records_per_run: Optional[float] = None
+    updated_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
@@ -0,0 +1,22 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, DateTime, func
+
+
+class CollectionFingerprint(SQLModel, table=True):
+    """
+    Отпечаток состава данных одного дня одного отделения: sha256 по отсортированным парам
+    EvnUslugaPar_id/EvnXml_id со страниц поиска. Совпадение отпечатка при следующем сборе
+    означает, что результаты за день можно не запрашивать повторно.
+    """
+    __tablename__ = "collection_fingerprints"  # noqa
+    day: datetime.date = Field(primary_key=True)
+    prefix: str = Field(primary_key=True)
+    fingerprint: str
+    records: int = Field(default=0)
+    updated_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
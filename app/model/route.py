@@ -69,6 +69,7 @@ class RequestByPatient(BaseModel):
     first_name: str = Field(..., description="Имя", examples=["Надежда"])
     middle_name: str | None = Field(default=None, description="Отчество (необязательно)", examples=["Олеговна"])
     birthday: str = Field(..., description="Дата рождения в формате ДД.ММ.ГГГГ", examples=["15.03.1967"])
+    full_history: bool = Field(default=False, description="Искать также в холодном архиве (старые результаты)")
 
     @field_validator('birthday') # noqa
     @staticmethod
@@ -78,3 +79,10 @@ class RequestByPatient(BaseModel):
         except ValueError:
             raise ValueError("Неверный формат даты. Ожидается ДД.ММ.ГГГГ")
         return v
+
+
+class RequestPatientTrends(RequestByPatient):
+    """Модель запроса динамики показателей пациента (холодный архив не учитывается)."""
+    analyte: Optional[str] = Field(default=None, description="Показатель (без учета регистра); все, если не указан",
+                                   examples=["Гемоглобин"])
+    months: int = Field(default=12, ge=1, le=120, description="За сколько последних месяцев", examples=[12])
@@ -0,0 +1,18 @@
+import datetime
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, BigInteger
+
+
+class TestResultStats(SQLModel, table=True):
+    """
+    Сводка по test_results: число записей и объем хранимого test_result (шифротекст, байты)
+    по дню, отделению и наличию результата. Обновляется в той же транзакции, что и вставка,
+    поэтому отчеты не сканируют основную таблицу. Пустой префикс хранится как "".
+    """
+    __tablename__ = "test_results_stats"  # noqa
+    test_date: datetime.date = Field(primary_key=True)
+    prefix: str = Field(default="", primary_key=True)
+    is_result: bool = Field(primary_key=True)
+    records: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    bytes: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
@@ -0,0 +1,33 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, DateTime, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class SyncRun(SQLModel, table=True):
+    """Профиль одного запуска синхронизации базы (плановой, ручной или повторной)."""
+    __tablename__ = "sync_runs"  # noqa
+    id: Optional[int] = Field(default=None, primary_key=True)
+    trigger: str  # scheduled / manual
+    status: str  # success / error
+    retry_count: int = Field(default=0)
+    date_from: Optional[datetime.date] = None
+    date_to: Optional[datetime.date] = None
+    started_at: datetime.datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False, index=True))
+    finished_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+    duration: float = Field(default=0.0)
+    # Время по этапам в секундах: {"search_pagination": 1.2, "result_fetch": 30.5, ...}
+    stages: dict = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False, server_default="{}"))
+    gateway_requests: int = Field(default=0)
+    gateway_retries: int = Field(default=0)
+    empty_results: int = Field(default=0)
+    records_inserted: int = Field(default=0)
+    bytes_stored: int = Field(default=0)
+    # Этапы, время которых резко выросло относительно медианы предыдущих запусков
+    regressions: list = Field(default_factory=list, sa_column=Column(JSONB, nullable=False, server_default="[]"))
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
@@ -0,0 +1,38 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, DateTime, Text, func
+from sqlalchemy.schema import UniqueConstraint, Index
+
+
+class CollectionUnit(SQLModel, table=True):
+    """
+    Единица работы очереди сбора: один день одного отделения.
+    Статусы: pending -> running -> done, либо dead после исчерпания попыток.
+    """
+    __tablename__ = "collection_units"  # noqa
+    id: Optional[int] = Field(default=None, primary_key=True)
+    day: datetime.date
+    prefix: str
+    status: str = Field(default="pending")
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    # Для running - до какого момента воркер держит единицу, для pending - не раньше какого момента ее брать
+    lease_until: Optional[datetime.datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    worker_id: Optional[str] = None
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+    updated_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+
+    __table_args__ = (
+        UniqueConstraint('day', 'prefix', name='uq_collection_unit'),
+        # Индекс для быстрого поиска свободных единиц
+        Index('ix_collection_units_claim', 'status', 'day'),
+    )
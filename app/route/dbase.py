@@ -2,10 +2,12 @@ from typing import Annotated
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.admission import admission
 from app.core.decorator import route_handle
-from app.core.dependencies import get_session, get_api_key
-from app.model import RequestByPatient
+from app.core.dependencies import get_read_session, get_api_key
+from app.model import RequestByPatient, RequestPatientTrends
 from app.service.dbase.find_patient import find_records_by_patient
+from app.service.dbase.analytes import find_patient_trends
 
 router = APIRouter(prefix="/find", tags=["Find"], dependencies=[Depends(get_api_key)])
 
@@ -14,11 +16,12 @@ router = APIRouter(prefix="/find", tags=["Find"], dependencies=[Depends(get_api_
     "/patient",
     summary="Найти все исследования по данным пациента",
     description="Выполняет поиск по ФИО и дате рождения. Возвращает список всех найденных исследований.",
+    dependencies=[Depends(admission("find_patient"))],
 )
 @route_handle
 async def find_by_patient(
         patient_data: RequestByPatient,
-        session: Annotated[AsyncSession, Depends(get_session)],
+        session: Annotated[AsyncSession, Depends(get_read_session)],
 ):
     """
     Ищет и возвращает все записи о результатах исследований для указанного пациента.
@@ -27,3 +30,20 @@ async def find_by_patient(
 
 
 
+
+
+@router.post(
+    "/patient/trends",
+    summary="Динамика лабораторных показателей пациента",
+    description="Возвращает значения показателей (например, гемоглобина) по датам из извлеченных таблиц результатов.",
+    dependencies=[Depends(admission("find_patient_trends"))],
+)
+@route_handle
+async def find_trends_by_patient(
+        request_data: RequestPatientTrends,
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+):
+    """
+    Ищет значения показателей пациента за последние месяцы, сгруппированные по показателю.
+    """
+    return await find_patient_trends(request_data, session)
@@ -1,15 +1,20 @@
-from typing import Annotated
+from datetime import date
+from pathlib import Path
+from typing import Annotated, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime
-from fastapi import APIRouter, Depends, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, Request, BackgroundTasks, HTTPException
 
-from app.core.dependencies import get_session, check_permission, get_api_key
+from app.core.dependencies import get_session, get_read_session, check_permission, get_api_key
 from app.service.collector.tools import full_audit_dbase
 # from app.service.dbase.clear_db import reset_entire_database
 from app.service.dbase.dump_bd import create_database_dump
 from app.core.decorator import route_handle
-from app.service.scheduler import sync_database
-from app.core import get_gateway_service
+from app.core.scheduler import request_force_update
+from app.service.scheduler.sync_runs import list_sync_runs
+from app.service.dbase.stats import get_stats_summary, rebuild_stats
+from app.service.dbase.bulk_import import import_results_file
+from app.core.config import get_settings
+from app.core import get_bulk_gateway_service
 from app.model import RequestByMonth, RequestByDay
 from app.service import GatewayService
 from app.service.collector.process import collect_by_day, collect_by_month
@@ -26,7 +31,7 @@ router = APIRouter(prefix="/service", tags=["Service functions"], dependencies=[
 @route_handle
 async def get_data_for_day(
         day: RequestByDay,
-        gateway_service: Annotated[GatewayService, Depends(get_gateway_service)],
+        gateway_service: Annotated[GatewayService, Depends(get_bulk_gateway_service)],
         session: Annotated[AsyncSession, Depends(get_session)],
 ):
     return await collect_by_day(day.date, gateway_service, session)
@@ -41,7 +46,7 @@ async def get_data_for_day(
 @route_handle
 async def get_data_for_month(
         request_data: RequestByMonth,
-        gateway_service: Annotated[GatewayService, Depends(get_gateway_service)],
+        gateway_service: Annotated[GatewayService, Depends(get_bulk_gateway_service)],
         session: Annotated[AsyncSession, Depends(get_session)]
 ):
     """Собирает данные об исследованиях за месяц указанный в запросе"""
@@ -72,23 +77,88 @@ async def audit_full_database_background(
 @router.post(
     "/force-update",
     summary="Ручной запуск обновления [ОЧЕНЬ ЖЕЛАТЕЛЬНО ДЕЛАТЬ ПОСЛЕ загрузки dump!]",
-    description="Запускает задачу обновления (LastDate - 1 -> Today) в фоне.",
+    description=(
+        "Запускает задачу обновления (LastDate - 2 -> Today) в фоне. Если синхронизация уже идет, "
+        "запрос объединяется со следующим запуском (status=merged). date_from расширяет период."
+    ),
     dependencies=[Depends(check_permission)]
 )
 @route_handle
-async def force_update_now(request: Request):
-    scheduler = request.app.state.scheduler
-
-    # Добавляем задачу на исполнение ПРЯМО СЕЙЧАС
-    scheduler.add_job(
-        sync_database,
-        'date',
-        run_date=datetime.now(),
-        args=[scheduler],  # Передаем scheduler для повторных попыток в случае неудачи
-        id=f"manual_{datetime.now().timestamp()}"
-    )
-
-    return {"success": True, "message": "Задача запущена. Следите за Telegram."}
+async def force_update_now(request: Request, date_from: Optional[date] = None):
+    # Задачу выполняет процесс-лидер: если это не мы, команда пересылается ему
+    status = await request_force_update(request.app, date_from)
+
+    if status == "no_leader":
+        return {
+            "success": False,
+            "status": status,
+            "message": "Нет процесса-лидера, задача не запущена. Повторите позже."
+        }
+    if status == "forwarded":
+        return {"success": True, "status": status, "message": "Задача передана лидеру. Следите за Telegram."}
+    if status == "merged":
+        return {
+            "success": True,
+            "status": status,
+            "message": "Синхронизация уже идет. Запрос объединен со следующим запуском."
+        }
+    return {"success": True, "status": status, "message": "Задача запущена. Следите за Telegram."}
+
+
+@router.get(
+    "/sync-runs",
+    summary="Профили последних синхронизаций",
+    description="Возвращает время по этапам, счетчики запросов к шлюзу и найденные замедления для последних синхронизаций.",
+)
+@route_handle
+async def get_sync_runs(
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        limit: int = 30
+):
+    return await list_sync_runs(session, limit)
+
+
+@router.get(
+    "/stats",
+    summary="Сводка по базе результатов",
+    description="Готовые и пустые результаты, объем и разбивка по отделениям из сводной таблицы test_results_stats.",
+)
+@route_handle
+async def get_stats(
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+):
+    return await get_stats_summary(session, date_from, date_to)
+
+
+@router.post(
+    "/stats/rebuild",
+    summary="Пересобрать сводку по базе",
+    description="Пересчитывает test_results_stats полным проходом по test_results (при расхождении сводки).",
+    dependencies=[Depends(check_permission)]
+)
+@route_handle
+async def rebuild_stats_table():
+    return await rebuild_stats()
+
+
+@router.post(
+    "/import",
+    summary="Импорт результатов из JSON/NDJSON файла",
+    description=(
+        "Загружает записи из файла в OUTPUT_FOLDER (например, отчет о пропущенных записях или выгрузку "
+        "другого экземпляра) через COPY, без обращения к шлюзу. Дубликаты пропускаются."
+    ),
+    dependencies=[Depends(check_permission)]
+)
+@route_handle
+async def import_results(file_name: str):
+    output_folder = Path(get_settings().OUTPUT_FOLDER).resolve()
+    file_path = (output_folder / file_name).resolve()
+    if not file_path.is_relative_to(output_folder):
+        raise HTTPException(status_code=400, detail="Файл должен находиться в OUTPUT_FOLDER.")
+    return await import_results_file(file_path)
 
 
 @router.post(
@@ -0,0 +1,126 @@
+import datetime
+import json
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select, delete, update, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.model import FailedResult
+from app.service import GatewayService, get_tests_results
+from app.service.collector.tools import process_and_save_in_batches, validate_records
+
+settings = get_settings()
+
+
+def _serialize_item(item: dict) -> str:
+    return json.dumps(jsonable_encoder(item), ensure_ascii=False)
+
+
+def _deserialize_item(payload: str) -> dict:
+    item = json.loads(payload)
+    # Возвращаем даты к тому виду, который дает sanitize_data
+    for key in ("birthday", "test_date"):
+        if isinstance(item.get(key), str):
+            item[key] = datetime.date.fromisoformat(item[key])
+    return item
+
+
+async def save_failed_results(session: AsyncSession, failures: list[dict]) -> int:
+    """
+    Сохраняет неудачные записи в dead-letter таблицу failed_results.
+    Повторный сбой того же EvnXml_id увеличивает счетчик попыток существующей записи.
+    Коммит выполняет вызывающая сторона.
+    """
+    rows = []
+    for failure in failures:
+        item = failure["item"]
+        result_id = item.get("result_id")
+        if not result_id:
+            # Без EvnXml_id повторить запрос невозможно
+            logger.warning(f"Пропуск записи без result_id: {failure['error']}")
+            continue
+        rows.append({
+            "result_id": str(result_id),
+            "prefix": item.get("prefix"),
+            "test_date": item.get("test_date"),
+            "payload": _serialize_item(item),
+            "error": failure["error"],
+            "attempts": 1,
+            "status": "pending",
+        })
+
+    if not rows:
+        return 0
+
+    statement = insert(FailedResult).values(rows)
+    statement = statement.on_conflict_do_update(
+        constraint="uq_failed_result_id",
+        set_={
+            "payload": statement.excluded.payload,
+            "error": statement.excluded.error,
+            "attempts": FailedResult.attempts + 1,
+            "status": "pending",
+            "updated_at": func.now(),
+        }
+    )
+    await session.execute(statement)
+    logger.warning(f"В dead-letter таблицу записано неудачных результатов: {len(rows)}")
+    return len(rows)
+
+
+async def retry_failed_results(session: AsyncSession, gateway_service: GatewayService) -> dict:
+    """
+    Повторяет получение результатов для одной пачки записей из failed_results.
+    Успешные записи валидируются, сохраняются в test_results и удаляются из таблицы,
+    неудачные получают +1 попытку и переходят в dead после FAILED_RESULTS_MAX_ATTEMPTS.
+    """
+    statement = (
+        select(FailedResult)
+        .where(FailedResult.status == "pending")
+        .order_by(FailedResult.updated_at)
+        .limit(settings.FAILED_RESULTS_BATCH_SIZE)
+    )
+    rows = (await session.exec(statement)).all()
+    if not rows:
+        return {"retried": 0, "resolved": 0, "failed": 0}
+
+    logger.info(f"[Dead-letter] Повтор получения {len(rows)} результатов.")
+    items = [_deserialize_item(row.payload) for row in rows]
+
+    failures = []
+    results = await get_tests_results(items, gateway_service, failures)
+    validated_records = validate_records(results)
+    save_report = await process_and_save_in_batches(validated_records, session)
+
+    errors_by_id = {str(failure["item"].get("result_id")): failure["error"] for failure in failures}
+    resolved_ids = [row.id for row in rows if row.result_id not in errors_by_id]
+
+    if resolved_ids:
+        await session.exec(delete(FailedResult).where(FailedResult.id.in_(resolved_ids)))  # noqa
+
+    for row in rows:
+        if row.result_id in errors_by_id:
+            attempts = row.attempts + 1
+            await session.exec(
+                update(FailedResult)
+                .where(FailedResult.id == row.id)
+                .values(
+                    attempts=attempts,
+                    error=errors_by_id[row.result_id],
+                    status="dead" if attempts >= settings.FAILED_RESULTS_MAX_ATTEMPTS else "pending",
+                    updated_at=func.now(),
+                )
+            )
+
+    await session.commit()
+
+    report = {
+        "retried": len(rows),
+        "resolved": len(resolved_ids),
+        "failed": len(errors_by_id),
+        "inserted": save_report.get("inserted", 0),
+    }
+    logger.info(f"[Dead-letter] Итог повтора: {report}")
+    return report
@@ -0,0 +1,71 @@
+import datetime
+import hashlib
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import tuple_
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.model import CollectionFingerprint
+
+UnitKey = tuple[datetime.date, str]  # (день, префикс отделения)
+
+
+def unit_key(item: dict) -> UnitKey:
+    return item.get("test_date"), item.get("prefix")
+
+
+def compute_fingerprints(items: list[dict]) -> dict[UnitKey, tuple[str, int]]:
+    """
+    Считает отпечатки по записям после sanitize_data, сгруппированным по (день, отделение).
+    Возвращает {(день, префикс): (sha256, число записей)}. Записи без даты не учитываются.
+    """
+    pairs_by_unit = defaultdict(list)
+    for item in items:
+        key = unit_key(item)
+        if key[0] is None:
+            continue
+        pairs_by_unit[key].append(f"{item.get('test_id')}:{item.get('result_id')}")
+
+    fingerprints = {}
+    for key, pairs in pairs_by_unit.items():
+        digest = hashlib.sha256("\n".join(sorted(pairs)).encode()).hexdigest()
+        fingerprints[key] = (digest, len(pairs))
+    return fingerprints
+
+
+async def load_fingerprints(session: AsyncSession, keys: Iterable[UnitKey]) -> dict[UnitKey, str]:
+    """Загружает сохраненные отпечатки для указанных (день, отделение)."""
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    statement = select(CollectionFingerprint).where(
+        tuple_(CollectionFingerprint.day, CollectionFingerprint.prefix).in_(keys)
+    )
+    rows = (await session.exec(statement)).all()
+    return {(row.day, row.prefix): row.fingerprint for row in rows}
+
+
+async def save_fingerprints(session: AsyncSession, fingerprints: dict[UnitKey, tuple[str, int]]):
+    """Сохраняет (upsert) отпечатки полностью обработанных единиц и коммитит."""
+    if not fingerprints:
+        return
+
+    rows = [
+        {"day": day, "prefix": prefix, "fingerprint": digest, "records": records}
+        for (day, prefix), (digest, records) in fingerprints.items()
+    ]
+    statement = insert(CollectionFingerprint).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", "prefix"],
+        set_={
+            "fingerprint": statement.excluded.fingerprint,
+            "records": statement.excluded.records,
+            "updated_at": func.now(),
+        }
+    )
+    await session.exec(statement)
+    await session.commit()
@@ -1,12 +1,26 @@
 import asyncio
+import time
+from typing import Optional
+
 import httpx
 from fastapi import HTTPException, status
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception
 
 from app.core import logger
+from app.core.metrics import FETCH_SEMAPHORE_WAIT, FETCH_IN_FLIGHT
+from app.core.profiler import profile_count
 from app.service import GatewayService, fetch_test_result
 from app.service.utils.utils import parse_html_test_result
-from app.service.utils.telegram import send_telegram_message
+from app.service.utils.telegram import alert_dispatcher, EmptyResultAlert
+
+
+def _log_retry(retry_state):
+    """Логирует повторную попытку запроса и учитывает ее в профиле синхронизации."""
+    profile_count("gateway_retries")
+    logger.warning(
+        f"Повторная попытка {retry_state.attempt_number}/5 для запроса "
+        f"из-за ошибки: {retry_state.outcome.exception()}"
+    )
 
 
 def is_retryable_exception(exception) -> bool:
@@ -30,14 +44,12 @@ def is_retryable_exception(exception) -> bool:
     stop=stop_after_attempt(5),  # Остановиться после 5 попыток (1 первая + 4 повторных)
     wait=wait_fixed(2),  # Ждать 2 секунды между попытками
     retry=retry_if_exception(is_retryable_exception), # noqa
-    before_sleep=lambda retry_state: logger.warning(
-        f"Повторная попытка {retry_state.attempt_number}/5 для запроса "
-        f"из-за ошибки: {retry_state.outcome.exception()}"
-    )
+    before_sleep=_log_retry
 )
-async def get_single_test_result(item: dict, gateway_service: GatewayService) -> dict:
+async def fetch_single_test_html(item: dict, gateway_service: GatewayService) -> Optional[str]:
     """
-    Получает результат для ОДНОГО теста.
+    Получает сырой HTML результата для ОДНОГО теста (без разбора).
+    Возвращает None, если шлюз так и не отдал содержимое.
     Если происходит ошибка, выбрасывает исключение.
     """
     result_id = item.get("result_id")
@@ -58,9 +70,20 @@ async def get_single_test_result(item: dict, gateway_service: GatewayService) ->
 
         # Если контента нет и это не последняя попытка - ждем
         if attempt < max_empty_retries:
+            profile_count("gateway_retries")
             logger.warning(f"Пустой ответ для {result_id}. Ждем {retry_delay}с и пробуем снова ({attempt}/{max_empty_retries})")
             await asyncio.sleep(retry_delay)
 
+    return html_content
+
+
+async def apply_test_result(item: dict, html_content: Optional[str]) -> dict:
+    """
+    Разбирает полученный HTML и записывает результат в запись.
+    Для пустого результата ставит алерт в очередь и помечает запись is_result=False.
+    """
+    result_id = item.get("result_id")
+
     if html_content:
         item["test_result"] = await parse_html_test_result(html_content)
         item["is_result"] = True
@@ -69,17 +92,15 @@ async def get_single_test_result(item: dict, gateway_service: GatewayService) ->
         test_date = item.get('test_date')
         date_str = test_date.strftime('%d.%m.%Y') if test_date else "Неизвестная дата"
         test_name = item.get('test_name', 'Неизвестный анализ')
-        # Шлем алерт в Телеграм
-        message = (
-            f"Результаты исследований offline\n"
-            f"⚠️ <b>Внимание: Пустой результат!</b>\n"
-            f"👤 Пациент: {patient_name}\n"
-            f"📅 Дата: {date_str}\n"
-            f"🔬 Анализ: {test_name}\n"
-            f"🆔 ID: {result_id}\n"
-            f"ℹ️ <i>Попыток получения: {max_empty_retries}</i>"
-        )
-        await send_telegram_message(message)
+        # Ставим алерт в очередь диспетчера, он отправит дайджест в Телеграм в фоне
+        alert_dispatcher.report_empty_result(EmptyResultAlert(
+            prefix=item.get('prefix') or "unknown",
+            patient_name=patient_name,
+            test_date=date_str,
+            test_name=test_name,
+            result_id=result_id,
+        ))
+        profile_count("empty_results")
 
         logger.warning(f"Пустой результат: {item.get('last_name')} (ID: {result_id})")
         item["test_result"] = "Результат пуст"
@@ -89,7 +110,26 @@ async def get_single_test_result(item: dict, gateway_service: GatewayService) ->
     return item
 
 
-async def get_tests_results(src_data: list, gateway_service: GatewayService) -> list:
+async def get_single_test_result(item: dict, gateway_service: GatewayService) -> dict:
+    """
+    Получает результат для ОДНОГО теста.
+    Если происходит ошибка, выбрасывает исключение.
+    """
+    html_content = await fetch_single_test_html(item, gateway_service)
+    return await apply_test_result(item, html_content)
+
+
+async def get_tests_results(
+        src_data: list,
+        gateway_service: GatewayService,
+        failures: Optional[list[dict]] = None
+) -> list:
+    """
+    Получает результаты исследований для всех записей конкурентно.
+    - Без failures: режим "все или ничего", первая ошибка превращается в HTTPException.
+    - С failures: режим частичного успеха. Возвращаются только успешные записи, а неудачные
+      добавляются в failures как {"item": запись, "error": текст ошибки}.
+    """
     if not src_data:
         return []
 
@@ -108,8 +148,11 @@ async def get_tests_results(src_data: list, gateway_service: GatewayService) ->
     # Создаем "обертку", которая будет использовать семафор.
     # Она принимает задачу (get_single_test_result) и ее аргументы.
     async def run_with_semaphore(coro, *args):
+        wait_start = time.perf_counter()
         async with semaphore:
-            return await coro(*args)
+            FETCH_SEMAPHORE_WAIT.observe(time.perf_counter() - wait_start)
+            with FETCH_IN_FLIGHT.track_inprogress():
+                return await coro(*args)
 
     tasks = [
         asyncio.create_task(
@@ -118,6 +161,25 @@ async def get_tests_results(src_data: list, gateway_service: GatewayService) ->
         for item in src_data
     ]
 
+    if failures is not None:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        succeeded = []
+        for item, result in zip(src_data, results):
+            if isinstance(result, Exception):
+                error = result.detail if isinstance(result, HTTPException) else str(result)
+                failures.append({"item": item, "error": f"{type(result).__name__}: {error}"})
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                succeeded.append(result)
+
+        failed_count = len(src_data) - len(succeeded)
+        if failed_count:
+            logger.warning(f"Получено результатов: {len(succeeded)}. Не удалось получить: {failed_count}.")
+        else:
+            logger.info("Все результаты исследований успешно получены.")
+        return succeeded
+
     try:
         results = await asyncio.gather(*tasks)
         logger.info("Все результаты исследований успешно получены.")
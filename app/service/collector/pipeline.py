@@ -0,0 +1,257 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.core.metrics import FETCH_IN_FLIGHT, FETCH_SEMAPHORE_WAIT, PIPELINE_QUEUE_SIZE
+from app.core.profiler import profile_stage
+from app.model.department import Department
+from app.service import GatewayService, sanitize_data
+from app.service.collector.getter import fetch_single_test_html, apply_test_result
+from app.service.collector.request import iter_period_pages
+from app.service.collector.registry import DepartmentLimits, DepartmentStats, default_limits
+from app.service.collector.planner import window_days
+from app.service.collector.fingerprint import (
+    UnitKey, unit_key, compute_fingerprints, load_fingerprints, save_fingerprints
+)
+from app.service.collector.tools import validate_records, process_and_save_in_batches
+
+settings = get_settings()
+
+# Маркер завершения стадии: каждый воркер, получивший его, выходит
+_STOP = object()
+
+
+@dataclass
+class PipelineReport:
+    fetched: int = 0  # записей получено со страниц поиска
+    inserted: int = 0
+    skipped: list = field(default_factory=list)  # дубликаты (модели TestResult)
+    failures: list = field(default_factory=list)  # {"item": запись, "error": текст} для dead-letter
+    department_stats: dict[str, DepartmentStats] = field(default_factory=dict)  # для автотюнера
+    unchanged: int = 0  # записей в днях без изменений (результаты не запрашивались)
+
+
+class CollectionPipeline:
+    """
+    Конвейер сбора из четырех стадий, связанных ограниченными очередями:
+    страницы поиска -> получение HTML (PIPELINE_FETCH_WORKERS) -> разбор HTML (PIPELINE_PARSE_WORKERS)
+    -> пакетная запись в БД (PIPELINE_BATCH_SIZE).
+    Заполненная очередь приостанавливает предыдущую стадию, поэтому число живых задач и объем
+    данных в памяти фиксированы, а первые записи попадают в БД, пока пагинация еще идет.
+    Размер страницы и число одновременных запросов результатов берутся из реестра отделений.
+
+    При FINGERPRINT_ENABLED страницы поиска единицы сначала собираются целиком: дни, отпечаток
+    которых совпал с сохраненным, дальше не идут. Отпечаток дня сохраняется, когда все его записи
+    записаны в БД; день, где хотя бы один результат не получен, будет обработан заново.
+    """
+
+    def __init__(
+            self,
+            gateway_service: GatewayService,
+            session: AsyncSession,
+            limits: Optional[dict[str, DepartmentLimits]] = None
+    ):
+        self._gateway_service = gateway_service
+        self._session = session
+        self._limits = limits or {}
+        self._department_semaphores: dict[str, asyncio.Semaphore] = {}
+        # Отпечатки: сохраненные (None - проверка выключена), ожидающие записи и готовые к сохранению
+        self._stored_fingerprints: Optional[dict[UnitKey, str]] = None
+        self._unit_fingerprints: dict[UnitKey, tuple[str, int]] = {}
+        self._pending_units: dict[UnitKey, int] = {}
+        self._failed_units: set[UnitKey] = set()
+        self._completed_units: dict[UnitKey, tuple[str, int]] = {}
+        self._fetch_queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        self._parse_queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        self._write_queue = asyncio.Queue(maxsize=settings.PIPELINE_BATCH_SIZE * 2)
+        self.report = PipelineReport()
+
+    async def run(self, units: list[tuple[str, Department]]) -> PipelineReport:
+        """Обрабатывает список единиц (период, отделение). При ошибке любой стадии останавливает все."""
+        for _, department in units:
+            if department.prefix not in self._department_semaphores:
+                limits = self._department_limits(department.prefix)
+                self._department_semaphores[department.prefix] = asyncio.Semaphore(limits.concurrency)
+
+        if settings.FINGERPRINT_ENABLED:
+            # Загружаем заранее: во время работы сессией пользуется только стадия записи
+            keys = [(day, department.prefix) for period, department in units for day in window_days(period)]
+            self._stored_fingerprints = await load_fingerprints(self._session, keys)
+
+        producer = asyncio.create_task(self._produce(units))
+        fetchers = [asyncio.create_task(self._fetch_worker()) for _ in range(settings.PIPELINE_FETCH_WORKERS)]
+        parsers = [asyncio.create_task(self._parse_worker()) for _ in range(settings.PIPELINE_PARSE_WORKERS)]
+        writer = asyncio.create_task(self._write_worker())
+
+        tasks = [
+            producer, *fetchers, *parsers, writer,
+            asyncio.create_task(self._close_stage([producer], self._fetch_queue, len(fetchers))),
+            asyncio.create_task(self._close_stage(fetchers, self._parse_queue, len(parsers), "result_fetch")),
+            asyncio.create_task(self._close_stage(parsers, self._write_queue, 1)),
+        ]
+        await self._supervise(tasks)
+        return self.report
+
+    def _department_limits(self, prefix: str) -> DepartmentLimits:
+        return self._limits.get(prefix) or default_limits()
+
+    @staticmethod
+    async def _supervise(tasks: list[asyncio.Task]):
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if task.exception() is not None:
+                        raise task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    async def _close_stage(workers: list[asyncio.Task], next_queue: asyncio.Queue, consumers: int, stage: str = None):
+        """Дожидается завершения воркеров стадии и отправляет маркеры завершения следующей стадии."""
+        if stage:
+            with profile_stage(stage):
+                await asyncio.gather(*workers)
+        else:
+            await asyncio.gather(*workers)
+        for _ in range(consumers):
+            await next_queue.put(_STOP)
+
+    async def _produce(self, units: list[tuple[str, Department]]):
+        for period, department in units:
+            logger.info(f"Период '{period}': собираю данные для '{department.prefix}'")
+            page_size = self._department_limits(department.prefix).page_size
+            stats = self.report.department_stats.setdefault(department.prefix, DepartmentStats())
+            pages = iter_period_pages(period, department.id, self._gateway_service, page_size=page_size)
+            unit_items = []
+            while True:
+                page_start = time.perf_counter()
+                with profile_stage("search_pagination"):
+                    page = await anext(pages, None)
+                if page is None:
+                    break
+
+                stats.pages += 1
+                stats.page_seconds += time.perf_counter() - page_start
+                stats.records += len(page)
+                stats.full_pages += len(page) >= page_size
+
+                for each in page:
+                    each["prefix"] = department.prefix
+                page_items = sanitize_data(page)
+                self.report.fetched += len(page_items)
+                if self._stored_fingerprints is None:
+                    await self._enqueue(page_items)
+                else:
+                    unit_items.extend(page_items)
+
+            if unit_items:
+                await self._enqueue(self._select_changed(unit_items))
+
+    async def _enqueue(self, items: list[dict]):
+        for item in items:
+            await self._fetch_queue.put(item)
+        PIPELINE_QUEUE_SIZE.labels("fetch").set(self._fetch_queue.qsize())
+
+    def _select_changed(self, items: list[dict]) -> list[dict]:
+        """Оставляет записи только тех дней, отпечаток которых изменился с прошлого сбора."""
+        for key, (digest, records) in compute_fingerprints(items).items():
+            if self._stored_fingerprints.get(key) == digest:
+                self.report.unchanged += records
+                logger.info(f"День {key[0]} '{key[1]}' не изменился ({records} записей), пропускаю")
+                continue
+            self._unit_fingerprints[key] = (digest, records)
+            self._pending_units[key] = records
+
+        return [item for item in items if unit_key(item)[0] is None or unit_key(item) in self._pending_units]
+
+    def _mark_processed(self, item: dict, failed: bool = False):
+        """Учитывает обработку записи; отпечаток дня готов к сохранению, когда обработаны все его записи."""
+        key = unit_key(item)
+        if key not in self._pending_units:
+            return
+        if failed:
+            self._failed_units.add(key)
+
+        self._pending_units[key] -= 1
+        if self._pending_units[key] == 0:
+            del self._pending_units[key]
+            fingerprint = self._unit_fingerprints.pop(key)
+            if key not in self._failed_units:
+                self._completed_units[key] = fingerprint
+
+    async def _fetch_worker(self):
+        while True:
+            item = await self._fetch_queue.get()
+            if item is _STOP:
+                return
+
+            try:
+                wait_start = time.perf_counter()
+                async with self._department_semaphores[item["prefix"]]:
+                    FETCH_SEMAPHORE_WAIT.observe(time.perf_counter() - wait_start)
+                    with FETCH_IN_FLIGHT.track_inprogress():
+                        html_content = await fetch_single_test_html(item, self._gateway_service)
+            except Exception as e:
+                # Частичный успех: неудачная запись уходит в dead-letter, остальные продолжают путь
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                self.report.failures.append({"item": item, "error": f"{type(e).__name__}: {error}"})
+                self._mark_processed(item, failed=True)
+                continue
+
+            await self._parse_queue.put((item, html_content))
+            PIPELINE_QUEUE_SIZE.labels("parse").set(self._parse_queue.qsize())
+
+    async def _parse_worker(self):
+        while True:
+            entry = await self._parse_queue.get()
+            if entry is _STOP:
+                return
+
+            item, html_content = entry
+            record = await apply_test_result(item, html_content)
+            await self._write_queue.put(record)
+            PIPELINE_QUEUE_SIZE.labels("write").set(self._write_queue.qsize())
+
+    async def _write_worker(self):
+        batch = []
+        while True:
+            record = await self._write_queue.get()
+            if record is _STOP:
+                break
+
+            batch.append(record)
+            if len(batch) >= settings.PIPELINE_BATCH_SIZE:
+                await self._flush(batch)
+                batch = []
+
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict]):
+        with profile_stage("validation"):
+            validated_records = validate_records(batch)
+
+        if validated_records:
+            with profile_stage("insert"):
+                save_report = await process_and_save_in_batches(validated_records, self._session)
+                # Коммит на каждый пакет: записи доступны сразу, повтор безопасен благодаря ON CONFLICT
+                await self._session.commit()
+
+            self.report.inserted += save_report.get("inserted", 0)
+            self.report.skipped.extend(save_report.get("skipped", []))
+
+        # Невалидные записи повтор не исправит, поэтому тоже считаются обработанными
+        for record in batch:
+            self._mark_processed(record)
+        if self._completed_units:
+            await save_fingerprints(self._session, self._completed_units)
+            self._completed_units = {}
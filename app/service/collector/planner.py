@@ -0,0 +1,105 @@
+import datetime
+import math
+from typing import Optional, Sequence
+
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.model import TestResult
+from app.model.department import Department
+from app.service.collector.registry import DepartmentLimits
+
+settings = get_settings()
+
+
+def _format_window(first_day: datetime.date, last_day: datetime.date) -> str:
+    return f"{first_day.strftime('%d.%m.%Y')} - {last_day.strftime('%d.%m.%Y')}"
+
+
+def window_days(period: str) -> list[datetime.date]:
+    """Возвращает все дни периода вида 'ДД.ММ.ГГГГ - ДД.ММ.ГГГГ'."""
+    first, last = (datetime.datetime.strptime(part.strip(), "%d.%m.%Y").date() for part in period.split(" - "))
+    return [first + datetime.timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+async def load_daily_volume(session: AsyncSession, prefixes: Sequence[str]) -> dict[str, float]:
+    """
+    Оценивает суточный объем записей по отделениям за последние RANGE_PLANNER_LOOKBACK_DAYS дней.
+    Берется 90-й перцентиль по дням с данными: оценка с запасом, чтобы окно не раздувалось
+    из-за череды пустых дней. Отделения без истории в результат не попадают.
+    """
+    since = datetime.date.today() - datetime.timedelta(days=settings.RANGE_PLANNER_LOOKBACK_DAYS)
+    daily_counts = (
+        select(TestResult.prefix, TestResult.test_date, func.count().label("records"))
+        .where(TestResult.test_date >= since, TestResult.prefix.in_(prefixes))
+        .group_by(TestResult.prefix, TestResult.test_date)
+        .subquery()
+    )
+    statement = (
+        select(daily_counts.c.prefix, func.percentile_cont(0.9).within_group(daily_counts.c.records))
+        .group_by(daily_counts.c.prefix)
+    )
+    rows = (await session.exec(statement)).all()
+    return {prefix: float(volume) for prefix, volume in rows if volume is not None}
+
+
+def plan_windows(
+        days: list[datetime.date],
+        daily_volume: Optional[float],
+        page_size: int
+) -> list[tuple[datetime.date, datetime.date]]:
+    """
+    Группирует дни в окна так, чтобы ожидаемый объем окна укладывался примерно в одну страницу
+    поиска отделения (page_size). Объединяются только идущие подряд дни.
+    Для загруженных отделений и отделений без истории окно равно одному дню.
+    """
+    if not daily_volume:
+        return [(day, day) for day in days]
+
+    window_days = math.floor(page_size / daily_volume)
+    window_days = max(1, min(window_days, settings.RANGE_PLANNER_MAX_DAYS))
+
+    windows = []
+    for day in sorted(days):
+        if windows:
+            first_day, last_day = windows[-1]
+            if day == last_day + datetime.timedelta(days=1) and (day - first_day).days < window_days:
+                windows[-1] = (first_day, day)
+                continue
+        windows.append((day, day))
+    return windows
+
+
+async def plan_units(
+        session: AsyncSession,
+        periods: list[str],
+        departments: Sequence[Department],
+        limits: dict[str, DepartmentLimits]
+) -> list[tuple[str, Department]]:
+    """
+    Строит единицы работы (период, отделение) для конвейера сбора.
+    Тихие отделения опрашиваются многодневными окнами, загруженные - по одному дню.
+    Единицы упорядочены по началу окна, затем по приоритету отделений из реестра.
+    """
+    days = [datetime.datetime.strptime(period, "%d.%m.%Y").date() for period in periods]
+    departments = sorted(departments, key=lambda department: -limits[department.prefix].priority)
+
+    if not settings.RANGE_PLANNER_ENABLED or len(days) < 2:
+        return [(_format_window(day, day), department) for day in days for department in departments]
+
+    volumes = await load_daily_volume(session, [department.prefix for department in departments])
+
+    planned = []
+    for order, department in enumerate(departments):
+        windows = plan_windows(days, volumes.get(department.prefix), limits[department.prefix].page_size)
+        if len(windows) < len(days):
+            logger.info(
+                f"Планировщик: '{department.prefix}' (~{volumes[department.prefix]:.0f} записей/день) - "
+                f"{len(windows)} запросов вместо {len(days)}"
+            )
+        planned.extend((first_day, order, _format_window(first_day, last_day), department)
+                       for first_day, last_day in windows)
+
+    planned.sort(key=lambda unit: (unit[0], unit[1]))
+    return [(period, department) for _, _, period, department in planned]
@@ -2,54 +2,18 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import HTTPException
-from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.model import TestResult
-from app.service import GatewayService, fetch_period_data, sanitize_data, get_tests_results
-from app.service.collector.tools import process_and_save_in_batches
+from app.service import GatewayService
+from app.service.collector.pipeline import CollectionPipeline
+from app.service.collector.dead_letter import save_failed_results
+from app.service.collector.planner import plan_units
+from app.service.collector.registry import load_department_limits, save_department_tuning
+from app.service.dbase.partitions import ensure_partitions
 from app.core.logger_setup import logger
 from app.model.department import DEPARTMENTS
 from app.service.utils.utils import date_generator, save_json
-
-
-def _add_prefix(session_prefix: str, data: list[dict]) -> list[dict]:
-    """Добавляет к записи префикс отделения"""
-    for each in data:
-        each.update({"prefix": session_prefix})
-    return data
-
-
-def _validate_records(records_as_dicts: list[dict[str, any]]) -> list[TestResult]:
-    """
-    Принимает список словарей, проверяет каждый из них с помощью модели TestResult.
-    - Пропускает невалидные записи и логирует ошибки.
-    - Возвращает список валидных экземпляров модели TestResult.
-    """
-    if not records_as_dicts:
-        return []
-
-    logger.info(f"Начата валидация {len(records_as_dicts)} записей.")
-    validated_records = []
-
-    for record_dict in records_as_dicts:
-        try:
-            validated_model = TestResult.model_validate(record_dict)
-            validated_records.append(validated_model)
-        except ValidationError as e:
-            logger.warning(
-                f"Пропуск записи из-за ошибки валидации. "
-                f"Данные: {record_dict}. Ошибка: {e}"
-            )
-            continue
-
-    logger.info(
-        f"Валидация завершена. "
-        f"Успешно: {len(validated_records)}. "
-        f"Отброшено: {len(records_as_dicts) - len(validated_records)}."
-    )
-
-    return validated_records
+from app.service.utils.telegram import alert_dispatcher
 
 
 async def _collect_and_process_data(
@@ -71,38 +35,41 @@ async def _collect_and_process_data(
         departments_to_scan = DEPARTMENTS
 
 
-    gateway_response = []
+    # Единицы работы (период, отделение): тихие отделения опрашиваются многодневными окнами
+    # Секции под собираемый период должны существовать до первой вставки
+    period_days = sorted(datetime.strptime(period, "%d.%m.%Y").date() for period in periods)
+    await ensure_partitions(period_days[0], period_days[-1])
 
-    for day in periods:
-        period = f"{day} - {day}"
-        for department in departments_to_scan:
-            logger.info(f"Период '{period}': собираю данные для '{department.prefix}'")
-            data_raw = await fetch_period_data(period, department.id, gateway_service)
+    limits = await load_department_limits(session, departments_to_scan)
+    units = await plan_units(session, periods, departments_to_scan, limits)
 
-            if data_raw:
-                data_prefix = _add_prefix(department.prefix, data_raw)
-                data_sanitized = sanitize_data(data_prefix)
-                data_with_test_results = await get_tests_results(data_sanitized, gateway_service)
-                gateway_response.extend(data_with_test_results)
+    pipeline = CollectionPipeline(gateway_service, session, limits)
+    report = await pipeline.run(units)
 
-    if not gateway_response:
-        logger.info("Нет данных для сохранения по указанным периодам. Завершение работы.")
-        return {"success": True, "message": "No data found to process"}
+    try:
+        await save_department_tuning(session, limits, report.department_stats)
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Не удалось сохранить параметры автотюнера: {e}")
 
-    validated_records = _validate_records(gateway_response)
+    # Дайджест пустых результатов за этот запуск уходит в фоне
+    alert_dispatcher.flush()
 
-    if not validated_records:
-        logger.info("Нет валидных данных для сохранения после фильтрации.")
-        return {"success": True, "message": "No valid data to save"}
+    # Записи, результат которых не удалось получить: уходят в dead-letter, а не роняют весь сбор
+    failed_results = report.failures
+    if failed_results:
+        await save_failed_results(session, failed_results)
+        await session.commit()
 
-    logger.info(f"Передача {len(validated_records)} проверенных записей для сохранения в БД.")
-    save_report = await process_and_save_in_batches(validated_records, session)
+    if report.unchanged:
+        logger.info(f"Пропущено записей в днях без изменений: {report.unchanged}")
 
-    await session.commit()
-    logger.info("Транзакция успешно зафиксирована.")
+    if not report.fetched:
+        logger.info("Нет данных для сохранения по указанным периодам. Завершение работы.")
+        return {"success": True, "message": "No data found to process"}
 
-    inserted_count = save_report.get("inserted", 0)
-    skipped_records = save_report.get("skipped", [])
+    inserted_count = report.inserted
+    skipped_records = report.skipped
 
     logger.info(f"Операция завершена. Вставлено новых: {inserted_count}. Пропущено дубликатов: {len(skipped_records)}.")
 
@@ -135,17 +102,26 @@ async def _collect_and_process_data(
 
     return {
         "success": True,
-        "message": f"Операция завершена. Вставлено новых: {inserted_count}. Пропущено дубликатов: {len(skipped_records)}."
+        "message": (
+            f"Операция завершена. Вставлено новых: {inserted_count}. "
+            f"Пропущено дубликатов: {len(skipped_records)}. "
+            f"Отложено для повтора: {len(failed_results)}."
+        )
     }
 
 
-async def collect_by_day(period: str, gateway_service: GatewayService, session: AsyncSession):
+async def collect_by_day(
+        period: str,
+        gateway_service: GatewayService,
+        session: AsyncSession,
+        prefixes: Optional[list[str]] = None
+):
     """
     Собирает и сохраняет данные за один указанный день.
     """
     try:
         periods = [period]
-        return await _collect_and_process_data(periods, gateway_service, session)
+        return await _collect_and_process_data(periods, gateway_service, session, prefixes)
 
     except Exception as e:
         logger.error(f"Операция сбора за день '{period}' прервана: {e}", exc_info=True)
@@ -0,0 +1,134 @@
+import datetime
+import math
+from dataclasses import dataclass, replace
+from typing import Optional, Sequence
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.model import DepartmentProfile
+from app.model.department import Department
+
+settings = get_settings()
+
+_OVERRIDE_FIELDS = ("page_size", "concurrency", "priority")
+
+
+@dataclass(frozen=True)
+class DepartmentLimits:
+    page_size: int
+    concurrency: int
+    priority: int = 0
+    pinned: bool = False  # задано в DEPARTMENT_OVERRIDES, автотюнер не меняет
+
+
+@dataclass
+class DepartmentStats:
+    """Наблюдения конвейера по одному отделению за запуск."""
+    pages: int = 0
+    full_pages: int = 0
+    page_seconds: float = 0.0
+    records: int = 0
+
+
+def default_limits() -> DepartmentLimits:
+    return DepartmentLimits(page_size=settings.REQUEST_PAGINATOR_LIMIT, concurrency=settings.PIPELINE_FETCH_WORKERS)
+
+
+async def load_department_limits(
+        session: AsyncSession,
+        departments: Sequence[Department]
+) -> dict[str, DepartmentLimits]:
+    """
+    Собирает действующие параметры сбора по отделениям:
+    глобальные настройки -> профиль из department_profiles -> DEPARTMENT_OVERRIDES.
+    """
+    rows = (await session.exec(select(DepartmentProfile))).all()
+    stored = {row.prefix: row for row in rows}
+
+    limits = {}
+    for department in departments:
+        department_limits = default_limits()
+        row = stored.get(department.prefix)
+        if row:
+            department_limits = DepartmentLimits(page_size=row.page_size, concurrency=row.concurrency, priority=row.priority)
+
+        override = settings.DEPARTMENT_OVERRIDES.get(department.prefix)
+        if override:
+            values = {key: value for key, value in override.items() if key in _OVERRIDE_FIELDS}
+            department_limits = replace(department_limits, pinned=True, **values)
+
+        limits[department.prefix] = department_limits
+    return limits
+
+
+def _tune_page_size(current: int, stats: DepartmentStats) -> int:
+    """Медленные страницы - уменьшаем размер, быстрые и полные - увеличиваем (шаг 25%)."""
+    latency = stats.page_seconds / stats.pages
+    target = settings.DEPARTMENT_PAGE_LATENCY_TARGET
+    if latency > target:
+        current = int(current * 0.75)
+    elif stats.full_pages and latency < target / 2:
+        current = int(current * 1.25)
+    return max(settings.DEPARTMENT_PAGE_SIZE_MIN, min(current, settings.DEPARTMENT_PAGE_SIZE_MAX))
+
+
+def _tune_concurrency(current: int, share: float) -> int:
+    """Параллелизм пропорционален доле записей отделения, сглаживается с прошлым значением."""
+    workers = settings.PIPELINE_FETCH_WORKERS
+    target = max(settings.DEPARTMENT_CONCURRENCY_MIN, min(workers, math.ceil(workers * share * 2)))
+    return round((current + target) / 2)
+
+
+def _smooth(previous: Optional[float], value: float) -> float:
+    return value if previous is None else round(previous * 0.5 + value * 0.5, 3)
+
+
+async def save_department_tuning(
+        session: AsyncSession,
+        limits: dict[str, DepartmentLimits],
+        department_stats: dict[str, DepartmentStats]
+):
+    """
+    Автотюнер: по наблюдениям запуска пересчитывает размер страницы, параллелизм и приоритет
+    отделений и сохраняет их в department_profiles для следующих запусков.
+    Отделения из DEPARTMENT_OVERRIDES пропускаются.
+    """
+    total_records = sum(stats.records for stats in department_stats.values())
+    if not settings.DEPARTMENT_AUTOTUNE or not total_records:
+        return
+
+    statement = select(DepartmentProfile).where(DepartmentProfile.prefix.in_(department_stats.keys()))
+    stored = {row.prefix: row for row in (await session.exec(statement)).all()}
+    # Приоритет имеет смысл только при сравнении нескольких отделений
+    ranking = sorted(department_stats, key=lambda prefix: department_stats[prefix].records)
+    update_priority = len(ranking) > 1
+
+    for prefix, stats in department_stats.items():
+        current = limits.get(prefix) or default_limits()
+        if current.pinned or not stats.pages:
+            continue
+
+        page_size = _tune_page_size(current.page_size, stats)
+        concurrency = _tune_concurrency(current.concurrency, stats.records / total_records)
+        priority = ranking.index(prefix) if update_priority else current.priority
+
+        row = stored.get(prefix)
+        if row is None:
+            row = DepartmentProfile(prefix=prefix, page_size=page_size, concurrency=concurrency)
+            session.add(row)
+        row.page_size = page_size
+        row.concurrency = concurrency
+        row.priority = priority
+        row.page_latency = _smooth(row.page_latency, stats.page_seconds / stats.pages)
+        row.records_per_run = _smooth(row.records_per_run, stats.records)
+        row.updated_at = datetime.datetime.now(datetime.timezone.utc)
+
+        if (page_size, concurrency, priority) != (current.page_size, current.concurrency, current.priority):
+            logger.info(
+                f"Автотюнер '{prefix}': страница {current.page_size} -> {page_size}, "
+                f"параллелизм {current.concurrency} -> {concurrency}, приоритет {priority}"
+            )
+
+    await session.commit()
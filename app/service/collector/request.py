@@ -1,56 +1,111 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Optional
+
 from app.core import logger, get_settings
 from app.service import GatewayService
 
 settings = get_settings()
 
+
+def _search_payload(period: str, department_id: str, start: int, limit: int) -> dict:
+    return {
+        "params": {"c": "Search", "m": "searchData"},
+        "data": {
+            "PersonPeriodicType_id": 1,
+            "SearchFormType": "EvnUslugaPar",
+            "EvnUslugaPar_setDate_Range": period,
+            "SearchType_id": 1,
+            "Part_of_the_study": "false",
+            "PersonCardStateType_id": 1,
+            "PrivilegeStateType_id": 1,
+            "limit": limit,
+            "start": start,
+            "LpuSection_uid": department_id
+        }
+    }
+
+
+async def iter_period_pages(
+        period: str,
+        department_id: str,
+        gateway_service: GatewayService,
+        page_size: Optional[int] = None
+) -> AsyncIterator[list]:
+    """
+    Постранично запрашивает данные поиска за период и отдает каждую страницу сразу после получения,
+    чтобы обработка первых записей могла начаться до конца пагинации.
+    - Держит в полете до REQUEST_PREFETCH_PAGES страниц (start + n * limit), отдавая их строго по порядку.
+    - Останавливается на первой пустой или неполной странице, лишние запросы отменяются.
+    - Убирает дубли по EvnUslugaPar_id, возникающие при сдвиге страниц во время пагинации.
+    page_size переопределяет REQUEST_PAGINATOR_LIMIT (размер страницы из реестра отделений).
+    """
+    paginator_limit = page_size or settings.REQUEST_PAGINATOR_LIMIT
+    prefetch = max(1, settings.REQUEST_PREFETCH_PAGES)
+    seen_ids = set()
+    in_flight: deque[tuple[int, asyncio.Task]] = deque()
+    next_start = 0
+
+    def schedule_next_page():
+        nonlocal next_start
+        payload = _search_payload(period, department_id, next_start, paginator_limit)
+        task = asyncio.create_task(gateway_service.make_request(method="post", json=payload))
+        in_flight.append((next_start, task))
+        next_start += paginator_limit
+
+    try:
+        for _ in range(prefetch):
+            schedule_next_page()
+
+        while in_flight:
+            start, task = in_flight.popleft()
+            logger.debug(f"Ожидаем страницу №{start // paginator_limit + 1} (смещение: {start})...")
+            response_json = await task
+            current_page_results = response_json.get("data", [])
+
+            # Если текущая страница пуста, значит, данные закончились.
+            if not current_page_results:
+                logger.debug("Получена пустая страница, завершаем сбор.")
+                break
+
+            unique_results = []
+            for record in current_page_results:
+                record_id = record.get("EvnUslugaPar_id")
+                if record_id is not None:
+                    if record_id in seen_ids:
+                        continue
+                    seen_ids.add(record_id)
+                unique_results.append(record)
+
+            if len(unique_results) < len(current_page_results):
+                logger.debug(f"Отброшено дублей: {len(current_page_results) - len(unique_results)}")
+            if unique_results:
+                yield unique_results
+
+            # Если API вернуло меньше записей, чем мы просили, это была последняя страница.
+            if len(current_page_results) < paginator_limit:
+                logger.debug("Это была последняя страница, завершаем сбор.")
+                break
+
+            schedule_next_page()
+    finally:
+        # Спекулятивные запросы за пределами последней страницы больше не нужны
+        for _, task in in_flight:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
+
+
 async def fetch_period_data(
         period: str,
         department_id: str,
         gateway_service: GatewayService
 ) -> list:
-    paginator_limit = settings.REQUEST_PAGINATOR_LIMIT
     all_records = []
-    start = 0
-    page_number = 1
-
-    while True:
-        logger.debug(f"Запрашиваем страницу №{page_number} (смещение: {start})...")
-
-        payload = {
-            "params": {"c": "Search", "m": "searchData"},
-            "data": {
-                "PersonPeriodicType_id": 1,
-                "SearchFormType": "EvnUslugaPar",
-                "EvnUslugaPar_setDate_Range": period,
-                "SearchType_id": 1,
-                "Part_of_the_study": "false",
-                "PersonCardStateType_id": 1,
-                "PrivilegeStateType_id": 1,
-                "limit": paginator_limit,
-                "start": start,
-                "LpuSection_uid": department_id
-            }
-        }
-
-        response_json = await gateway_service.make_request(method="post", json=payload)
-        current_page_results = response_json.get("data", [])
-
-        # Если текущая страница пуста, значит, данные закончились.
-        if not current_page_results:
-            logger.debug("Получена пустая страница, завершаем сбор.")
-            break
 
+    async for page in iter_period_pages(period, department_id, gateway_service):
         # Добавляем полученные результаты в общий список
-        all_records.extend(current_page_results)
-        logger.debug(f"Получено {len(current_page_results)} записей. Всего собрано: {len(all_records)}.")
-
-        # Если API вернуло меньше записей, чем мы просили, это была последняя страница.
-        if len(current_page_results) < paginator_limit:
-            logger.debug("Это была последняя страница, завершаем сбор.")
-            break
-
-        start += paginator_limit
-        page_number += 1
+        all_records.extend(page)
+        logger.debug(f"Получено {len(page)} записей. Всего собрано: {len(all_records)}.")
 
     logger.info(f"Сбор данных завершен. Итоговое количество записей: {len(all_records)}.")
     return all_records
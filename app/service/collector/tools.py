@@ -3,11 +3,56 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
+from pydantic import ValidationError
 from sqlmodel import select, func
+from sqlalchemy import Integer
+import asyncio
 import time
+import datetime
+from typing import Optional
 
 from app.model import TestResult
-from app.core import logger
+from app.core import logger, get_settings
+from app.core.metrics import DB_BATCH_DURATION, DB_BATCH_ROWS_TOTAL
+from app.core.profiler import profile_count
+from app.core.tracing import trace_span
+from app.service.dbase.stats import collect_stats_deltas, add_stats_deltas
+from app.service.dbase.analytes import build_analyte_rows, save_analytes
+
+settings = get_settings()
+
+
+def validate_records(records_as_dicts: list[dict[str, any]]) -> list[TestResult]:
+    """
+    Принимает список словарей, проверяет каждый из них с помощью модели TestResult.
+    - Пропускает невалидные записи и логирует ошибки.
+    - Возвращает список валидных экземпляров модели TestResult.
+    """
+    if not records_as_dicts:
+        return []
+
+    logger.info(f"Начата валидация {len(records_as_dicts)} записей.")
+    validated_records = []
+
+    for record_dict in records_as_dicts:
+        try:
+            validated_model = TestResult.model_validate(record_dict)
+            validated_records.append(validated_model)
+        except ValidationError as e:
+            logger.warning(
+                f"Пропуск записи из-за ошибки валидации. "
+                f"Данные: {record_dict}. Ошибка: {e}"
+            )
+            continue
+
+    logger.info(
+        f"Валидация завершена. "
+        f"Успешно: {len(validated_records)}. "
+        f"Отброшено: {len(records_as_dicts) - len(validated_records)}."
+    )
+
+    return validated_records
+
 
 async def process_and_save_in_batches(
         validated_records: list[TestResult],
@@ -17,6 +62,8 @@ async def process_and_save_in_batches(
     """
     Принимает список ВАЛИДИРОВАННЫХ моделей TestResult и сохраняет их в БД пакетами,
     пропуская дубликаты на основе уникального индекса 'uq_patient_service'.
+    Вставленные записи в той же транзакции учитываются в сводке test_results_stats,
+    а из результатов отделений ANALYTE_PREFIXES извлекаются показатели (test_result_analytes).
     """
     if not validated_records:
         return {"inserted": 0, "skipped": []}
@@ -42,7 +89,15 @@ async def process_and_save_in_batches(
         if not records_to_insert:
             continue
 
+        batch_start = time.perf_counter()
         try:
+            # Показатели разбираются до INSERT и вне цикла событий: HTML еще в открытом виде в моделях пакета.
+            # id записей известны только после вставки, поэтому строки пока привязаны к ключу записи
+            pending_analyte_rows = await asyncio.to_thread(build_analyte_rows, (
+                (key, rec.test_date, rec.test_result) for key, rec in key_to_record_map.items()
+                if rec.is_result and rec.prefix in settings.ANALYTE_PREFIXES
+            ))
+
             statement = insert(TestResult).values(records_to_insert)
 
             # Правильно ссылаемся на уникальный ИНДЕКС через index_elements
@@ -50,22 +105,47 @@ async def process_and_save_in_batches(
                 constraint='uq_patient_service_hash'
             )
 
+            # Первые 7 столбцов - ключ записи, затем для сводки (размер шифротекста считает БД) и id
             statement = statement.returning(
                 TestResult.test_id, TestResult.last_name, TestResult.first_name, TestResult.middle_name,
-                TestResult.birthday, TestResult.test_date, TestResult.test_code
+                TestResult.birthday, TestResult.test_date, TestResult.test_code,
+                TestResult.prefix, TestResult.is_result, func.octet_length(TestResult.test_result, type_=Integer),
+                TestResult.id
             )
 
-            result_proxy = await session.execute(statement)
-            inserted_rows = result_proxy.all()
+            with trace_span("db"):
+                result_proxy = await session.execute(statement)
+                inserted_rows = result_proxy.all()
+                await add_stats_deltas(session, collect_stats_deltas(
+                    (row[5], row[7], row[8], row[9]) for row in inserted_rows
+                ))
+
+            inserted_ids = {tuple(row[:7]): row[10] for row in inserted_rows}
+            analyte_rows = [
+                {**analyte_row, "result_id": inserted_ids[analyte_row["result_id"]]}
+                for analyte_row in pending_analyte_rows if analyte_row["result_id"] in inserted_ids
+            ]
+            if analyte_rows:
+                with trace_span("db"):
+                    await save_analytes(session, analyte_rows)
             total_inserted += len(inserted_rows)
 
-            inserted_keys = {tuple(row) for row in inserted_rows}
+            inserted_keys = set(inserted_ids)
             skipped_keys = attempted_keys - inserted_keys # noqa
 
             if skipped_keys:
                 batch_skipped = [key_to_record_map[key] for key in skipped_keys]
                 all_skipped_records.extend(batch_skipped)
 
+            profile_count("records_inserted", len(inserted_rows))
+            profile_count("bytes_stored", sum(
+                len((key_to_record_map[key].test_result or "").encode("utf-8")) for key in inserted_keys
+            ))
+
+            DB_BATCH_DURATION.observe(time.perf_counter() - batch_start)
+            DB_BATCH_ROWS_TOTAL.labels("inserted").inc(len(inserted_rows))
+            DB_BATCH_ROWS_TOTAL.labels("skipped").inc(len(skipped_keys))
+
             logger.info(
                 f"Обработан пакет {i // batch_size + 1}. Попытка: {len(batch)}. Вставлено новых: {len(inserted_rows)}.")
 
@@ -78,9 +158,10 @@ async def process_and_save_in_batches(
     return {"inserted": total_inserted, "skipped": all_skipped_records}
 
 
-async def full_audit_dbase(batch_size: int = 1000) -> dict:
+async def full_audit_dbase(batch_size: int = 1000, date_from: Optional[datetime.date] = None) -> dict:
     """
     Выполняет полный аудит базы данных на предмет целостности зашифрованных данных.
+    Если передан date_from, проверяются только записи с test_date >= date_from.
     1. Проверяет записи с is_result=True на:
     1.1 None
     1.2 Короткую длину (< 5 символов)
@@ -91,12 +172,14 @@ async def full_audit_dbase(batch_size: int = 1000) -> dict:
         start_time = time.time()
         logger.info(f"ЗАПУСК ПОЛНОГО АУДИТА. Размер пачки: {batch_size}")
 
+        period_filter = [TestResult.test_date >= date_from] if date_from else []
+
         # Подсчет записей с пустым результатом исследований (is_result = False) ---
-        query_empty = select(func.count()).where(TestResult.is_result == False)
+        query_empty = select(func.count()).where(TestResult.is_result == False, *period_filter)
         empty_count = (await session.exec(query_empty)).one() # noqa
 
         # Проверка целостности заполненных результатов (is_result = True) ---
-        query_completed = select(func.count()).where(TestResult.is_result == True)
+        query_completed = select(func.count()).where(TestResult.is_result == True, *period_filter)
         completed_count = (await session.exec(query_completed)).one() # noqa
 
         suspicious_records = []
@@ -106,7 +189,7 @@ async def full_audit_dbase(batch_size: int = 1000) -> dict:
         while True:
             statement = (
                 select(TestResult)
-                .where(TestResult.is_result == True)
+                .where(TestResult.is_result == True, *period_filter)
                 .order_by(TestResult.id)
                 .offset(offset)
                 .limit(batch_size)
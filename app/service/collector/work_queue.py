@@ -0,0 +1,165 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class ClaimedUnit:
+    id: int
+    day: datetime.date
+    prefix: str
+    attempts: int
+    max_attempts: int
+
+
+async def enqueue_units(session: AsyncSession, days: list[datetime.date], prefixes: list[str]) -> int:
+    """
+    Ставит в очередь единицы (день, отделение). Уже существующие единицы, которые сейчас
+    не выполняются, переводятся обратно в pending со сброшенным счетчиком попыток.
+    """
+    rows = [
+        {"day": day, "prefix": prefix, "max_attempts": settings.QUEUE_MAX_ATTEMPTS}
+        for day in days for prefix in prefixes
+    ]
+    if not rows:
+        return 0
+
+    await session.execute(
+        text("""
+            INSERT INTO collection_units (day, prefix, status, attempts, max_attempts)
+            VALUES (:day, :prefix, 'pending', 0, :max_attempts)
+            ON CONFLICT ON CONSTRAINT uq_collection_unit DO UPDATE
+            SET status = 'pending', attempts = 0, lease_until = NULL, last_error = NULL,
+                max_attempts = EXCLUDED.max_attempts, updated_at = now()
+            WHERE collection_units.status <> 'running'
+        """),
+        rows
+    )
+    await session.commit()
+    logger.info(f"[Очередь] Поставлено в очередь единиц: {len(rows)}")
+    return len(rows)
+
+
+async def claim_unit(session: AsyncSession, worker_id: str) -> Optional[ClaimedUnit]:
+    """
+    Забирает одну свободную единицу: pending, у которой истекла задержка повтора,
+    или running, чья аренда истекла (воркер упал). Конкурентные воркеры не блокируют
+    друг друга благодаря FOR UPDATE SKIP LOCKED.
+    """
+    result = await session.execute(
+        text("""
+            UPDATE collection_units
+            SET status = 'running', attempts = attempts + 1, worker_id = :worker_id,
+                lease_until = now() + make_interval(secs => :lease), updated_at = now()
+            WHERE id = (
+                SELECT id FROM collection_units
+                WHERE (status = 'pending' AND (lease_until IS NULL OR lease_until < now()))
+                   OR (status = 'running' AND lease_until < now())
+                ORDER BY day, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, day, prefix, attempts, max_attempts
+        """),
+        {"worker_id": worker_id, "lease": float(settings.QUEUE_LEASE_SECONDS)}
+    )
+    row = result.first()
+    await session.commit()
+    return ClaimedUnit(*row) if row else None
+
+
+async def extend_lease(session: AsyncSession, unit_id: int, worker_id: str) -> bool:
+    """
+    Продлевает аренду единицы, пока воркер продолжает над ней работать.
+    Возвращает False, если единица уже не принадлежит воркеру (аренда истекла и ее забрал другой).
+    """
+    result = await session.execute(
+        text("""
+            UPDATE collection_units
+            SET lease_until = now() + make_interval(secs => :lease), updated_at = now()
+            WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+        """),
+        {"id": unit_id, "worker_id": worker_id, "lease": float(settings.QUEUE_LEASE_SECONDS)}
+    )
+    await session.commit()
+    return result.rowcount > 0
+
+
+async def complete_unit(session: AsyncSession, unit_id: int, worker_id: str) -> bool:
+    """
+    Отмечает единицу выполненной, только если она все еще в работе у этого воркера.
+    Возвращает False, если аренда истекла и единицу забрал другой воркер.
+    """
+    result = await session.execute(
+        text("""
+            UPDATE collection_units SET status = 'done', lease_until = NULL, updated_at = now()
+            WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+        """),
+        {"id": unit_id, "worker_id": worker_id}
+    )
+    await session.commit()
+    if not result.rowcount:
+        logger.warning(f"[Очередь] Единица {unit_id} уже не принадлежит воркеру {worker_id}, завершение пропущено")
+    return result.rowcount > 0
+
+
+async def fail_unit(session: AsyncSession, unit: ClaimedUnit, worker_id: str, error: str) -> bool:
+    """
+    Возвращает единицу в очередь с задержкой QUEUE_RETRY_DELAY_SECONDS,
+    либо переводит в dead, если попытки исчерпаны.
+    Как и complete_unit, не трогает единицу, которую уже забрал другой воркер.
+    """
+    dead = unit.attempts >= unit.max_attempts
+    result = await session.execute(
+        text("""
+            UPDATE collection_units
+            SET status = :status, last_error = :error, updated_at = now(),
+                lease_until = CASE WHEN :dead THEN NULL ELSE now() + make_interval(secs => :delay) END
+            WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+        """),
+        {
+            "id": unit.id,
+            "worker_id": worker_id,
+            "status": "dead" if dead else "pending",
+            "dead": dead,
+            "error": error,
+            "delay": float(settings.QUEUE_RETRY_DELAY_SECONDS),
+        }
+    )
+    await session.commit()
+
+    if not result.rowcount:
+        logger.warning(f"[Очередь] Единица {unit.id} уже не принадлежит воркеру {worker_id}, ошибка не записана: {error}")
+        return False
+
+    if dead:
+        logger.error(f"[Очередь] Единица {unit.day} / {unit.prefix} переведена в dead: {error}")
+    else:
+        logger.warning(
+            f"[Очередь] Единица {unit.day} / {unit.prefix} вернется в очередь "
+            f"(попытка {unit.attempts}/{unit.max_attempts}): {error}"
+        )
+    return True
+
+
+async def count_units(session: AsyncSession, days: list[datetime.date], prefixes: list[str]) -> dict[str, int]:
+    """Возвращает количество единиц по статусам в пределах указанных дней и отделений."""
+    result = await session.execute(
+        text("""
+            SELECT status, count(*) FROM collection_units
+            WHERE day = ANY(:days) AND prefix = ANY(:prefixes)
+            GROUP BY status
+        """),
+        {"days": days, "prefixes": prefixes}
+    )
+    counts = {status: count for status, count in result.all()}
+    # Закрываем транзакцию, чтобы при опросе соединение не висело в "idle in transaction"
+    await session.commit()
+    return counts
@@ -0,0 +1,160 @@
+"""
+Структурированные показатели лабораторных результатов (test_result_analytes).
+Новые записи разбираются при вставке (process_and_save_in_batches), уже сохраненные - догрузкой.
+Запуск догрузки вручную: python -m app.service.dbase.analytes [ДД.ММ.ГГГГ - с какой даты]
+"""
+import asyncio
+import datetime
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import and_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.model import TestResult, TestResultAnalyte, RequestPatientTrends
+from app.service.utils.utils import extract_analytes
+
+settings = get_settings()
+
+# 9 параметров на строку: укладываемся в лимит 32767 параметров запроса asyncpg
+INSERT_CHUNK_SIZE = 3000
+
+
+def build_analyte_rows(results: Iterable[tuple[Any, datetime.date, Optional[str]]]) -> list[dict]:
+    """
+    Разбирает HTML результатов (id, test_date, test_result) в строки test_result_analytes.
+    Вместо id можно передать любой ключ записи - он попадет в result_id как есть.
+    """
+    rows = []
+    for result_id, test_date, html in results:
+        if not html:
+            continue
+        for position, analyte in enumerate(extract_analytes(html)):
+            rows.append({
+                "result_id": result_id,
+                "test_date": test_date,
+                "position": position,
+                "analyte": analyte.name,
+                "value": analyte.value,
+                "value_text": analyte.value_text,
+                "unit": analyte.unit,
+                "reference": analyte.reference,
+                "ref_low": analyte.ref_low,
+                "ref_high": analyte.ref_high,
+            })
+    return rows
+
+
+async def save_analytes(session: AsyncSession, rows: list[dict]) -> int:
+    """Сохраняет показатели в текущей транзакции; уже извлеченные строки пропускаются. Возвращает число вставленных."""
+    inserted = 0
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        statement = insert(TestResultAnalyte).values(rows[i:i + INSERT_CHUNK_SIZE]).on_conflict_do_nothing(
+            constraint="uq_test_result_analytes_position"
+        )
+        result = await session.execute(statement)
+        inserted += result.rowcount
+    return inserted
+
+
+async def backfill_analytes(date_from: Optional[datetime.date] = None, batch_size: Optional[int] = None) -> dict:
+    """
+    Извлекает показатели из уже сохраненных результатов отделений ANALYTE_PREFIXES.
+    Проход по (test_date, id) пакетами; каждый пакет - отдельная транзакция,
+    повторный запуск безопасен (строки с тем же (result_id, test_date, position) пропускаются).
+    """
+    batch_size = batch_size or settings.ANALYTE_BACKFILL_BATCH_SIZE
+    start_time = time.perf_counter()
+    cursor = (date_from or datetime.date.min, 0)
+    report = {"results": 0, "analytes": 0}
+    logger.info(f"[Показатели] Начата догрузка с {date_from or 'начала'}, пакет {batch_size}")
+
+    while True:
+        async with AsyncSession(engine) as session:
+            statement = (
+                select(TestResult.id, TestResult.test_date, TestResult.test_result)
+                .where(
+                    TestResult.is_result == True,  # noqa
+                    TestResult.prefix.in_(settings.ANALYTE_PREFIXES),
+                    tuple_(TestResult.test_date, TestResult.id) > cursor,
+                )
+                .order_by(TestResult.test_date, TestResult.id)
+                .limit(batch_size)
+            )
+            # Расшифровка test_result происходит при получении строк
+            results = (await session.execute(statement)).all()
+            if not results:
+                break
+
+            rows = await asyncio.to_thread(build_analyte_rows, results)
+            report["analytes"] += await save_analytes(session, rows)
+            await session.commit()
+
+        report["results"] += len(results)
+        cursor = (results[-1].test_date, results[-1].id)
+        logger.info(f"[Показатели] Обработано результатов {report['results']}, добавлено показателей {report['analytes']}")
+
+    report["duration"] = round(time.perf_counter() - start_time, 2)
+    logger.info(f"[Показатели] Догрузка завершена: {report}")
+    return report
+
+
+async def find_patient_trends(request: RequestPatientTrends, session: AsyncSession) -> dict:
+    """
+    Динамика показателей пациента за последние request.months месяцев, сгруппированная по показателю.
+    Читаются только строки test_result_analytes пациента; HTML результатов не расшифровывается.
+    Показатели зашифрованы, поэтому фильтр по названию и сортировка выполняются после расшифровки.
+    """
+    birthday = datetime.datetime.strptime(request.birthday, '%d.%m.%Y').date()
+    date_from = datetime.date.today() - datetime.timedelta(days=request.months * 31)
+
+    statement = (
+        select(
+            TestResultAnalyte.analyte, TestResultAnalyte.test_date, TestResultAnalyte.position,
+            TestResultAnalyte.value, TestResultAnalyte.value_text, TestResultAnalyte.unit,
+            TestResultAnalyte.reference, TestResultAnalyte.ref_low, TestResultAnalyte.ref_high,
+        )
+        .join(TestResult, and_(
+            TestResult.id == TestResultAnalyte.result_id,
+            TestResult.test_date == TestResultAnalyte.test_date,
+        ))
+        .where(
+            TestResult.last_name == request.last_name,
+            TestResult.first_name == request.first_name,
+            TestResult.middle_name == (request.middle_name or ""),
+            TestResult.birthday == birthday,
+            TestResultAnalyte.test_date >= date_from,
+        )
+    )
+
+    rows = (await session.execute(statement)).all()
+    if request.analyte:
+        analyte_filter = request.analyte.strip().lower()
+        rows = [row for row in rows if row.analyte.lower() == analyte_filter]
+    rows.sort(key=lambda row: (row.analyte, row.test_date, row.position))
+
+    trends = defaultdict(list)
+    for row in rows:
+        trends[row.analyte].append({
+            "date": row.test_date.isoformat(),
+            "value": row.value,
+            "value_text": row.value_text,
+            "unit": row.unit,
+            "reference": row.reference,
+            "ref_low": row.ref_low,
+            "ref_high": row.ref_high,
+        })
+
+    logger.info(f"Динамика показателей: {request.last_name}, показателей {len(trends)}, точек {len(rows)}")
+    return {"success": True, "result": dict(trends)}
+
+
+if __name__ == "__main__":
+    start_date = datetime.datetime.strptime(sys.argv[1], "%d.%m.%Y").date() if len(sys.argv) > 1 else None
+    asyncio.run(backfill_analytes(start_date))
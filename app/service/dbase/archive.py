@@ -0,0 +1,210 @@
+"""
+Холодный архив test_results: месяцы старше ARCHIVE_AFTER_MONTHS переносятся в parquet-файлы
+(OUTPUT_FOLDER/archive). Зашифрованные столбцы переносятся шифротекстом, как лежат в БД.
+Запуск вручную: python -m app.service.dbase.archive
+"""
+import asyncio
+import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.core.encryption import EncryptedString
+from app.model import TestResult, ArchivedPatientIndex
+from app.service.dbase.partitions import TABLE_NAME, partition_name, is_partitioned, month_start, next_month
+from app.service.dbase.stats import subtract_stats
+
+settings = get_settings()
+
+# Порядок и типы столбцов файла архива совпадают с таблицей test_results
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("person_id", pa.string()),
+    ("last_name", pa.string()),
+    ("first_name", pa.string()),
+    ("middle_name", pa.string()),
+    ("birthday", pa.date32()),
+    ("test_id", pa.string()),
+    ("prefix", pa.string()),
+    ("test_date", pa.date32()),
+    ("service", pa.string()),
+    ("analyzer_name", pa.string()),
+    ("test_code", pa.string()),
+    ("test_name", pa.string()),
+    ("is_result", pa.bool_()),
+    ("test_result", pa.string()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+])
+ENCRYPTED_COLUMNS = ("test_name", "test_result")
+STREAM_BATCH_SIZE = 5000
+
+_decryptor = EncryptedString()
+
+
+def archive_folder() -> Path:
+    folder = Path(settings.OUTPUT_FOLDER) / "archive"
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def _archive_cutoff() -> datetime.date:
+    """Первое число месяца, с которого данные остаются в БД."""
+    cutoff = month_start(datetime.date.today())
+    for _ in range(settings.ARCHIVE_AFTER_MONTHS):
+        cutoff = month_start(cutoff - datetime.timedelta(days=1))
+    return cutoff
+
+
+async def archive_month(month: datetime.date) -> int:
+    """
+    Переносит записи месяца в parquet-файл, заполняет индекс по пациентам, вычитает записи из сводки
+    и удаляет их из БД (для секционированной таблицы - удаляет секцию целиком).
+    Все изменения БД - одна транзакция.
+    Возвращает число перенесенных записей.
+    """
+    month = month_start(month)
+    # Отметка времени в имени: записи, досланные за уже архивный месяц, попадут в отдельный файл
+    file_name = f"{TABLE_NAME}_{month:%Y_%m}_{datetime.datetime.now():%Y%m%d%H%M%S}.parquet"
+    file_path = archive_folder() / file_name
+    tmp_path = file_path.with_suffix(".parquet.tmp")
+    params = {"month_from": month, "month_to": next_month(month)}
+    where = "test_date >= :month_from AND test_date < :month_to"
+
+    async with engine.begin() as conn:
+        partition = partition_name(month)
+        drop_partition = await is_partitioned(conn) and (await conn.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": partition}
+        )).scalar()
+        if drop_partition:
+            # Запрещаем запись в секцию до конца переноса, чтение остается доступным
+            await conn.execute(text(f"LOCK TABLE {partition} IN EXCLUSIVE MODE"))
+
+        ids = []
+        writer = pq.ParquetWriter(tmp_path, ARCHIVE_SCHEMA, compression="zstd")
+        try:
+            result = await conn.stream(
+                text(f"SELECT {', '.join(ARCHIVE_SCHEMA.names)} FROM {TABLE_NAME} WHERE {where} ORDER BY id"),
+                params
+            )
+            async for rows in result.mappings().partitions(STREAM_BATCH_SIZE):
+                batch = [dict(row) for row in rows]
+                ids.extend(row["id"] for row in batch)
+                table = pa.Table.from_pylist(batch, schema=ARCHIVE_SCHEMA)
+                await asyncio.to_thread(writer.write_table, table)
+        finally:
+            writer.close()
+
+        if not ids:
+            tmp_path.unlink(missing_ok=True)
+            return 0
+
+        tmp_path.replace(file_path)
+        written = pq.read_metadata(file_path).num_rows
+        if written != len(ids):
+            raise RuntimeError(f"В архив {file_name} записано {written} строк вместо {len(ids)}")
+
+        await conn.execute(text(
+            "INSERT INTO archive_patient_index "
+            "(last_name, first_name, middle_name, birthday, month, file_name, records) "
+            "SELECT last_name, first_name, middle_name, birthday, "
+            "CAST(:month_from AS date), CAST(:file_name AS varchar), count(*) "
+            f"FROM {TABLE_NAME} WHERE {where} AND id = ANY(:ids) "
+            "GROUP BY last_name, first_name, middle_name, birthday"
+        ), {**params, "file_name": file_name, "ids": ids})
+
+        await subtract_stats(conn, f"{where} AND id = ANY(:ids)", {**params, "ids": ids})
+        # Показатели выводятся из HTML, который остается в архиве; в БД они больше не нужны
+        await conn.execute(
+            text(f"DELETE FROM test_result_analytes WHERE {where} AND result_id = ANY(:ids)"), {**params, "ids": ids}
+        )
+
+        if drop_partition:
+            await conn.execute(text(f"DROP TABLE {partition}"))
+        else:
+            await conn.execute(text(f"DELETE FROM {TABLE_NAME} WHERE {where} AND id = ANY(:ids)"), {**params, "ids": ids})
+
+    logger.info(f"[Архив] {month:%m.%Y}: перенесено записей {len(ids)} в {file_name}")
+    return len(ids)
+
+
+async def archive_old_results() -> dict:
+    """Переносит в архив все месяцы старше ARCHIVE_AFTER_MONTHS."""
+    cutoff = _archive_cutoff()
+    async with engine.connect() as conn:
+        months = (await conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', test_date)::date FROM {TABLE_NAME} "
+            "WHERE test_date < :cutoff ORDER BY 1"
+        ), {"cutoff": cutoff})).scalars().all()
+
+    archived = {}
+    for month in months:
+        archived[month.strftime("%m.%Y")] = await archive_month(month)
+
+    logger.info(f"[Архив] Граница архива: {cutoff}. Перенесено месяцев: {len(archived)}")
+    return {"cutoff": cutoff.isoformat(), "months": archived}
+
+
+async def archive_old_results_job():
+    """Периодическая задача планировщика: перенос старых месяцев в архив."""
+    try:
+        await archive_old_results()
+    except Exception as e:
+        logger.error(f"[Архив] Ошибка переноса в архив: {e}", exc_info=True)
+
+
+def _read_archived_rows(file_names: list[str], filters: list[tuple]) -> list[dict]:
+    rows = []
+    for file_name in file_names:
+        file_path = archive_folder() / file_name
+        if not file_path.exists():
+            logger.warning(f"[Архив] Файл {file_name} из индекса не найден")
+            continue
+        rows.extend(pq.read_table(file_path, filters=filters).to_pylist())
+    return rows
+
+
+async def find_archived_records(
+        session: AsyncSession,
+        last_name: str,
+        first_name: str,
+        middle_name: str,
+        birthday: datetime.date
+) -> list[TestResult]:
+    """
+    Ищет записи пациента в холодном архиве: по индексу выбирает файлы, читает из них только
+    строки пациента и расшифровывает test_name/test_result так же, как при чтении из БД.
+    """
+    statement = select(ArchivedPatientIndex.file_name).where(
+        ArchivedPatientIndex.last_name == last_name,
+        ArchivedPatientIndex.first_name == first_name,
+        ArchivedPatientIndex.middle_name == middle_name,
+        ArchivedPatientIndex.birthday == birthday
+    ).distinct()
+    file_names = list((await session.exec(statement)).all())
+    if not file_names:
+        return []
+
+    filters = [
+        ("last_name", "=", last_name),
+        ("first_name", "=", first_name),
+        ("middle_name", "=", middle_name),
+        ("birthday", "=", birthday),
+    ]
+    rows = await asyncio.to_thread(_read_archived_rows, file_names, filters)
+
+    records = []
+    for row in rows:
+        for column in ENCRYPTED_COLUMNS:
+            row[column] = _decryptor.process_result_value(row[column], None)
+        records.append(TestResult.model_validate(row))
+    return records
+
+
+if __name__ == "__main__":
+    asyncio.run(archive_old_results())
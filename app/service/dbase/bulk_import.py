@@ -0,0 +1,161 @@
+"""
+Массовая загрузка результатов из JSON/NDJSON файлов (отчеты о пропущенных записях, выгрузки
+другого экземпляра, восстановленные ответы шлюза) без обращения к шлюзу.
+Показатели (test_result_analytes) для импортированных записей заполняет догрузка
+app.service.dbase.analytes.
+Запуск вручную: python -m app.service.dbase.bulk_import <путь к файлу>
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.core.encryption import EncryptedString
+from app.model import TestResult, TestResultBase
+from app.service.dbase.partitions import ensure_partitions
+from app.service.dbase.stats import collect_stats_deltas, add_stats_deltas
+
+settings = get_settings()
+
+IMPORT_COLUMNS = [column.name for column in TestResult.__table__.columns if column.name not in ("id", "created_at")]
+ENCRYPTED_COLUMNS = ("test_name", "test_result")
+MAX_INVALID_EXAMPLES = 10
+
+_encryptor = EncryptedString()
+
+
+def _iter_rows(file_path: Path) -> Iterator[tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Отдает (номер строки/элемента, запись, ошибка разбора).
+    NDJSON (.ndjson, .jsonl) читается построчно; обычный JSON (массив) загружается целиком.
+    """
+    if file_path.suffix in (".ndjson", ".jsonl"):
+        with open(file_path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line), None
+                except json.JSONDecodeError as e:
+                    yield line_number, None, f"Некорректный JSON: {e}"
+        return
+
+    with open(file_path, encoding="utf-8") as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        data = [data]
+    for number, row in enumerate(data, start=1):
+        yield number, row, None
+
+
+def _read_batch(rows: Iterator, batch_size: int) -> list:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+def _prepare_batch(raw_rows: list, report: dict) -> list[tuple]:
+    """Проверяет записи моделью TestResultBase и шифрует test_name/test_result. Выполняется в потоке."""
+    prepared = []
+    for number, row, parse_error in raw_rows:
+        error = parse_error
+        if error is None:
+            try:
+                values = TestResultBase.model_validate(row).model_dump()
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+        if error is not None:
+            report["invalid"] += 1
+            if len(report["invalid_examples"]) < MAX_INVALID_EXAMPLES:
+                report["invalid_examples"].append({"row": number, "error": error})
+            continue
+
+        for column in ENCRYPTED_COLUMNS:
+            values[column] = _encryptor.process_bind_param(values[column], None)
+        prepared.append(tuple(values.get(column) for column in IMPORT_COLUMNS))
+    return prepared
+
+
+async def _load_batch(rows: list[tuple]) -> int:
+    """
+    Загружает пакет через COPY во временную таблицу и переносит в test_results
+    с пропуском дубликатов по uq_patient_service_hash. Возвращает число вставленных записей.
+    """
+    test_date_index = IMPORT_COLUMNS.index("test_date")
+    test_dates = [row[test_date_index] for row in rows]
+    await ensure_partitions(min(test_dates), max(test_dates))
+
+    columns = ", ".join(IMPORT_COLUMNS)
+    async with AsyncSession(engine) as session:
+        await session.exec(text(
+            f"CREATE TEMP TABLE import_stage ON COMMIT DROP AS SELECT {columns} FROM test_results WITH NO DATA"
+        ))
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "import_stage", records=rows, columns=IMPORT_COLUMNS
+        )
+
+        result = await session.exec(text(
+            f"INSERT INTO test_results ({columns}) SELECT {columns} FROM import_stage "
+            "ON CONFLICT ON CONSTRAINT uq_patient_service_hash DO NOTHING "
+            "RETURNING test_date, prefix, is_result, octet_length(test_result)"
+        ))
+        inserted_rows = result.all()
+        await add_stats_deltas(session, collect_stats_deltas(inserted_rows))
+        await session.commit()
+
+    return len(inserted_rows)
+
+
+async def import_results_file(file_path: Path, batch_size: Optional[int] = None) -> dict:
+    """
+    Импортирует файл пакетами по IMPORT_BATCH_SIZE: проверка -> шифрование -> COPY -> слияние.
+    Каждый пакет - отдельная транзакция, поэтому повторный запуск после сбоя безопасен.
+    Возвращает отчет: вставлено / дубликаты / невалидные (с примерами ошибок).
+    """
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail=f"Файл не найден: {file_path}")
+
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    report = {"file": str(file_path), "total": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "invalid_examples": []}
+    logger.info(f"[Импорт] Начат импорт {file_path}, пакет {batch_size}")
+
+    rows = _iter_rows(file_path)
+    while True:
+        raw_rows = await asyncio.to_thread(_read_batch, rows, batch_size)
+        if not raw_rows:
+            break
+        report["total"] += len(raw_rows)
+
+        prepared = await asyncio.to_thread(_prepare_batch, raw_rows, report)
+        if prepared:
+            inserted = await _load_batch(prepared)
+            report["inserted"] += inserted
+            report["duplicates"] += len(prepared) - inserted
+
+        logger.info(
+            f"[Импорт] Обработано {report['total']}: вставлено {report['inserted']}, "
+            f"дубликатов {report['duplicates']}, невалидных {report['invalid']}"
+        )
+
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Использование: python -m app.service.dbase.bulk_import <путь к файлу>")
+    import_report = asyncio.run(import_results_file(Path(sys.argv[1])))
+    logger.info(f"[Импорт] Итог: {json.dumps(import_report, ensure_ascii=False)}")
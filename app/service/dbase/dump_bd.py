@@ -1,5 +1,9 @@
 import asyncio
 import os
+import shutil
+import sys
+import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -11,10 +15,84 @@ from app.core.logger_setup import logger
 
 settings = get_settings()
 
+
+def _pg_connection_args() -> list[str]:
+    return [
+        "-U", settings.POSTGRES_USER,
+        "-h", settings.POSTGRES_HOST,
+        "-p", str(settings.POSTGRES_PORT),
+        "--dbname", settings.POSTGRES_DB,
+        "--no-password",  # Явно говорим не запрашивать пароль
+    ]
+
+
+def _pg_env() -> dict:
+    # Важно: пароль передаем через переменную окружения PGPASSWORD
+    # для безопасности, чтобы он не отображался в процессах системы.
+    env = os.environ.copy()
+    env["PGPASSWORD"] = settings.POSTGRES_PASSWORD
+    return env
+
+
+async def _run_pg_tool(command: list[str], label: str, log_progress: bool = True) -> tuple[int, str, list[str]]:
+    """
+    Запускает pg_dump/pg_restore и построчно передает его stderr (прогресс в режиме -v) в лог
+    по мере поступления, не накапливая вывод в памяти.
+    Возвращает код завершения, stdout (только для коротких выводов вроде --list) и последние строки stderr.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=_pg_env()
+    )
+
+    tail = deque(maxlen=20)
+
+    async def read_stderr():
+        async for raw_line in process.stderr:
+            line = raw_line.decode("utf-8", errors="replace").rstrip()
+            if not line:
+                continue
+            tail.append(line)
+            if log_progress:
+                logger.info(f"[{label}] {line}")
+
+    stderr_task = asyncio.create_task(read_stderr())
+    stdout = await process.stdout.read()
+    await stderr_task
+    await process.wait()
+    return process.returncode, stdout.decode("utf-8", errors="replace"), list(tail)
+
+
+def _path_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+    return path.stat().st_size
+
+
+def _remove_path(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+async def verify_database_dump(dump_path: Path) -> int:
+    """Проверяет читаемость архива через pg_restore --list. Возвращает число элементов оглавления."""
+    return_code, stdout, tail = await _run_pg_tool(["pg_restore", "--list", str(dump_path)], "pg_restore", False)
+    if return_code != 0:
+        raise HTTPException(status_code=500, detail=f"Дамп не прошел проверку pg_restore --list: {' '.join(tail)}")
+    return sum(1 for line in stdout.splitlines() if line and not line.startswith(";"))
+
+
 async def create_database_dump(filename: Optional[str] = None) -> dict:
     """
     Создает дамп базы данных с помощью pg_dump и сохраняет его в файл.
-    Возвращает путь к файлу в случае успеха.
+    - DUMP_FORMAT=custom: один файл (-F c); directory: каталог (-F d) с DUMP_JOBS параллельными потоками.
+    - Прогресс pg_dump пишется в лог по мере выполнения; дамп пишется во временный путь и заменяет
+      предыдущий только после успешной проверки pg_restore --list.
+    Возвращает путь, размер, длительность и скорость в случае успеха.
     """
     dump_folder = Path(settings.OUTPUT_FOLDER) / "dumps"
     dump_folder.mkdir(parents=True, exist_ok=True)
@@ -26,54 +104,101 @@ async def create_database_dump(filename: Optional[str] = None) -> dict:
         dump_filename = f"dump_{timestamp}.dump"
 
     dump_filepath = dump_folder / dump_filename
+    directory_format = settings.DUMP_FORMAT == "directory"
+    if directory_format:
+        # Для формата directory результат - каталог без расширения .dump
+        dump_filepath = dump_filepath.with_suffix("")
+    dump_filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dump_filepath.with_name(f"{dump_filepath.name}.tmp")
+    _remove_path(tmp_path)
 
     #  Формируем команду для pg_dump
-    # Важно: пароль передаем через переменную окружения PGPASSWORD
-    # для безопасности, чтобы он не отображался в процессах системы.
     pg_dump_command = [
         "pg_dump",
-        "-U", settings.POSTGRES_USER,
-        "-h", settings.POSTGRES_HOST,
-        "-p", str(settings.POSTGRES_PORT),
-        "--dbname", settings.POSTGRES_DB,
-        "--no-password", # Явно говорим не запрашивать пароль
-        "-F", "c", # Формат custom, хорошо сжимается и подходит для pg_restore
-        "-b", # Включать большие объекты (blobs)
-        "-v", # Verbose режим для логов
-        "-f", str(dump_filepath) # Указываем выходной файл
+        *_pg_connection_args(),
+        "-b",  # Включать большие объекты (blobs)
+        "-v",  # Verbose режим: прогресс идет в лог
+        "-Z", str(settings.DUMP_COMPRESSION),
+        "-f", str(tmp_path)  # Указываем выходной путь
     ]
+    if directory_format:
+        pg_dump_command += ["-F", "d", "-j", str(settings.DUMP_JOBS)]
+    else:
+        pg_dump_command += ["-F", "c"]  # Формат custom, хорошо сжимается и подходит для pg_restore
 
-    # Создаем окружение для подпроцесса, включая пароль
-    env = os.environ.copy()
-    # Если используете Pydantic SecretStr, .get_secret_value() вернет строку
-    env["PGPASSWORD"] = settings.POSTGRES_PASSWORD
-
-    logger.info(f"Начинаем создание дампа базы данных в файл: {dump_filepath}")
-
-    # Асинхронно запускаем команду
-    process = await asyncio.create_subprocess_exec(
-        *pg_dump_command,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        env=env
-    )
+    logger.info(f"Начинаем создание дампа базы данных: {dump_filepath} (формат {settings.DUMP_FORMAT})")
+    start_time = time.perf_counter()
+    return_code, _, tail = await _run_pg_tool(pg_dump_command, "pg_dump")
+    duration = time.perf_counter() - start_time
 
-    # Ожидаем завершения процесса
-    stdout, stderr = await process.communicate()
-
-    # Проверяем результат
-    if process.returncode == 0:
-        logger.info(f"Дамп базы данных успешно создан. Файл: {dump_filepath}")
-        return {
-            "success": True,
-            "message": "Дамп базы данных успешно создан.",
-            "file_path": str(dump_filepath)
-        }
-    else:
+    if return_code != 0:
         # Если pg_dump завершился с ошибкой
-        error_message = stderr.decode('utf-8').strip()
+        _remove_path(tmp_path)
+        error_message = "\n".join(tail)
         logger.error(f"Ошибка при создании дампа БД: {error_message}")
         raise HTTPException(
             status_code=500,
             detail=f"Не удалось создать дамп базы данных: {error_message}"
-        )
\ No newline at end of file
+        )
+
+    try:
+        toc_entries = await verify_database_dump(tmp_path)
+    except HTTPException:
+        _remove_path(tmp_path)
+        raise
+
+    _remove_path(dump_filepath)
+    tmp_path.rename(dump_filepath)
+
+    size_mb = _path_size(dump_filepath) / 1024 / 1024
+    throughput = size_mb / duration if duration > 0 else 0.0
+    logger.info(
+        f"Дамп базы данных успешно создан. Файл: {dump_filepath}. "
+        f"Размер: {size_mb:.1f} МБ, время: {duration:.1f}с, скорость: {throughput:.1f} МБ/с, "
+        f"элементов оглавления: {toc_entries}"
+    )
+    return {
+        "success": True,
+        "message": "Дамп базы данных успешно создан.",
+        "file_path": str(dump_filepath),
+        "size_mb": round(size_mb, 2),
+        "duration": round(duration, 2),
+        "throughput_mb_s": round(throughput, 2),
+        "toc_entries": toc_entries,
+    }
+
+
+async def restore_database_dump(dump_path: str, jobs: Optional[int] = None) -> dict:
+    """
+    Восстанавливает базу из дампа (custom или directory) через pg_restore с jobs параллельными
+    потоками (по умолчанию DUMP_JOBS). Существующие объекты пересоздаются (--clean --if-exists).
+    """
+    jobs = jobs or settings.DUMP_JOBS
+    pg_restore_command = [
+        "pg_restore",
+        *_pg_connection_args(),
+        "-v",
+        "-j", str(jobs),
+        "--clean", "--if-exists", "--no-owner",
+        str(dump_path)
+    ]
+
+    logger.info(f"Начинаем восстановление базы из {dump_path} ({jobs} потоков)")
+    start_time = time.perf_counter()
+    return_code, _, tail = await _run_pg_tool(pg_restore_command, "pg_restore")
+    duration = round(time.perf_counter() - start_time, 2)
+
+    if return_code != 0:
+        error_message = "\n".join(tail)
+        logger.error(f"Ошибка при восстановлении БД: {error_message}")
+        raise HTTPException(status_code=500, detail=f"Не удалось восстановить базу данных: {error_message}")
+
+    logger.info(f"База данных восстановлена из {dump_path} за {duration}с")
+    return {"success": True, "message": "База данных восстановлена.", "duration": duration}
+
+
+if __name__ == "__main__":
+    # python -m app.service.dbase.dump_bd restore <путь к дампу> [потоки]
+    if len(sys.argv) < 3 or sys.argv[1] != "restore":
+        sys.exit("Использование: python -m app.service.dbase.dump_bd restore <путь> [потоки]")
+    asyncio.run(restore_database_dump(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else None))
@@ -6,6 +6,8 @@ from sqlmodel import select, desc
 
 from app.model import TestResult, RequestByPatient
 from app.core.logger_setup import logger
+from app.core.tracing import trace_span
+from app.service.dbase.archive import find_archived_records
 
 CATEGORY_MAP = {
     "tests": "medtests",
@@ -56,38 +58,8 @@ def _process_category_data(tests: Sequence['TestResult']) -> dict[str, any]:
     }
 
 
-async def find_records_by_patient(
-        patient_data: RequestByPatient,
-        session: AsyncSession
-) -> Sequence[TestResult]:
-    """
-    Выполняет поиск всех записей в таблице test_results по данным пациента.
-    Возвращает список найденных записей.
-    """
-    target_birthday = datetime.datetime.strptime(patient_data.birthday, '%d.%m.%Y').date()
-
-    logger.info(
-        f"Выполняется поиск по пациенту: "
-        f"{patient_data.last_name} {patient_data.first_name}, ДР: {target_birthday}"
-    )
-
-    statement = select(TestResult).where(
-        TestResult.last_name == patient_data.last_name,
-        TestResult.first_name == patient_data.first_name,
-        TestResult.birthday == target_birthday
-    ).order_by(desc(TestResult.test_date))
-
-    if patient_data.middle_name is not None:
-        statement = statement.where(TestResult.middle_name == patient_data.middle_name)
-    else:
-        statement = statement.where(TestResult.middle_name == "")
-
-    results = await session.exec(statement)
-    found_records = results.all()
-
-    if not found_records:
-        return {"success": True, "result": {}}
-
+def _build_patient_response(found_records: Sequence[TestResult]) -> dict[str, any]:
+    """Группирует найденные записи по категориям и формирует итоговый ответ."""
     # Извлекаем информацию о пациенте
     first_record = found_records[0]
     person_info = {
@@ -111,7 +83,7 @@ async def find_records_by_patient(
         processed_categories[category_name] = _process_category_data(tests_in_category)
 
     # Собираем финальный ответ
-    final_result = {
+    return {
         "success": True,
         "result": {
             "person": person_info,
@@ -119,6 +91,53 @@ async def find_records_by_patient(
         }
     }
 
+
+async def find_records_by_patient(
+        patient_data: RequestByPatient,
+        session: AsyncSession
+) -> Sequence[TestResult]:
+    """
+    Выполняет поиск всех записей в таблице test_results по данным пациента.
+    Возвращает список найденных записей.
+    """
+    target_birthday = datetime.datetime.strptime(patient_data.birthday, '%d.%m.%Y').date()
+
+    logger.info(
+        f"Выполняется поиск по пациенту: "
+        f"{patient_data.last_name} {patient_data.first_name}, ДР: {target_birthday}"
+    )
+
+    statement = select(TestResult).where(
+        TestResult.last_name == patient_data.last_name,
+        TestResult.first_name == patient_data.first_name,
+        TestResult.birthday == target_birthday
+    ).order_by(desc(TestResult.test_date))
+
+    middle_name = patient_data.middle_name if patient_data.middle_name is not None else ""
+    statement = statement.where(TestResult.middle_name == middle_name)
+
+    # Расшифровка (спан decrypt) происходит при получении строк, поэтому входит в спан db
+    with trace_span("db"):
+        results = await session.exec(statement)
+        found_records = results.all()
+
+    # Холодный архив читается только по явному запросу полной истории
+    if patient_data.full_history:
+        with trace_span("archive"):
+            archived_records = await find_archived_records(
+                session, patient_data.last_name, patient_data.first_name, middle_name, target_birthday
+            )
+        if archived_records:
+            logger.info(f"Найдено записей в архиве: {len(archived_records)}")
+            found_records = sorted([*found_records, *archived_records], key=lambda r: r.test_date, reverse=True)
+
+    if not found_records:
+        return {"success": True, "result": {}}
+
+    with trace_span("serialize"):
+        final_result = _build_patient_response(found_records)
+
     logger.info(f"Найдено записей: {len(found_records)}")
 
     return final_result
+
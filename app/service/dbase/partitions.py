@@ -0,0 +1,162 @@
+"""
+Помесячное секционирование таблицы test_results по test_date.
+Запуск вручную:
+    python -m app.service.dbase.partitions ensure   - создать секции на PARTITION_MONTHS_AHEAD месяцев вперед
+    python -m app.service.dbase.partitions convert  - перевести существующую обычную таблицу в секционированную
+"""
+import asyncio
+import datetime
+import sys
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.model import TestResult
+
+settings = get_settings()
+
+TABLE_NAME = TestResult.__tablename__
+LEGACY_TABLE_NAME = f"{TABLE_NAME}_legacy"
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{TABLE_NAME}_p{month:%Y_%m}"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    result = await conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+    ), {"table": TABLE_NAME})
+    return bool(result.scalar())
+
+
+async def _create_partitions(conn: AsyncConnection, first_day: datetime.date, last_day: datetime.date) -> list[str]:
+    """Создает недостающие месячные секции, покрывающие [first_day, last_day]. Возвращает имена созданных."""
+    existing = set((await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": TABLE_NAME})).scalars())
+
+    created = []
+    month = month_start(first_day)
+    while month <= last_day:
+        name = partition_name(month)
+        if name not in existing:
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE_NAME} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+            created.append(name)
+        month = next_month(month)
+    return created
+
+
+async def ensure_partitions(
+        first_day: Optional[datetime.date] = None,
+        last_day: Optional[datetime.date] = None
+) -> list[str]:
+    """
+    Гарантирует наличие секций для периода [first_day, last_day] и на PARTITION_MONTHS_AHEAD месяцев
+    вперед от текущей даты. Для несекционированной таблицы ничего не делает.
+    """
+    today = datetime.date.today()
+    last_needed = today
+    for _ in range(settings.PARTITION_MONTHS_AHEAD):
+        last_needed = next_month(last_needed)
+    first_day = min(first_day or today, today)
+    last_day = max(last_day or today, last_needed)
+
+    async with engine.begin() as conn:
+        if not await is_partitioned(conn):
+            return []
+        created = await _create_partitions(conn, first_day, last_day)
+
+    if created:
+        logger.info(f"[Секции] Созданы секции {TABLE_NAME}: {', '.join(created)}")
+    return created
+
+
+async def ensure_partitions_job():
+    """Периодическая задача планировщика: заранее создает секции на следующие месяцы."""
+    try:
+        await ensure_partitions()
+    except Exception as e:
+        logger.error(f"[Секции] Не удалось создать секции: {e}", exc_info=True)
+
+
+async def convert_to_partitioned() -> dict:
+    """
+    Переводит существующую таблицу test_results в секционированную по месяцам (одна транзакция):
+    1. Старая таблица, ее индексы и последовательность id переименовываются в *_legacy.
+    2. По модели TestResult создается секционированная таблица и секции на весь диапазон данных.
+    3. Данные переносятся как есть (шифротекст не расшифровывается), последовательность id продолжается.
+    4. Старая таблица удаляется.
+    На время переноса таблица заблокирована, поэтому запускать при остановленном сборе.
+    """
+    columns = ", ".join(column.name for column in TestResult.__table__.columns)
+
+    async with engine.begin() as conn:
+        if await is_partitioned(conn):
+            logger.info(f"[Секции] Таблица {TABLE_NAME} уже секционирована.")
+            return {"status": "skipped", "message": "Table is already partitioned"}
+
+        await conn.execute(text(f"LOCK TABLE {TABLE_NAME} IN ACCESS EXCLUSIVE MODE"))
+        sequence = (await conn.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE_NAME}
+        )).scalar()
+        index_names = (await conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": TABLE_NAME}
+        )).scalars().all()
+
+        await conn.execute(text(f"ALTER TABLE {TABLE_NAME} RENAME TO {LEGACY_TABLE_NAME}"))
+        # Имена индексов (и ограничений на их основе) должны освободиться для новой таблицы
+        for index_name in index_names:
+            await conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+        if sequence:
+            await conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {LEGACY_TABLE_NAME}_id_seq"))
+
+        await conn.run_sync(lambda sync_conn: TestResult.__table__.create(sync_conn))
+
+        bounds = (await conn.execute(
+            text(f"SELECT min(test_date), max(test_date), count(*) FROM {LEGACY_TABLE_NAME}")
+        )).one()
+        first_day, last_day, total = bounds
+        created = await _create_partitions(conn, first_day or datetime.date.today(), last_day or datetime.date.today())
+
+        await conn.execute(text(
+            f"INSERT INTO {TABLE_NAME} ({columns}) SELECT {columns} FROM {LEGACY_TABLE_NAME}"
+        ))
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE_NAME}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {TABLE_NAME}), 1))"
+        ))
+        await conn.execute(text(f"DROP TABLE {LEGACY_TABLE_NAME}"))
+
+    # Секции на месяцы вперед создаются уже после переключения
+    created.extend(await ensure_partitions())
+    message = f"Таблица {TABLE_NAME} секционирована. Перенесено записей: {total}. Секций: {len(created)}."
+    logger.info(f"[Секции] {message}")
+    return {"status": "ok", "message": message, "records": total, "partitions": created}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "ensure"
+    if command == "convert":
+        asyncio.run(convert_to_partitioned())
+    elif command == "ensure":
+        asyncio.run(ensure_partitions())
+    else:
+        sys.exit(f"Неизвестная команда: {command}. Доступны: ensure, convert")
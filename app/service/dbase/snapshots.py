@@ -0,0 +1,238 @@
+"""
+Инкрементальные снимки test_results: полный дамп (база) раз в SNAPSHOT_BASE_INTERVAL_DAYS дней,
+в остальные ночи - только новые записи (id больше водяного знака прошлого снимка) в сжатых
+дельта-файлах. Цепочка описывается manifest.json в OUTPUT_FOLDER/dumps/snapshots.
+Дельты содержат только test_results: остальные таблицы (failed_results, archive_patient_index и др.)
+восстанавливаются в состоянии на момент базы, сводка и показатели (test_result_analytes)
+пересчитываются после применения дельт.
+Восстановление: python -m app.service.dbase.snapshots restore
+"""
+import asyncio
+import datetime
+import gzip
+import json
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.model import TestResult
+from app.service.dbase.analytes import backfill_analytes
+from app.service.dbase.dump_bd import create_database_dump, restore_database_dump
+from app.service.dbase.partitions import ensure_partitions
+from app.service.dbase.stats import rebuild_stats
+
+settings = get_settings()
+
+SNAPSHOT_SUBFOLDER = "snapshots"
+MANIFEST_NAME = "manifest.json"
+COLUMNS = [column.name for column in TestResult.__table__.columns]
+# Сколько ждать завершения транзакций, активных в момент чтения водяного знака
+WATERMARK_WAIT_SECONDS = 600
+
+
+def snapshot_folder() -> Path:
+    folder = Path(settings.OUTPUT_FOLDER) / "dumps" / SNAPSHOT_SUBFOLDER
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def load_manifest() -> Optional[dict]:
+    manifest_path = snapshot_folder() / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(manifest: dict):
+    manifest_path = snapshot_folder() / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path.replace(manifest_path)
+
+
+async def _current_watermark() -> int:
+    """
+    Водяной знак - max(id) закоммиченных строк. id выдается последовательностью до коммита, поэтому
+    транзакция, активная в момент чтения, может позже закоммитить строку с меньшим id. Такие строки
+    не попали бы ни в этот снимок, ни в следующую дельту (id > водяного знака), поэтому перед
+    возвратом дожидаемся завершения всех транзакций из снимка txid_current_snapshot().
+    """
+    async with engine.connect() as conn:
+        watermark, snapshot = (await conn.execute(text(
+            "SELECT COALESCE(max(id), 0), CAST(txid_current_snapshot() AS text) FROM test_results"
+        ))).one()
+
+    # Формат снимка: xmin:xmax:xip1,xip2,...
+    in_progress = [int(txid) for txid in snapshot.split(":")[2].split(",") if txid]
+    deadline = asyncio.get_running_loop().time() + WATERMARK_WAIT_SECONDS
+    while in_progress:
+        async with engine.connect() as conn:
+            statuses = (await conn.execute(
+                text("SELECT txid, txid_status(txid) FROM unnest(CAST(:txids AS bigint[])) AS txid"),
+                {"txids": in_progress}
+            )).all()
+        in_progress = [txid for txid, status in statuses if status == "in progress"]
+        if not in_progress:
+            break
+        if asyncio.get_running_loop().time() > deadline:
+            raise RuntimeError(
+                f"Снимок не создан: транзакции {in_progress} не завершились за {WATERMARK_WAIT_SECONDS}с"
+            )
+        await asyncio.sleep(1)
+
+    return watermark
+
+
+async def _create_base(timestamp: str, previous: Optional[dict]) -> dict:
+    """Полный дамп - новая база цепочки. Файлы предыдущей цепочки удаляются после успеха."""
+    # Водяной знак берется до начала дампа: все строки с id до него уже закоммичены и попадут в дамп,
+    # а вставленные во время дампа попадут и в дельту - при восстановлении повтор отсеется по ON CONFLICT
+    watermark = await _current_watermark()
+    dump_result = await create_database_dump(filename=f"{SNAPSHOT_SUBFOLDER}/base_{timestamp}.dump")
+    # В формате directory база - каталог, имя берем из фактического пути
+    base_name = Path(dump_result["file_path"]).name
+
+    manifest = {
+        "base": {"file": base_name, "watermark": watermark, "created_at": datetime.datetime.now().isoformat()},
+        "deltas": [],
+    }
+    _save_manifest(manifest)
+
+    if previous:
+        old_files = [previous["base"]["file"], *(delta["file"] for delta in previous["deltas"])]
+        for file_name in old_files:
+            old_path = snapshot_folder() / file_name
+            if old_path.is_dir():
+                shutil.rmtree(old_path)
+            else:
+                old_path.unlink(missing_ok=True)
+
+    logger.info(f"[Снимки] Создана база {base_name}, водяной знак id={watermark}")
+    return {"success": True, "message": "Создан полный снимок (база).", "file_path": str(snapshot_folder() / base_name)}
+
+
+async def _create_delta(manifest: dict, timestamp: str) -> dict:
+    """Выгружает записи с id больше водяного знака цепочки в gzip (CSV формата COPY)."""
+    chain = [manifest["base"], *manifest["deltas"]]
+    from_id = chain[-1]["watermark"]
+    delta_name = f"delta_{len(manifest['deltas']) + 1:04d}_{timestamp}.csv.gz"
+    delta_path = snapshot_folder() / delta_name
+    tmp_path = delta_path.with_suffix(".tmp")
+
+    to_id = await _current_watermark()
+    async with engine.connect() as conn:
+        bounds = (await conn.execute(text(
+            "SELECT count(*), min(test_date), max(test_date) FROM test_results WHERE id > :from_id AND id <= :to_id"
+        ), {"from_id": from_id, "to_id": to_id})).one()
+        records, date_from, date_to = bounds
+        if not records:
+            logger.info(f"[Снимки] Новых записей после id={from_id} нет, дельта не нужна")
+            return {"success": True, "message": "Новых записей нет, дельта не создана.", "file_path": None}
+
+        raw_connection = await conn.get_raw_connection()
+        with gzip.open(tmp_path, "wb", compresslevel=6) as delta_file:
+            async def write_chunk(chunk: bytes):
+                delta_file.write(chunk)
+
+            await raw_connection.driver_connection.copy_from_query(
+                f"SELECT {', '.join(COLUMNS)} FROM test_results WHERE id > $1 AND id <= $2 ORDER BY id",
+                from_id, to_id, output=write_chunk, format="csv"
+            )
+    tmp_path.replace(delta_path)
+
+    manifest["deltas"].append({
+        "file": delta_name,
+        "from_id": from_id,
+        "watermark": to_id,
+        "records": records,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "created_at": datetime.datetime.now().isoformat(),
+    })
+    _save_manifest(manifest)
+
+    size_mb = round(delta_path.stat().st_size / 1024 / 1024, 2)
+    logger.info(f"[Снимки] Дельта {delta_name}: {records} записей (id {from_id + 1}..{to_id}), {size_mb} МБ")
+    return {"success": True, "message": f"Создана дельта: {records} записей.", "file_path": str(delta_path)}
+
+
+async def create_incremental_snapshot() -> dict:
+    """
+    Ночной снимок в режиме BACKUP_MODE=incremental: база, если ее нет или она старше
+    SNAPSHOT_BASE_INTERVAL_DAYS дней, иначе - дельта к последнему снимку цепочки.
+    Параллельные вставки допустимы: водяной знак учитывает незавершенные транзакции.
+    """
+    manifest = load_manifest()
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+    if manifest:
+        base_created = datetime.datetime.fromisoformat(manifest["base"]["created_at"])
+        if datetime.datetime.now() - base_created < datetime.timedelta(days=settings.SNAPSHOT_BASE_INTERVAL_DAYS):
+            return await _create_delta(manifest, timestamp)
+
+    return await _create_base(timestamp, manifest)
+
+
+async def _apply_delta(delta: dict):
+    """Загружает дельту через временную таблицу; уже существующие записи пропускаются."""
+    await ensure_partitions(
+        datetime.date.fromisoformat(delta["date_from"]), datetime.date.fromisoformat(delta["date_to"])
+    )
+    columns = ", ".join(COLUMNS)
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TEMP TABLE snapshot_stage (LIKE test_results INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        raw_connection = await conn.get_raw_connection()
+        with gzip.open(snapshot_folder() / delta["file"], "rb") as delta_file:
+            await raw_connection.driver_connection.copy_to_table(
+                "snapshot_stage", source=delta_file, columns=COLUMNS, format="csv"
+            )
+        result = await conn.execute(text(
+            f"INSERT INTO test_results ({columns}) SELECT {columns} FROM snapshot_stage ON CONFLICT DO NOTHING"
+        ))
+    logger.info(f"[Снимки] Применена дельта {delta['file']}: добавлено {result.rowcount} из {delta['records']}")
+
+
+async def restore_snapshot_chain() -> dict:
+    """Восстанавливает базу цепочки через pg_restore и последовательно применяет все дельты."""
+    manifest = load_manifest()
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Манифест снимков не найден.")
+
+    base_path = snapshot_folder() / manifest["base"]["file"]
+    logger.info(f"[Снимки] Восстановление базы {base_path}")
+    await restore_database_dump(str(base_path))
+
+    for delta in manifest["deltas"]:
+        await _apply_delta(delta)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('test_results', 'id'), "
+            "COALESCE((SELECT max(id) FROM test_results), 1))"
+        ))
+    # Сводка и показатели из базы отстают на записи дельт
+    await rebuild_stats()
+    if manifest["deltas"]:
+        await backfill_analytes(min(datetime.date.fromisoformat(delta["date_from"]) for delta in manifest["deltas"]))
+
+    message = f"Восстановлена база и {len(manifest['deltas'])} дельт."
+    logger.info(f"[Снимки] {message}")
+    return {"success": True, "message": message}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "snapshot"
+    if command == "restore":
+        asyncio.run(restore_snapshot_chain())
+    elif command == "snapshot":
+        asyncio.run(create_incremental_snapshot())
+    else:
+        sys.exit(f"Неизвестная команда: {command}. Доступны: snapshot, restore")
@@ -0,0 +1,146 @@
+"""
+Сводная таблица test_results_stats.
+Пустая сводка при непустой test_results (первый запуск после обновления) пересобирается
+автоматически в начале синхронизации, см. ensure_stats.
+Пересборка вручную (при расхождении с основной таблицей): python -m app.service.dbase.stats
+"""
+import asyncio
+import datetime
+import time
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger
+from app.core.database import engine
+from app.model import TestResultStats
+
+StatsKey = tuple[datetime.date, str, bool]  # (test_date, prefix, is_result)
+
+
+def collect_stats_deltas(rows) -> dict[StatsKey, list[int]]:
+    """Группирует вставленные строки (test_date, prefix, is_result, байты) в приращения сводки."""
+    deltas = defaultdict(lambda: [0, 0])
+    for test_date, prefix, is_result, stored_bytes in rows:
+        delta = deltas[(test_date, prefix or "", bool(is_result))]
+        delta[0] += 1
+        delta[1] += stored_bytes or 0
+    return deltas
+
+
+async def add_stats_deltas(session: AsyncSession, deltas: dict[StatsKey, list[int]]):
+    """Прибавляет приращения к сводке. Выполняется в транзакции вставки, коммит - у вызывающего."""
+    if not deltas:
+        return
+
+    rows = [
+        {"test_date": test_date, "prefix": prefix, "is_result": is_result, "records": records, "bytes": stored_bytes}
+        for (test_date, prefix, is_result), (records, stored_bytes) in deltas.items()
+    ]
+    statement = insert(TestResultStats).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["test_date", "prefix", "is_result"],
+        set_={
+            "records": TestResultStats.records + statement.excluded.records,
+            "bytes": TestResultStats.bytes + statement.excluded.bytes,
+        }
+    )
+    await session.exec(statement)
+
+
+async def subtract_stats(conn: AsyncConnection, where: str, params: dict):
+    """
+    Вычитает из сводки записи test_results, подходящие под условие where (до их удаления),
+    и убирает опустевшие строки сводки. Используется архивом.
+    """
+    await conn.execute(text(
+        "UPDATE test_results_stats s SET records = s.records - d.records, bytes = s.bytes - d.bytes "
+        "FROM (SELECT test_date, COALESCE(prefix, '') AS prefix, is_result, count(*) AS records, "
+        "COALESCE(sum(octet_length(test_result)), 0) AS bytes "
+        f"FROM test_results WHERE {where} GROUP BY 1, 2, 3) d "
+        "WHERE s.test_date = d.test_date AND s.prefix = d.prefix AND s.is_result = d.is_result"
+    ), params)
+    await conn.execute(text("DELETE FROM test_results_stats WHERE records <= 0"))
+
+
+async def rebuild_stats() -> dict:
+    """
+    Пересобирает сводку полным проходом по test_results.
+    Блокировка сводки не дает параллельной вставке ни потерять, ни задвоить свои приращения.
+    """
+    start_time = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(text("LOCK TABLE test_results_stats IN EXCLUSIVE MODE"))
+        await conn.execute(text("DELETE FROM test_results_stats"))
+        result = await conn.execute(text(
+            "INSERT INTO test_results_stats (test_date, prefix, is_result, records, bytes) "
+            "SELECT test_date, COALESCE(prefix, ''), is_result, count(*), COALESCE(sum(octet_length(test_result)), 0) "
+            "FROM test_results GROUP BY 1, 2, 3"
+        ))
+
+    duration = round(time.perf_counter() - start_time, 2)
+    logger.info(f"[Сводка] Пересобрана: {result.rowcount} строк за {duration}с")
+    return {"status": "ok", "rows": result.rowcount, "duration": duration}
+
+
+async def ensure_stats() -> bool:
+    """
+    Пересобирает сводку, если она пуста, а test_results - нет: иначе итоги отчетов учитывали бы
+    только записи, вставленные после появления сводки. Возвращает True, если сводка пересобрана.
+    """
+    async with engine.connect() as conn:
+        needs_rebuild = (await conn.execute(text(
+            "SELECT NOT EXISTS (SELECT 1 FROM test_results_stats) AND EXISTS (SELECT 1 FROM test_results)"
+        ))).scalar()
+    if not needs_rebuild:
+        return False
+
+    logger.warning("[Сводка] Сводка пуста при непустой test_results, запускается пересборка")
+    await rebuild_stats()
+    return True
+
+
+async def get_stats_summary(
+        session: AsyncSession,
+        date_from: Optional[datetime.date] = None,
+        date_to: Optional[datetime.date] = None
+) -> dict:
+    """Итоги по сводке: готовые и пустые результаты, объем и разбивка по отделениям."""
+    statement = select(
+        TestResultStats.prefix,
+        TestResultStats.is_result,
+        func.sum(TestResultStats.records),
+        func.sum(TestResultStats.bytes),
+        func.max(TestResultStats.test_date),
+    ).group_by(TestResultStats.prefix, TestResultStats.is_result)
+    if date_from:
+        statement = statement.where(TestResultStats.test_date >= date_from)
+    if date_to:
+        statement = statement.where(TestResultStats.test_date <= date_to)
+
+    rows = (await session.exec(statement)).all()
+
+    by_prefix = defaultdict(lambda: {"with_result": 0, "empty": 0, "bytes": 0})
+    latest_date = None
+    for prefix, is_result, records, stored_bytes, last_date in rows:
+        department = by_prefix[prefix or "unknown"]
+        department["with_result" if is_result else "empty"] += int(records)
+        department["bytes"] += int(stored_bytes)
+        latest_date = max(latest_date, last_date) if latest_date else last_date
+
+    return {
+        "with_result": sum(d["with_result"] for d in by_prefix.values()),
+        "empty": sum(d["empty"] for d in by_prefix.values()),
+        "bytes": sum(d["bytes"] for d in by_prefix.values()),
+        "latest_test_date": latest_date.isoformat() if latest_date else None,
+        "by_prefix": dict(by_prefix),
+    }
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_stats())
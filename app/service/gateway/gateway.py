@@ -1,24 +1,153 @@
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
 import httpx
 from fastapi import HTTPException
 
 from app.core import get_settings, logger
+from app.core.metrics import (
+    GATEWAY_REQUEST_DURATION, GATEWAY_RESPONSES_TOTAL, GATEWAY_ERRORS_TOTAL, GATEWAY_COALESCED_TOTAL,
+    GATEWAY_LANE_WAIT, GATEWAY_LANE_QUEUED, GATEWAY_LANE_IN_FLIGHT
+)
+from app.core.profiler import profile_count
+
+
+def _request_labels(kwargs: dict) -> tuple[str, str]:
+    """Достает класс и метод шлюза (params.c / params.m) из тела запроса для меток метрик."""
+    payload = kwargs.get("json")
+    params = payload.get("params", {}) if isinstance(payload, dict) else {}
+    return str(params.get("c", "unknown")), str(params.get("m", "unknown"))
+
+
+# Полосы приоритета запросов к шлюзу
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+
+def _request_key(method: str, kwargs: dict) -> str:
+    """Канонический хеш запроса: метод + аргументы с отсортированными ключами."""
+    canonical = json.dumps({"method": method.lower(), "kwargs": kwargs}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class _InFlight:
+    future: asyncio.Future
+    followers: int = 0
 
 
 class GatewayService:
     settings = get_settings()
     GATEWAY_ENDPOINT = settings.GATEWAY_REQUEST_ENDPOINT
+    # Выполняющиеся запросы, общие для всех экземпляров (роуты, синхронизация, воркеры)
+    _in_flight: dict[tuple[str, str], _InFlight] = {}
+    # Слоты полос приоритета, общие для всех экземпляров процесса
+    _lane_semaphores: dict[str, asyncio.Semaphore] = {}
 
-    def __init__(self, client: httpx.AsyncClient):
+    def __init__(self, client: httpx.AsyncClient, lane: str = LANE_BULK):
+        """
+        :param client: HTTPX клиент шлюза.
+        :param lane: Полоса приоритета. interactive - запросы пользователя и мониторинга, им всегда
+                     доступны GATEWAY_INTERACTIVE_SLOTS слотов; bulk - сбор данных, занимает остальные.
+        """
         self._client = client
+        self._lane = lane
+
+    @classmethod
+    def _lane_semaphore(cls, lane: str) -> asyncio.Semaphore:
+        if lane not in cls._lane_semaphores:
+            interactive_slots = cls.settings.GATEWAY_INTERACTIVE_SLOTS
+            slots = interactive_slots if lane == LANE_INTERACTIVE else max(
+                1, cls.settings.GATEWAY_MAX_CONNECTIONS - interactive_slots
+            )
+            cls._lane_semaphores[lane] = asyncio.Semaphore(slots)
+        return cls._lane_semaphores[lane]
+
+    @asynccontextmanager
+    async def _lane_slot(self):
+        """Занимает слот своей полосы на время запроса к шлюзу."""
+        semaphore = self._lane_semaphore(self._lane)
+        wait_start = time.perf_counter()
+        GATEWAY_LANE_QUEUED.labels(self._lane).inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            GATEWAY_LANE_QUEUED.labels(self._lane).dec()
+        GATEWAY_LANE_WAIT.labels(self._lane).observe(time.perf_counter() - wait_start)
+
+        try:
+            with GATEWAY_LANE_IN_FLIGHT.labels(self._lane).track_inprogress():
+                yield
+        finally:
+            semaphore.release()
 
     async def make_request(self, method: str, **kwargs) -> dict:
         """
         Выполняет HTTP-запрос к единственному эндпоинту шлюза.
+        Идентичные одновременные запросы не дублируются: первый вызов выполняет запрос,
+        остальные дожидаются его и получают копию результата (или то же исключение).
 
         :param method: HTTP метод ('get', 'post', 'put', etc.).
         :param kwargs: Аргументы, которые будут переданы в httpx клиент.
                        Например: json=payload, params=query_params.
         """
+        if not self.settings.GATEWAY_COALESCE_ENABLED:
+            return await self._send(method, **kwargs)
+
+        # Полоса входит в ключ: интерактивный вызов не должен ждать идентичный запрос,
+        # который еще стоит в очереди за слотами полосы массового сбора
+        key = (self._lane, _request_key(method, kwargs))
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await self._join(in_flight, method, **kwargs)
+
+        in_flight = _InFlight(future=asyncio.get_running_loop().create_future())
+        # Исключение без ожидающих не должно попадать в лог как "never retrieved"
+        in_flight.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = in_flight
+        try:
+            result = await self._send(method, **kwargs)
+        except asyncio.CancelledError:
+            in_flight.future.cancel()
+            raise
+        except BaseException as exc:
+            in_flight.future.set_exception(exc)
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        in_flight.future.set_result(result)
+        # Вызывающие изменяют результат (например, страницы поиска), поэтому при наличии
+        # присоединившихся каждый получает свою копию, а исходный объект остается нетронутым
+        return copy.deepcopy(result) if in_flight.followers else result
+
+    async def _join(self, in_flight: _InFlight, method: str, **kwargs) -> dict:
+        """Дожидается результата уже выполняющегося идентичного запроса."""
+        label_c, label_m = _request_labels(kwargs)
+        GATEWAY_COALESCED_TOTAL.labels(label_c, label_m).inc()
+        in_flight.followers += 1
+        try:
+            result = await asyncio.shield(in_flight.future)
+        except asyncio.CancelledError:
+            if not in_flight.future.cancelled():
+                raise
+            # Отменен запрос-лидер, а не текущий вызов: выполняем запрос заново
+            return await self.make_request(method, **kwargs)
+        return copy.deepcopy(result)
+
+    async def _send(self, method: str, **kwargs) -> dict:
+        async with self._lane_slot():
+            return await self._request(method, **kwargs)
+
+    async def _request(self, method: str, **kwargs) -> dict:
+        label_c, label_m = _request_labels(kwargs)
+        profile_count("gateway_requests")
+        start_time = time.perf_counter()
         try:
             if not hasattr(self._client, method.lower()):
                 raise ValueError(f"Неподдерживаемый HTTP метод: {method}")
@@ -26,16 +155,22 @@ class GatewayService:
             http_method_func = getattr(self._client, method.lower())
 
             response = await http_method_func(self.GATEWAY_ENDPOINT, **kwargs)
+            GATEWAY_RESPONSES_TOTAL.labels(label_c, label_m, str(response.status_code)).inc()
 
             response.raise_for_status()
             return response.json() if response.content else {}
 
         except ValueError as exc:
+            GATEWAY_ERRORS_TOTAL.labels(label_c, label_m, "invalid").inc()
             logger.exception(f"Внутренняя ошибка сервиса: {exc}")
             raise HTTPException(status_code=500, detail=str(exc))
         except httpx.RequestError as exc:
+            GATEWAY_ERRORS_TOTAL.labels(label_c, label_m, type(exc).__name__).inc()
             logger.exception(f"Не удалось подключиться к шлюзу: {exc}")
             raise HTTPException(status_code=503, detail=f"Не удалось подключиться к шлюзу: {exc}")
         except httpx.HTTPStatusError as exc:
+            GATEWAY_ERRORS_TOTAL.labels(label_c, label_m, "http_status").inc()
             logger.exception(f"Ошибка от шлюза: {exc.response.text}")
-            raise HTTPException(status_code=exc.response.status_code, detail=f"Ошибка от шлюза: {exc.response.text}")
\ No newline at end of file
+            raise HTTPException(status_code=exc.response.status_code, detail=f"Ошибка от шлюза: {exc.response.text}")
+        finally:
+            GATEWAY_REQUEST_DURATION.labels(label_c, label_m).observe(time.perf_counter() - start_time)
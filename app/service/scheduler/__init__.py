@@ -1,3 +1,4 @@
 from .sync_database import sync_database
+from .coordinator import sync_coordinator
 
-__all__ = ["sync_database"]
\ No newline at end of file
+__all__ = ["sync_database", "sync_coordinator"]
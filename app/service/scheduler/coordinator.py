@@ -0,0 +1,148 @@
+import asyncio
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlmodel import select, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.model import SyncRun
+from app.service.scheduler.sync_database import sync_database
+from app.service.utils.telegram import send_telegram_message
+
+settings = get_settings()
+
+
+@dataclass
+class _PendingSync:
+    triggers: list[str]
+    date_from: Optional[datetime.date]
+
+
+class SyncCoordinator:
+    """
+    Single-flight для синхронизации: одновременно выполняется не больше одного sync_database.
+    Запросы, пришедшие во время выполнения (force-update, cron, повторы), не запускают
+    параллельный сбор, а сливаются в один отложенный запуск с самым широким периодом.
+    """
+
+    def __init__(self):
+        self._running = False
+        self._pending: Optional[_PendingSync] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    async def request_sync(
+            self,
+            scheduler: AsyncIOScheduler,
+            trigger: str = "manual",
+            date_from: Optional[datetime.date] = None,
+            retry_count: int = 0,
+    ) -> str:
+        """
+        Запускает синхронизацию или сливает запрос с уже ожидающим.
+        Возвращает "started" или "merged".
+        """
+        if self._running:
+            self._merge(trigger, date_from)
+            logger.info(
+                f"[Синхронизация базы] Запрос '{trigger}' объединен с отложенным запуском "
+                f"(с {self._pending.date_from or 'последней даты в БД'})."
+            )
+            return "merged"
+
+        # Флаг выставляется до первого await, поэтому гонки внутри одного event loop нет.
+        # Запуск - задачей asyncio, а не разовой задачей планировщика: ту APScheduler может
+        # признать пропущенной (занятый loop, пауза планировщика), и флаг не сбросился бы никогда
+        self._running = True
+        try:
+            self._task = asyncio.create_task(self._run(scheduler, trigger, date_from, retry_count))
+        except Exception:
+            self._running = False
+            raise
+        self._task.add_done_callback(self._on_task_done)
+        return "started"
+
+    def _on_task_done(self, task: asyncio.Task):
+        # Отложенный запрос мог уже запустить новую задачу - ее флаг не трогаем
+        if task is self._task:
+            self._running = False
+            self._task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[Синхронизация базы] Задача завершилась с ошибкой: {task.exception()}")
+
+    async def resume_failed_sync(self, scheduler: AsyncIOScheduler) -> Optional[str]:
+        """
+        Вызывается при получении лидерства. Если последняя синхронизация за сутки завершилась
+        ошибкой и попытки не исчерпаны, запускает следующую попытку: отложенный повтор
+        прежнего лидера (задача в памяти) потерян вместе с ним.
+        """
+        try:
+            async with AsyncSession(engine) as session:
+                last_run = (await session.exec(
+                    select(SyncRun).order_by(desc(SyncRun.started_at)).limit(1)
+                )).first()
+        except Exception as e:
+            logger.error(f"[Синхронизация базы] Не удалось прочитать последний запуск: {e}")
+            return None
+
+        if last_run is None or last_run.status != "error" or last_run.retry_count >= settings.UPDATE_RETRY_ATTEMPTS:
+            return None
+        if last_run.started_at < datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1):
+            return None
+
+        logger.info(f"[Синхронизация базы] Возобновляю повторы после смены лидера (попытка #{last_run.retry_count + 2})")
+        return await self.request_sync(scheduler, last_run.trigger, last_run.date_from, last_run.retry_count + 1)
+
+    def _merge(self, trigger: str, date_from: Optional[datetime.date]):
+        if self._pending is None:
+            self._pending = _PendingSync(triggers=[trigger], date_from=date_from)
+            return
+
+        if trigger not in self._pending.triggers:
+            self._pending.triggers.append(trigger)
+        # None означает "от последней даты в БД", явная дата всегда расширяет период
+        if date_from and (self._pending.date_from is None or date_from < self._pending.date_from):
+            self._pending.date_from = date_from
+
+    async def _run(
+            self,
+            scheduler: AsyncIOScheduler,
+            trigger: str,
+            date_from: Optional[datetime.date],
+            retry_count: int,
+    ):
+        try:
+            success = await sync_database(retry_count, trigger, date_from)
+        finally:
+            self._running = False
+
+        if not success:
+            if retry_count < settings.UPDATE_RETRY_ATTEMPTS:
+                scheduler.add_job(
+                    self.request_sync,
+                    'date',
+                    run_date=datetime.datetime.now() + datetime.timedelta(minutes=30),
+                    args=[scheduler, trigger, date_from, retry_count + 1],
+                    id=f"retry_sync_{datetime.datetime.now().timestamp()}",
+                    misfire_grace_time=None,
+                    coalesce=True
+                )
+            else:
+                await send_telegram_message(
+                    "Результаты исследований offline\n"
+                    "⛔ <b>Update</b>: Превышен лимит попыток. Остановка."
+                )
+
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            await self.request_sync(scheduler, "+".join(pending.triggers), pending.date_from)
+
+
+sync_coordinator = SyncCoordinator()
@@ -0,0 +1,25 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger
+from app.core.client import create_background_gateway_client
+from app.core.database import engine
+from app.service import GatewayService
+from app.service.collector.dead_letter import retry_failed_results
+from app.service.scheduler.coordinator import sync_coordinator
+
+
+async def retry_failed_results_job():
+    """
+    Периодическая задача: разбирает dead-letter таблицу failed_results.
+    Пропускает запуск, пока идет синхронизация, чтобы не добавлять нагрузку на шлюз.
+    """
+    if sync_coordinator.is_running:
+        logger.info("[Dead-letter] Идет синхронизация, повтор отложен.")
+        return
+
+    try:
+        async with AsyncSession(engine) as session:
+            async with create_background_gateway_client() as client:
+                await retry_failed_results(session, GatewayService(client=client))
+    except Exception as e:
+        logger.error(f"[Dead-letter] Ошибка при повторе результатов: {e}", exc_info=True)
@@ -1,110 +1,172 @@
 import datetime
 import asyncio
-import httpx
+import time
+from typing import Optional
 from sqlmodel import select, func
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import logger, get_settings
 from app.core.database import engine
+from app.core.client import create_background_gateway_client
+from app.core.profiler import SyncProfile, activate_profile, profile_stage
 from app.model import TestResult
+from app.model.department import DEPARTMENTS
 from app.service import GatewayService
 from app.service.collector.process import collect_by_day
 from app.service.collector.tools import full_audit_dbase
 from app.service.utils.telegram import send_telegram_message
 from app.service.dbase.dump_bd import create_database_dump
+from app.service.dbase.snapshots import create_incremental_snapshot
+from app.service.dbase.stats import ensure_stats, get_stats_summary
+from app.service.scheduler.sync_runs import save_sync_run
+from app.service.collector.work_queue import enqueue_units, count_units
 
 settings = get_settings()
 
 
-async def sync_database(scheduler, retry_count: int = 0):
-    logger.info(f"[Синхронизация базы] Старт задачи. Попытка #{retry_count + 1}")
-
-    async with AsyncSession(engine) as session:
-        limits = httpx.Limits(max_connections=10)
-        async with httpx.AsyncClient(
-                base_url=settings.GATEWAY_URL,
-                headers={"X-API-KEY": settings.GATEWAY_API_KEY},
-                timeout=settings.REQUEST_TIMEOUT,
-                limits=limits
-        ) as client:
-
-            gateway_service = GatewayService(client=client)
-
-            try:
-                # --- СИНХРОНИЗАЦИЯ ---
-                result = await session.exec(select(func.max(TestResult.test_date)))
-                last_db_date = result.first()
-
-                if not last_db_date:
-                    start_date = datetime.date(datetime.datetime.now().year, 1, 1)
-                else:
-                    start_date = last_db_date - datetime.timedelta(days=2)  # noqa
-
-                today = datetime.date.today()
-
-                # Логика сбора данных
-                if start_date > today:
-                    logger.info("Данные актуальны, сбор не требуется.")
-                else:
-                    logger.info(f"Сбор данных за период: {start_date} -> {today}")
-                    delta = (today - start_date).days
-                    days_list = [start_date + datetime.timedelta(days=i) for i in range(delta + 1)]
-
-                    for current_date in days_list:
-                        await collect_by_day(current_date.strftime("%d.%m.%Y"), gateway_service, session)
-                        await asyncio.sleep(1.0)
-
-                # --- АУДИТ ---
-                logger.info("Запуск пре-бэкап аудита...")
-                audit_result = await full_audit_dbase()
-
-                if audit_result["status"] == "OK":
-                    audit_icon = "✅"
-                    audit_text = "Целостность ОК"
-                else:
-                    audit_icon = "⚠️"
-                    audit_text = f"Найдено {audit_result['bad_count']} битых!"
-
-                # --- ДАМП БАЗЫ ---
-                logger.info("Создание ежедневного дампа...")
-                dump_result = await create_database_dump(filename="daily_latest.dump")
-                dump_path = dump_result.get("file_path", "unknown")
-
-                # --- УВЕДОМЛЕНИЕ ---
-                message = (
-                    f"Результаты исследований offline\n"
-                    f"📅 Синхронизация: {start_date} — {today}\n"
-                    f"💾 Бэкап: {dump_path}\n"
-                    f"──────────────────\n"
-                    f"📊 <b>Статистика БД:</b>\n"
-                    f"{audit_icon} Аудит: {audit_text} ({audit_result['duration']}с)\n"
-                    f"✅ Готовые результаты: {audit_result['total_checked']}\n"
-                    f"⏳ <b>Пустые: {audit_result['empty_count']}</b>"
-                )
-                logger.info("[Синхронизация базы] Успешно завершено.")
-                await send_telegram_message(message)
-
-            except Exception as e:
-                logger.error(f"❌ [Синхронизация базы] Ошибка: {e}", exc_info=True)
-
-                await send_telegram_message(
-                    f"Результаты исследований offline\n"
-                    f"❌ <b>Update Error</b>\n"
-                    f"Ошибка: {e}\n"
-                    f"⏳ Попытка {retry_count + 1}/{settings.UPDATE_RETRY_ATTEMPTS}. Повтор через 30 мин."
-                )
-
-                if retry_count < settings.UPDATE_RETRY_ATTEMPTS:
-                    run_time = datetime.datetime.now() + datetime.timedelta(minutes=30)
-                    scheduler.add_job(
-                        sync_database,
-                        'date',
-                        run_date=run_time,
-                        args=[scheduler, retry_count + 1],
-                        id=f"retry_sync_{datetime.datetime.now().timestamp()}"
+async def _collect_via_queue(session: AsyncSession, days_list: list[datetime.date]):
+    """
+    Ставит (день, отделение) в очередь воркеров и ждет, пока все единицы будут обработаны.
+    Выбрасывает исключение, если часть единиц ушла в dead или время ожидания истекло.
+    """
+    prefixes = [department.prefix for department in DEPARTMENTS]
+    await enqueue_units(session, days_list, prefixes)
+
+    deadline = time.monotonic() + settings.QUEUE_WAIT_TIMEOUT
+    while True:
+        counts = await count_units(session, days_list, prefixes)
+        in_progress = counts.get("pending", 0) + counts.get("running", 0)
+        if not in_progress:
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Очередь сбора не обработана за отведенное время. Осталось единиц: {in_progress}")
+        await asyncio.sleep(settings.QUEUE_POLL_INTERVAL)
+
+    dead_count = counts.get("dead", 0)
+    if dead_count:
+        raise RuntimeError(f"Не удалось собрать единиц очереди: {dead_count}")
+    logger.info(f"[Очередь] Все единицы обработаны: {counts.get('done', 0)}")
+
+
+async def sync_database(
+        retry_count: int = 0,
+        trigger: str = "scheduled",
+        date_from: Optional[datetime.date] = None
+) -> bool:
+    """
+    Синхронизирует базу (LastDate - 2 -> Today), проводит аудит и создает дамп.
+    Если передан date_from, период расширяется до этой даты.
+    Возвращает True при успехе. Повторные попытки планирует SyncCoordinator.
+    """
+    logger.info(f"[Синхронизация базы] Старт задачи ({trigger}). Попытка #{retry_count + 1}")
+
+    profile = SyncProfile()
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    start_time = time.perf_counter()
+    start_date = None
+    today = None
+
+    with activate_profile(profile):
+        async with AsyncSession(engine) as session:
+            async with create_background_gateway_client() as client:
+
+                gateway_service = GatewayService(client=client)
+
+                try:
+                    # Сводка появилась в уже работающей базе: без пересборки итоги отчета неполные
+                    await ensure_stats()
+
+                    # --- СИНХРОНИЗАЦИЯ ---
+                    result = await session.exec(select(func.max(TestResult.test_date)))
+                    last_db_date = result.first()
+
+                    if not last_db_date:
+                        start_date = datetime.date(datetime.datetime.now().year, 1, 1)
+                    else:
+                        start_date = last_db_date - datetime.timedelta(days=2)  # noqa
+
+                    if date_from and date_from < start_date:
+                        start_date = date_from
+
+                    today = datetime.date.today()
+
+                    # Логика сбора данных
+                    if start_date > today:
+                        logger.info("Данные актуальны, сбор не требуется.")
+                    else:
+                        logger.info(f"Сбор данных за период: {start_date} -> {today}")
+                        delta = (today - start_date).days
+                        days_list = [start_date + datetime.timedelta(days=i) for i in range(delta + 1)]
+
+                        if settings.COLLECTION_MODE == "queue":
+                            # Сбор выполняют воркеры (python -m app.worker), здесь только ждем результата
+                            with profile_stage("queue_wait"):
+                                await _collect_via_queue(session, days_list)
+                        else:
+                            for current_date in days_list:
+                                await collect_by_day(current_date.strftime("%d.%m.%Y"), gateway_service, session)
+                                await asyncio.sleep(1.0)
+
+                    # --- АУДИТ ---
+                    # Проверяется только синхронизированный период, итоги по базе берутся из сводки
+                    logger.info("Запуск пре-бэкап аудита...")
+                    with profile_stage("audit"):
+                        audit_result = await full_audit_dbase(date_from=start_date)
+                        stats = await get_stats_summary(session)
+
+                    if audit_result["status"] == "OK":
+                        audit_icon = "✅"
+                        audit_text = "Целостность ОК"
+                    else:
+                        audit_icon = "⚠️"
+                        audit_text = f"Найдено {audit_result['bad_count']} битых!"
+
+                    # --- ДАМП БАЗЫ ---
+                    logger.info("Создание ежедневного дампа...")
+                    with profile_stage("dump"):
+                        if settings.BACKUP_MODE == "incremental":
+                            dump_result = await create_incremental_snapshot()
+                        else:
+                            dump_result = await create_database_dump(filename="daily_latest.dump")
+                    dump_path = dump_result.get("file_path") or dump_result.get("message", "unknown")
+
+                    # --- ПРОФИЛЬ ЗАПУСКА ---
+                    regressions = await save_sync_run(
+                        profile, trigger, retry_count, started_at, time.perf_counter() - start_time,
+                        date_from=start_date, date_to=today
                     )
-                else:
+                    regressions_text = (
+                        f"\n🐢 <b>Замедление:</b> {'; '.join(regressions)}" if regressions else ""
+                    )
+
+                    # --- УВЕДОМЛЕНИЕ ---
+                    message = (
+                        f"Результаты исследований offline\n"
+                        f"📅 Синхронизация: {start_date} — {today}\n"
+                        f"💾 Бэкап: {dump_path}\n"
+                        f"──────────────────\n"
+                        f"📊 <b>Статистика БД:</b>\n"
+                        f"{audit_icon} Аудит: {audit_text} ({audit_result['duration']}с)\n"
+                        f"✅ Готовые результаты: {stats['with_result']}\n"
+                        f"⏳ <b>Пустые: {stats['empty']}</b>"
+                        f"{regressions_text}"
+                    )
+                    logger.info("[Синхронизация базы] Успешно завершено.")
+                    await send_telegram_message(message)
+                    return True
+
+                except Exception as e:
+                    logger.error(f"❌ [Синхронизация базы] Ошибка: {e}", exc_info=True)
+
+                    await save_sync_run(
+                        profile, trigger, retry_count, started_at, time.perf_counter() - start_time,
+                        date_from=start_date, date_to=today, error=str(e)
+                    )
+
                     await send_telegram_message(
-                        "Результаты исследований offline\n"
-                        "⛔ <b>Update</b>: Превышен лимит попыток. Остановка."
-                    )
\ No newline at end of file
+                        f"Результаты исследований offline\n"
+                        f"❌ <b>Update Error</b>\n"
+                        f"Ошибка: {e}\n"
+                        f"⏳ Попытка {retry_count + 1}/{settings.UPDATE_RETRY_ATTEMPTS}. Повтор через 30 мин."
+                    )
+                    return False
@@ -0,0 +1,96 @@
+import datetime
+import statistics
+from typing import Optional
+
+from sqlmodel import select, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.core.profiler import SyncProfile
+from app.model import SyncRun
+
+settings = get_settings()
+
+
+async def detect_stage_regressions(session: AsyncSession, stages: dict[str, float]) -> list[str]:
+    """
+    Сравнивает время этапов текущего запуска с медианой предыдущих успешных запусков.
+    Возвращает список описаний этапов, время которых выросло больше чем в SYNC_REGRESSION_FACTOR раз.
+    """
+    statement = (
+        select(SyncRun.stages)
+        .where(SyncRun.status == "success")
+        .order_by(desc(SyncRun.started_at))
+        .limit(settings.SYNC_REGRESSION_WINDOW)
+    )
+    history = (await session.exec(statement)).all()
+    if not history:
+        return []
+
+    regressions = []
+    for stage, seconds in stages.items():
+        previous = [run_stages[stage] for run_stages in history if stage in run_stages]
+        if not previous or seconds < settings.SYNC_REGRESSION_MIN_SECONDS:
+            continue
+
+        median = statistics.median(previous)
+        if median > 0 and seconds > median * settings.SYNC_REGRESSION_FACTOR:
+            regressions.append(f"{stage}: {seconds:.1f}с (медиана {median:.1f}с)")
+
+    return regressions
+
+
+async def save_sync_run(
+        profile: SyncProfile,
+        trigger: str,
+        retry_count: int,
+        started_at: datetime.datetime,
+        duration: float,
+        date_from: Optional[datetime.date] = None,
+        date_to: Optional[datetime.date] = None,
+        error: Optional[str] = None,
+) -> list[str]:
+    """
+    Сохраняет профиль запуска синхронизации в таблицу sync_runs.
+    Для успешных запусков предварительно проверяет регрессию по этапам и возвращает ее описание.
+    """
+    stages = profile.rounded_stages()
+    regressions = []
+
+    try:
+        async with AsyncSession(engine) as session:
+            if error is None:
+                regressions = await detect_stage_regressions(session, stages)
+                if regressions:
+                    logger.warning(f"[Синхронизация базы] Замедление этапов: {'; '.join(regressions)}")
+
+            session.add(SyncRun(
+                trigger=trigger,
+                status="success" if error is None else "error",
+                retry_count=retry_count,
+                date_from=date_from,
+                date_to=date_to,
+                started_at=started_at,
+                duration=round(duration, 3),
+                stages=stages,
+                gateway_requests=profile.gateway_requests,
+                gateway_retries=profile.gateway_retries,
+                empty_results=profile.empty_results,
+                records_inserted=profile.records_inserted,
+                bytes_stored=profile.bytes_stored,
+                regressions=regressions,
+                error=error,
+            ))
+            await session.commit()
+    except Exception as e:
+        # Профиль - вспомогательная информация, его потеря не должна ломать синхронизацию
+        logger.error(f"Не удалось сохранить профиль синхронизации: {e}", exc_info=True)
+
+    return regressions
+
+
+async def list_sync_runs(session: AsyncSession, limit: int = 30) -> list[SyncRun]:
+    """Возвращает последние профили синхронизаций, начиная с самых свежих."""
+    statement = select(SyncRun).order_by(desc(SyncRun.started_at)).limit(limit)
+    return list((await session.exec(statement)).all())
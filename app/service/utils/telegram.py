@@ -1,10 +1,28 @@
 # отправка сообщения в телеграм
 
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
 import httpx
 from app.core import get_settings, logger
+from app.core.metrics import ALERTS_QUEUED_TOTAL, ALERTS_DROPPED_TOTAL, ALERT_MESSAGES_SENT_TOTAL
 
 settings = get_settings()
 
+# Один клиент на процесс: без повторного TLS-рукопожатия на каждое сообщение
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=10.0)
+    return _client
+
+
 async def send_telegram_message(message: str):
     if not settings.TELEGRAM_BOT_TOKEN or not settings.TELEGRAM_CHAT_ID:
         logger.warning("⚠️ Telegram не настроен")
@@ -14,7 +32,145 @@ async def send_telegram_message(message: str):
     payload = {"chat_id": settings.TELEGRAM_CHAT_ID, "text": message, "parse_mode": "HTML"}
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(url, json=payload)
+        response = await _get_client().post(url, json=payload)
+        if response.status_code == 429:
+            # Telegram просит подождать: уважаем retry_after и пробуем еще раз
+            retry_after = response.json().get("parameters", {}).get("retry_after", 5)
+            logger.warning(f"Telegram ограничил частоту отправки, ждем {retry_after}с")
+            await asyncio.sleep(retry_after)
+            await _get_client().post(url, json=payload)
     except Exception as e:
-        logger.error(f"Ошибка отправки в Telegram: {e}")
\ No newline at end of file
+        logger.error(f"Ошибка отправки в Telegram: {e}")
+
+
+@dataclass(frozen=True)
+class EmptyResultAlert:
+    prefix: str
+    patient_name: str
+    test_date: str
+    test_name: str
+    result_id: str
+
+
+class AlertDispatcher:
+    """
+    Фоновый диспетчер уведомлений о пустых результатах.
+    - Сбор данных только кладет алерт в ограниченную очередь и никогда не ждет отправки.
+    - Алерты копятся и отправляются дайджестом: одно сообщение на отделение.
+    - Дайджест отправляется по flush() (конец сбора) или раз в ALERT_DIGEST_INTERVAL секунд.
+    - Между сообщениями выдерживается ALERT_MIN_SEND_INTERVAL, чтобы не упереться в лимиты Telegram.
+    - При переполнении очереди новые алерты отбрасываются, их количество попадает в следующий дайджест.
+    """
+    _FLUSH = object()
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: dict[str, list[EmptyResultAlert]] = defaultdict(list)
+        self._dropped = 0
+        self._last_sent = 0.0
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=settings.ALERT_QUEUE_SIZE)
+            self._worker = asyncio.create_task(self._run())
+
+    def report_empty_result(self, alert: EmptyResultAlert):
+        """Ставит алерт в очередь. Не блокирует и не выбрасывает исключений при переполнении."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(alert)
+            ALERTS_QUEUED_TOTAL.inc()
+        except asyncio.QueueFull:
+            self._dropped += 1
+            ALERTS_DROPPED_TOTAL.inc()
+
+    def flush(self):
+        """Просит отправить накопленные дайджесты, не дожидаясь интервала."""
+        if self._worker is None or self._worker.done():
+            return
+        try:
+            self._queue.put_nowait(self._FLUSH)
+        except asyncio.QueueFull:
+            # Очередь переполнена - дайджест все равно уйдет по таймеру
+            pass
+
+    async def shutdown(self):
+        """Отправляет накопленные алерты и останавливает фоновую задачу."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        await self._drain_queue()
+        await self._send_digests()
+        if _client is not None:
+            await _client.aclose()
+
+    async def _run(self):
+        next_digest = time.monotonic() + settings.ALERT_DIGEST_INTERVAL
+        while True:
+            try:
+                timeout = max(0.0, next_digest - time.monotonic())
+                item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                item = self._FLUSH
+
+            if item is self._FLUSH:
+                await self._drain_queue()
+                await self._send_digests()
+                next_digest = time.monotonic() + settings.ALERT_DIGEST_INTERVAL
+            else:
+                self._pending[item.prefix].append(item)
+
+    async def _drain_queue(self):
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not self._FLUSH:
+                self._pending[item.prefix].append(item)
+
+    async def _send_digests(self):
+        pending, self._pending = self._pending, defaultdict(list)
+        dropped, self._dropped = self._dropped, 0
+
+        for prefix, alerts in pending.items():
+            await self._send_rate_limited(self._format_digest(prefix, alerts, dropped))
+            dropped = 0
+
+        if dropped:
+            await self._send_rate_limited(
+                f"Результаты исследований offline\n"
+                f"⚠️ Очередь уведомлений переполнена, пропущено алертов: {dropped}"
+            )
+
+    @staticmethod
+    def _format_digest(prefix: str, alerts: list[EmptyResultAlert], dropped: int) -> str:
+        limit = settings.ALERT_DIGEST_MAX_ITEMS
+        lines = [
+            f"👤 {a.patient_name} | 📅 {a.test_date} | 🔬 {a.test_name} | 🆔 {a.result_id}"
+            for a in alerts[:limit]
+        ]
+        if len(alerts) > limit:
+            lines.append(f"... и еще {len(alerts) - limit}")
+        if dropped:
+            lines.append(f"⚠️ Очередь уведомлений переполнялась, пропущено алертов: {dropped}")
+
+        return (
+            f"Результаты исследований offline\n"
+            f"⚠️ <b>Пустые результаты ({prefix}): {len(alerts)}</b>\n"
+            + "\n".join(lines)
+        )
+
+    async def _send_rate_limited(self, message: str):
+        wait = self._last_sent + settings.ALERT_MIN_SEND_INTERVAL - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await send_telegram_message(message)
+        self._last_sent = time.monotonic()
+        ALERT_MESSAGES_SENT_TOTAL.inc()
+
+
+alert_dispatcher = AlertDispatcher()
@@ -1,10 +1,15 @@
+import asyncio
 import json
 import re
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 import htmlmin
 from bs4 import BeautifulSoup
 from datetime import date
 from app.core import get_settings
+from app.core.metrics import HTML_PARSE_DURATION
+from app.core.profiler import profile_stage
 import datetime
 
 settings = get_settings()
@@ -38,7 +43,15 @@ def save_json(filename: str, data: list | dict):
 
 
 async def parse_html_test_result(html_raw: str) -> str:
-    """Очищает HTML-код результата теста от лишних тегов и стилей."""
+    """
+    Очищает HTML-код результата теста от лишних тегов и стилей.
+    Разбор BeautifulSoup и htmlmin выполняется в потоке, чтобы не занимать цикл событий.
+    """
+    with HTML_PARSE_DURATION.time(), profile_stage("html_parse"):
+        return await asyncio.to_thread(_clean_html, html_raw)
+
+
+def _clean_html(html_raw: str) -> str:
     soup = BeautifulSoup(html_raw, "lxml")
 
     # Удаляем ненужные теги
@@ -63,3 +76,114 @@ async def parse_html_test_result(html_raw: str) -> str:
     html_code = re.sub(r"\n\s*\n", "\n", html_code).strip()
     html_code = htmlmin.minify(html_code, remove_empty_space=True)
     return html_code
+
+
+# Ключевые слова заголовков таблиц лабораторных результатов. Порядок важен: "Референсные значения"
+# должно попасть в норму раньше, чем "значение" в результат
+ANALYTE_HEADER_KEYWORDS = (
+    ("reference", ("референс", "норма", "нормы")),
+    ("unit", ("ед.", "ед ", "единиц")),
+    ("analyte", ("наименование", "показатель", "исследование", "параметр", "тест")),
+    ("value", ("результат", "значение")),
+)
+# Число в начале ячейки; "1/3", "2-3", "1:40" числом не считаются
+_VALUE_RE = re.compile(r"^\s*[<>≤≥]?\s*(-?\d+(?:[.,]\d+)?)(?![\d/:.,-])\s*(.*)$")
+# Знак числа - только в начале или после пробела, скобки, знака сравнения или дефиса, чтобы
+# дефис диапазона "3,5-5,5" не стал минусом: "-2,3 - +2,3" -> -2.3 и 2.3
+_NUMBER_RE = re.compile(r"(?:(?<![^\s(<>≤≥-])[-+])?\d+(?:[.,]\d+)?")
+
+
+@dataclass(frozen=True)
+class Analyte:
+    """Показатель из таблицы лабораторного результата."""
+    name: str
+    value_text: str  # значение как в бланке ("5,2", "< 0.1", "отрицательно")
+    value: Optional[float]  # числовое значение, если его удалось разобрать
+    unit: Optional[str]
+    reference: Optional[str]
+    ref_low: Optional[float]
+    ref_high: Optional[float]
+
+
+def extract_analytes(html: str) -> list[Analyte]:
+    """
+    Извлекает показатели (название, значение, единицы, референсный интервал) из таблиц
+    очищенного HTML результата. Учитываются только таблицы, в заголовке которых есть
+    столбцы названия показателя и результата; остальные (шапки бланков, описания) пропускаются.
+    """
+    with profile_stage("analyte_extract"):
+        soup = BeautifulSoup(html, "lxml")
+        analytes = []
+        for table in soup.find_all("table"):
+            # Вложенные таблицы разбираются сами по себе
+            if table.find("table"):
+                continue
+            analytes.extend(_table_analytes(table))
+        return analytes
+
+
+def _table_analytes(table) -> list[Analyte]:
+    columns = None
+    analytes = []
+    for row in table.find_all("tr"):
+        cells = [" ".join(cell.get_text(" ", strip=True).split()) for cell in row.find_all(["td", "th"])]
+        if not any(cells):
+            continue
+        if columns is None:
+            # Строки до заголовка (название бланка и т.п.) пропускаем
+            columns = _match_header(cells)
+            continue
+
+        analyte = _row_analyte(cells, columns)
+        if analyte:
+            analytes.append(analyte)
+    return analytes
+
+
+def _match_header(cells: list[str]) -> Optional[dict[str, int]]:
+    columns = {}
+    for index, cell in enumerate(cells):
+        text = cell.lower() + " "
+        for field, keywords in ANALYTE_HEADER_KEYWORDS:
+            if field not in columns and any(keyword in text for keyword in keywords):
+                columns[field] = index
+                break
+    return columns if "analyte" in columns and "value" in columns else None
+
+
+def _row_analyte(cells: list[str], columns: dict[str, int]) -> Optional[Analyte]:
+    def cell(field: str) -> Optional[str]:
+        index = columns.get(field)
+        return cells[index] or None if index is not None and index < len(cells) else None
+
+    name, value_text = cell("analyte"), cell("value")
+    if not name or not value_text:
+        return None
+
+    value, unit = None, cell("unit")
+    match = _VALUE_RE.match(value_text)
+    if match:
+        value = float(match.group(1).replace(",", "."))
+        # Единицы в одной ячейке со значением: "5,2 ммоль/л"
+        unit = unit or match.group(2) or None
+
+    reference = cell("reference")
+    ref_low, ref_high = _parse_reference(reference)
+    return Analyte(name, value_text, value, unit, reference, ref_low, ref_high)
+
+
+def _parse_reference(reference: Optional[str]) -> tuple[Optional[float], Optional[float]]:
+    """Границы нормы: "3,5 - 5,0" -> (3.5, 5.0), "< 5" / "до 5" -> (None, 5), "> 1" / "от 1" -> (1, None)."""
+    if not reference:
+        return None, None
+
+    numbers = [float(number.replace(",", ".")) for number in _NUMBER_RE.findall(reference)]
+    text = reference.strip().lower()
+    if len(numbers) >= 2:
+        return numbers[0], numbers[1]
+    if len(numbers) == 1:
+        if text.startswith(("<", "≤", "до")):
+            return None, numbers[0]
+        if text.startswith((">", "≥", "от")):
+            return numbers[0], None
+    return None, None
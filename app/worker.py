@@ -0,0 +1,100 @@
+"""
+Отдельный процесс-воркер очереди сбора (COLLECTION_MODE=queue).
+Запуск: python -m app.worker
+Можно запускать сколько угодно копий: единицы работы разбираются через FOR UPDATE SKIP LOCKED.
+"""
+import asyncio
+import os
+import signal
+import socket
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import logger, get_settings
+from app.core.database import engine
+from app.core.client import create_background_gateway_client
+from app.service import GatewayService
+from app.service.collector.process import collect_by_day
+from app.service.utils.telegram import alert_dispatcher
+from app.service.collector.work_queue import (
+    ClaimedUnit, claim_unit, extend_lease, complete_unit, fail_unit
+)
+
+settings = get_settings()
+
+
+async def _keep_lease(unit: ClaimedUnit, worker_id: str):
+    """Продлевает аренду единицы, пока идет ее обработка."""
+    while True:
+        await asyncio.sleep(settings.QUEUE_LEASE_SECONDS / 3)
+        try:
+            async with AsyncSession(engine) as session:
+                if not await extend_lease(session, unit.id, worker_id):
+                    logger.warning(f"[Воркер] Аренда единицы {unit.id} потеряна: ее обрабатывает другой воркер")
+                    return
+        except Exception as e:
+            logger.warning(f"[Воркер] Не удалось продлить аренду единицы {unit.id}: {e}")
+
+
+async def _process_unit(unit: ClaimedUnit, worker_id: str, gateway_service: GatewayService):
+    if unit.attempts > unit.max_attempts:
+        # Единицу уже много раз забирали воркеры, которые не смогли ее завершить (падение процесса)
+        async with AsyncSession(engine) as session:
+            await fail_unit(session, unit, worker_id, "Превышено число попыток: аренда истекала без завершения")
+        return
+
+    period = unit.day.strftime("%d.%m.%Y")
+    logger.info(f"[Воркер {worker_id}] Обработка {period} / {unit.prefix} (попытка {unit.attempts})")
+
+    lease_task = asyncio.create_task(_keep_lease(unit, worker_id))
+    try:
+        async with AsyncSession(engine) as session:
+            await collect_by_day(period, gateway_service, session, prefixes=[unit.prefix])
+    except Exception as e:
+        error = getattr(e, "detail", None) or str(e)
+        async with AsyncSession(engine) as session:
+            await fail_unit(session, unit, worker_id, str(error))
+    else:
+        async with AsyncSession(engine) as session:
+            await complete_unit(session, unit.id, worker_id)
+    finally:
+        lease_task.cancel()
+
+
+async def run_worker():
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    logger.info(f"[Воркер {worker_id}] Запущен. Ожидание единиц работы.")
+
+    async with create_background_gateway_client() as client:
+        gateway_service = GatewayService(client=client)
+
+        while not stop_event.is_set():
+            try:
+                async with AsyncSession(engine) as session:
+                    unit = await claim_unit(session, worker_id)
+            except Exception as e:
+                logger.error(f"[Воркер {worker_id}] Ошибка получения единицы из очереди: {e}", exc_info=True)
+                unit = None
+
+            if unit is None:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=settings.QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await _process_unit(unit, worker_id, gateway_service)
+
+    await alert_dispatcher.shutdown()
+    await engine.dispose()
+    logger.info(f"[Воркер {worker_id}] Остановлен.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1 @@
+"""Бенчмарки горячих путей сборщика и хранилища (python -m benchmarks.run)."""
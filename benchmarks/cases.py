@@ -0,0 +1,177 @@
+"""
+Сценарии бенчмарков. CPU-сценарии не требуют БД; DB-сценарии работают с локальной Postgres
+из настроек приложения и пишут только синтетические записи (person_id с префиксом bench-).
+"""
+import datetime
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import engine
+from app.core.encryption import EncryptedString
+from app.model import RequestByPatient
+from app.service import sanitize_data, parse_html_test_result
+from app.service.collector.tools import validate_records, process_and_save_in_batches, full_audit_dbase
+from app.service.dbase.find_patient import find_records_by_patient
+from app.service.dbase.partitions import ensure_partitions
+from app.service.dbase.stats import subtract_stats
+from app.service.utils.utils import extract_analytes
+from benchmarks import synthetic
+
+CPU_THRESHOLD = 0.15
+# Запросы к БД шумнее, допуск шире
+DB_THRESHOLD = 0.30
+
+INSERT_RECORDS = 2000
+INSERT_BATCH_SIZES = (100, 500, 1000, 2000)
+PATIENT_SIZES = (10, 100, 1000)
+BACKGROUND_RECORDS = 5000
+BENCH_WHERE = f"person_id LIKE '{synthetic.BENCH_PERSON_PREFIX}%'"
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], Any]  # один прогон; может быть корутинной функцией
+    ops: int  # операций за прогон, для времени на операцию
+    threshold: float = CPU_THRESHOLD  # допустимое замедление относительно базовой линии
+    setup: Optional[Callable[[], Awaitable[None]]] = None  # перед каждым прогоном, не замеряется
+
+
+def _load_html_dir(html_dir: Path) -> dict[str, list[str]]:
+    samples = [path.read_text(encoding="utf-8") for path in sorted(html_dir.glob("*.html"))]
+    if not samples:
+        raise SystemExit(f"В {html_dir} нет файлов *.html")
+    return {"samples": samples}
+
+
+def cpu_cases(html_dir: Optional[Path] = None) -> list[Case]:
+    rng = synthetic.make_rng()
+    corpus = _load_html_dir(html_dir) if html_dir else synthetic.html_corpus(rng)
+    cases = []
+
+    rows = synthetic.gateway_rows(rng, 1000)
+    cases.append(Case("sanitize_data[1000]", lambda: sanitize_data(rows), len(rows)))
+
+    for label, htmls in corpus.items():
+        async def parse_all(htmls=htmls):
+            for html in htmls:
+                await parse_html_test_result(html)
+        cases.append(Case(f"parse_html_test_result[{label}]", parse_all, len(htmls)))
+
+    stored_htmls = [synthetic.lab_html(rng, 20, styled=False) for _ in range(200)]
+    cases.append(Case(
+        "extract_analytes[200]", lambda: [extract_analytes(html) for html in stored_htmls], len(stored_htmls)
+    ))
+
+    encryptor = EncryptedString()
+    ciphertexts = [encryptor.process_bind_param(html, None) for html in stored_htmls]
+    cases.append(Case(
+        "encrypted_string.bind[200]",
+        lambda: [encryptor.process_bind_param(html, None) for html in stored_htmls],
+        len(stored_htmls),
+    ))
+    cases.append(Case(
+        "encrypted_string.result[200]",
+        lambda: [encryptor.process_result_value(value, None) for value in ciphertexts],
+        len(ciphertexts),
+    ))
+
+    records = synthetic.result_records(rng, 1000, synthetic.make_patient(rng, 0))
+    cases.append(Case("validate_records[1000]", lambda: validate_records(records), len(records)))
+    return cases
+
+
+async def cleanup_db():
+    """Удаляет синтетические записи, их показатели и их вклад в сводку."""
+    async with engine.begin() as conn:
+        await subtract_stats(conn, BENCH_WHERE, {})
+        await conn.execute(text(
+            f"DELETE FROM test_result_analytes WHERE result_id IN (SELECT id FROM test_results WHERE {BENCH_WHERE})"
+        ))
+        await conn.execute(text(f"DELETE FROM test_results WHERE {BENCH_WHERE}"))
+
+
+async def check_db_is_disposable():
+    """Бенчмарк аудита читает всю таблицу, поэтому база должна содержать только синтетические записи."""
+    async with engine.connect() as conn:
+        has_foreign_rows = (await conn.execute(text(
+            f"SELECT EXISTS (SELECT 1 FROM test_results WHERE NOT ({BENCH_WHERE}))"
+        ))).scalar()
+    if has_foreign_rows:
+        raise SystemExit(
+            "В test_results есть несинтетические записи. DB-бенчмарки запускаются только на отдельной "
+            "локальной базе (или с --force, если это осознанно)."
+        )
+
+
+async def _insert(records: list[dict], batch_size: int = 1000):
+    async with AsyncSession(engine) as session:
+        await process_and_save_in_batches(validate_records(records), session, batch_size)
+        await session.commit()
+
+
+async def seed_db():
+    """Пациенты с PATIENT_SIZES записями плюс фоновые записи - данные для аудита и поиска."""
+    rng = synthetic.make_rng()
+    await ensure_partitions(datetime.date(2025, 1, 1), datetime.date(2025, 12, 31))
+    await cleanup_db()
+
+    offset = 0
+    for index, size in enumerate((*PATIENT_SIZES, BACKGROUND_RECORDS)):
+        patient = synthetic.make_patient(rng, index)
+        await _insert(synthetic.result_records(rng, size, patient, id_offset=offset))
+        offset += size
+
+
+def db_cases() -> list[Case]:
+    rng = synthetic.make_rng()
+    cases = []
+
+    validated = validate_records(synthetic.result_records(rng, INSERT_RECORDS, synthetic.make_patient(rng, 0)))
+    for batch_size in INSERT_BATCH_SIZES:
+        async def insert_batches(batch_size=batch_size):
+            async with AsyncSession(engine) as session:
+                await process_and_save_in_batches(validated, session, batch_size)
+                await session.commit()
+        cases.append(Case(
+            f"process_and_save_in_batches[{INSERT_RECORDS}, batch={batch_size}]",
+            insert_batches, len(validated), DB_THRESHOLD, setup=cleanup_db,
+        ))
+
+    # Данные аудита и поиска создаются один раз, перед первым из этих сценариев
+    seeded = False
+
+    async def ensure_seeded():
+        nonlocal seeded
+        if not seeded:
+            await seed_db()
+            seeded = True
+
+    total_records = sum(PATIENT_SIZES) + BACKGROUND_RECORDS
+    cases.append(Case(
+        f"full_audit_dbase[{total_records}]", lambda: full_audit_dbase(batch_size=1000),
+        total_records, DB_THRESHOLD, setup=ensure_seeded,
+    ))
+
+    seed_rng = synthetic.make_rng()
+    for index, size in enumerate(PATIENT_SIZES):
+        patient = synthetic.make_patient(seed_rng, index)
+        # Продвигаем генератор так же, как seed_db, чтобы получить тех же пациентов
+        synthetic.result_records(seed_rng, size, patient)
+        request = RequestByPatient(
+            last_name=patient["last_name"],
+            first_name=patient["first_name"],
+            middle_name=patient["middle_name"],
+            birthday=patient["birthday"].strftime("%d.%m.%Y"),
+        )
+
+        async def find(request=request):
+            async with AsyncSession(engine) as session:
+                await find_records_by_patient(request, session)
+        cases.append(Case(f"find_records_by_patient[{size}]", find, 1, DB_THRESHOLD, setup=ensure_seeded))
+
+    return cases
@@ -0,0 +1,167 @@
+"""
+Запуск бенчмарков горячих путей сборщика и хранилища.
+
+    python -m benchmarks.run                     # CPU-сценарии, сравнение с benchmarks/baseline.json
+    python -m benchmarks.run --db                # плюс сценарии с БД (только локальная отдельная база!)
+    python -m benchmarks.run --save-baseline     # сохранить результат как новую базовую линию
+    python -m benchmarks.run -k parse_html       # только сценарии, в имени которых есть подстрока
+
+Результаты пишутся в benchmarks/results/<время>.json. Если есть базовая линия, медиана каждого
+сценария сравнивается с ней; замедление больше порога сценария - регрессия (код выхода 1).
+Базовую линию имеет смысл сравнивать только с прогоном на той же машине.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.core import logger
+from benchmarks.cases import Case, cpu_cases, db_cases, check_db_is_disposable, cleanup_db
+
+BENCH_DIR = Path(__file__).parent
+RESULTS_DIR = BENCH_DIR / "results"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарки medical_tests_offline")
+    parser.add_argument("--db", action="store_true", help="запускать сценарии с БД")
+    parser.add_argument("--force", action="store_true", help="не проверять, что база содержит только синтетику")
+    parser.add_argument("-k", dest="filter", default=None, help="подстрока имени сценария")
+    parser.add_argument("--repeat", type=int, default=7, help="замеряемых прогонов на сценарий")
+    parser.add_argument("--warmup", type=int, default=1, help="прогонов на прогрев (не учитываются)")
+    parser.add_argument("--html-dir", type=Path, default=None, help="каталог с реальными HTML (*.html) вместо синтетики")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="файл базовой линии")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результат как базовую линию")
+    return parser.parse_args()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=BENCH_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _measure(case: Case, repeat: int, warmup: int) -> dict:
+    samples = []
+    for i in range(warmup + repeat):
+        if case.setup:
+            await case.setup()
+        gc.collect()
+
+        start_time = time.perf_counter()
+        result = case.run()
+        if inspect.isawaitable(result):
+            await result
+        elapsed = time.perf_counter() - start_time
+
+        if i >= warmup:
+            samples.append(elapsed)
+
+    median = statistics.median(samples)
+    return {
+        "median": median,
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "ops": case.ops,
+        "per_op_us": median / case.ops * 1e6,
+        "threshold": case.threshold,
+    }
+
+
+def _compare(results: dict, baseline: dict) -> list[str]:
+    """Печатает сравнение с базовой линией и возвращает имена сценариев с регрессией."""
+    if baseline["meta"].get("machine") != results["meta"]["machine"]:
+        print("ВНИМАНИЕ: базовая линия снята на другой машине/версии Python, сравнение ориентировочное.")
+
+    regressions = []
+    print(f"\n{'сценарий':<55} {'база, мс':>10} {'сейчас, мс':>11} {'изм.':>8}")
+    for name, current in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if previous is None:
+            print(f"{name:<55} {'-':>10} {current['median'] * 1e3:>11.2f} {'новый':>8}")
+            continue
+
+        ratio = current["median"] / previous["median"]
+        mark = ""
+        if ratio > 1 + current["threshold"]:
+            regressions.append(name)
+            mark = "  РЕГРЕССИЯ"
+        print(
+            f"{name:<55} {previous['median'] * 1e3:>10.2f} {current['median'] * 1e3:>11.2f} "
+            f"{(ratio - 1) * 100:>+7.1f}%{mark}"
+        )
+    return regressions
+
+
+async def main() -> int:
+    args = _parse_args()
+    # Логи приложения (валидация, пакеты) искажают замеры и засоряют вывод
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    cases = cpu_cases(args.html_dir)
+    if args.db:
+        if not args.force:
+            await check_db_is_disposable()
+        cases += db_cases()
+    if args.filter:
+        cases = [case for case in cases if args.filter in case.name]
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "machine": f"{platform.node()} {platform.machine()} Python {platform.python_version()}",
+            "repeat": args.repeat,
+            "db": args.db,
+        },
+        "cases": {},
+    }
+
+    try:
+        for case in cases:
+            stats = await _measure(case, args.repeat, args.warmup)
+            results["cases"][case.name] = stats
+            print(f"{case.name:<55} {stats['median'] * 1e3:>10.2f} мс  {stats['per_op_us']:>10.1f} мкс/оп")
+    finally:
+        if args.db:
+            await cleanup_db()
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = RESULTS_DIR / f"{datetime.datetime.now():%Y-%m-%d_%H-%M-%S}.json"
+    result_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nРезультаты: {result_path}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Базовая линия сохранена: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Базовой линии {args.baseline} нет, сравнение пропущено (создайте ее флагом --save-baseline).")
+        return 0
+
+    regressions = _compare(results, json.loads(args.baseline.read_text(encoding="utf-8")))
+    if regressions:
+        print(f"\nРегрессии: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
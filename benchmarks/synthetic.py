@@ -0,0 +1,176 @@
+"""
+Детерминированные синтетические данные для бенчмарков: строки поиска шлюза, HTML результатов
+в стиле EvnXml и записи test_results. Одинаковый seed дает одинаковые данные при каждом запуске.
+"""
+import datetime
+import random
+
+SEED = 20250101
+# Маркер синтетических записей в БД: по нему бенчмарк удаляет за собой данные
+BENCH_PERSON_PREFIX = "bench-"
+
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнов", "Попов", "Васильев", "Соколов", "Михайлов"]
+FIRST_NAMES = ["Александр", "Сергей", "Дмитрий", "Андрей", "Алексей", "Иван", "Михаил", "Николай", "Павел"]
+MIDDLE_NAMES = ["Александрович", "Сергеевич", "Дмитриевич", "Андреевич", "Иванович", "Петрович", ""]
+SERVICES = ["Клинико-диагностическая лаборатория", "Биохимическая лаборатория", "Отделение УЗИ"]
+ANALYZERS = ["Sysmex XN-1000", "Beckman AU480", "Mindray BC-6800", None]
+
+# (показатель, единицы, нижняя граница нормы, верхняя граница нормы)
+ANALYTES = [
+    ("Гемоглобин", "г/л", 120, 160),
+    ("Эритроциты", "10^12/л", 3.8, 5.1),
+    ("Лейкоциты", "10^9/л", 4.0, 9.0),
+    ("Тромбоциты", "10^9/л", 150, 400),
+    ("Гематокрит", "%", 36, 48),
+    ("СОЭ", "мм/ч", 2, 15),
+    ("Глюкоза", "ммоль/л", 3.3, 5.5),
+    ("Креатинин", "мкмоль/л", 62, 106),
+    ("Мочевина", "ммоль/л", 2.5, 8.3),
+    ("АЛТ", "Ед/л", 0, 41),
+    ("АСТ", "Ед/л", 0, 37),
+    ("Билирубин общий", "мкмоль/л", 3.4, 20.5),
+    ("Холестерин общий", "ммоль/л", 3.0, 5.2),
+    ("С-реактивный белок", "мг/л", 0, 5),
+]
+
+REPORT_SENTENCES = [
+    "Печень не увеличена, контуры ровные, четкие, эхоструктура однородная.",
+    "Желчный пузырь обычной формы, стенки не утолщены, конкрементов не выявлено.",
+    "Поджелудочная железа визуализируется удовлетворительно, эхогенность умеренно повышена.",
+    "Селезенка не увеличена, структура однородная.",
+    "Почки расположены типично, размеры в пределах нормы, чашечно-лоханочная система не расширена.",
+    "Свободной жидкости в брюшной полости не выявлено.",
+]
+
+
+def make_rng(seed: int = SEED) -> random.Random:
+    return random.Random(seed)
+
+
+def _date_str(day: datetime.date) -> str:
+    return day.strftime("%d.%m.%Y")
+
+
+def make_patient(rng: random.Random, index: int) -> dict:
+    """Синтетический пациент; номер в фамилии делает пациентов различимыми при поиске."""
+    return {
+        "person_id": f"{BENCH_PERSON_PREFIX}{index}",
+        "last_name": f"{rng.choice(LAST_NAMES)}-{index}",
+        "first_name": rng.choice(FIRST_NAMES),
+        "middle_name": rng.choice(MIDDLE_NAMES),
+        "birthday": datetime.date(1940, 1, 1) + datetime.timedelta(days=rng.randrange(25000)),
+    }
+
+
+def gateway_rows(rng: random.Random, count: int) -> list[dict]:
+    """Строки страницы поиска шлюза (вход sanitize_data); у ~10% нет EvnXml_id."""
+    rows = []
+    for i in range(count):
+        patient = make_patient(rng, i)
+        test_day = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+        rows.append({
+            "EvnXml_id": None if rng.random() < 0.1 else str(900000000 + i),
+            "Person_id": patient["person_id"],
+            "Person_Surname": patient["last_name"].upper(),
+            "Person_Firname": patient["first_name"].upper(),
+            "Person_Secname": patient["middle_name"].upper() or None,
+            "Person_Birthday": _date_str(patient["birthday"]),
+            "EvnUslugaPar_id": str(800000000 + i),
+            "prefix": "tests",
+            "MedService_Name": rng.choice(SERVICES),
+            "Resource_Name": rng.choice(ANALYZERS),
+            "EvnUslugaPar_setDate": _date_str(test_day),
+            "Usluga_Name": "Общий (клинический) анализ крови развернутый",
+            "Usluga_Code": f"B03.016.{rng.randrange(1, 20):03d}",
+        })
+    return rows
+
+
+def _analyte_rows(rng: random.Random, count: int, styled: bool) -> str:
+    cell = '<td style="border:1px solid #000;padding:2px 4px" class="cell">' if styled else "<td>"
+    rows = []
+    for i in range(count):
+        name, unit, low, high = ANALYTES[i % len(ANALYTES)]
+        value = round(rng.uniform(low * 0.7, high * 1.3), 1)
+        value_text = str(value).replace(".", ",")
+        if styled:
+            value_text = f'<span style="font-weight:bold">{value_text}</span>'
+        rows.append(
+            f"<tr>{cell}{name}</td>{cell}{value_text}</td>{cell}{unit}</td>{cell}{low} - {high}</td></tr>"
+        )
+    return "".join(rows)
+
+
+def lab_html(rng: random.Random, analytes: int, styled: bool = True) -> str:
+    """
+    Лабораторный бланк. styled=True - сырой ответ шлюза (стили, скрипты, служебные div),
+    styled=False - компактный HTML, как он хранится после parse_html_test_result.
+    """
+    header = (
+        "<tr><th>Наименование теста</th><th>Результат</th><th>Ед. изм.</th><th>Референсные значения</th></tr>"
+    )
+    table = f"<table>{header}{_analyte_rows(rng, analytes, styled)}</table>"
+    if not styled:
+        return f"<p>ОБЩИЙ АНАЛИЗ КРОВИ</p>{table}<p>Врач КДЛ: Петрова А.А.</p>"
+
+    styled_table = table.replace("<table>", '<table style="border-collapse:collapse" class="data">')
+    return (
+        "<html><head><meta charset=\"utf-8\"><style>.cell{font-family:Arial;font-size:10pt}</style>"
+        "<script>function init(){return 0;}</script></head><body>"
+        '<div class="template-block" style="margin:0 auto;width:180mm">'
+        '<div class="parametervalue" id="param_1">ЛПУ</div>'
+        '<div><span style="font-size:12pt;font-weight:bold">ОБЩИЙ АНАЛИЗ КРОВИ</span></div>'
+        f'<div style="margin-top:4px">{styled_table}</div>'
+        '<div class="combobox-parameter"><div class="input-area">выбор</div></div>'
+        '<form action="#"><input type="hidden" name="x"></form>'
+        '<div><span>Врач КДЛ: Петрова А.А.</span></div>'
+        "</div></body></html>"
+    )
+
+
+def report_html(rng: random.Random, paragraphs: int) -> str:
+    """Текстовое заключение (УЗИ, рентген) без таблицы показателей, сырой ответ шлюза."""
+    body = "".join(
+        f'<p style="text-align:justify"><span style="font-size:11pt">{rng.choice(REPORT_SENTENCES)}</span></p>'
+        for _ in range(paragraphs)
+    )
+    return (
+        "<html><head><style>p{margin:0}</style></head><body>"
+        f'<div class="template-block"><div><span>ПРОТОКОЛ ИССЛЕДОВАНИЯ</span></div>{body}'
+        "<div><span>Заключение: эхопризнаков патологии не выявлено.</span></div></div></body></html>"
+    )
+
+
+def html_corpus(rng: random.Random) -> dict[str, list[str]]:
+    """Набор HTML результатов по размерам: короткий бланк, развернутый бланк, текстовое заключение."""
+    return {
+        "lab_small": [lab_html(rng, 6) for _ in range(50)],
+        "lab_large": [lab_html(rng, 40) for _ in range(20)],
+        "report": [report_html(rng, 12) for _ in range(50)],
+    }
+
+
+def result_records(
+        rng: random.Random,
+        count: int,
+        patient: dict,
+        id_offset: int = 0,
+        start_day: datetime.date = datetime.date(2025, 1, 1)
+) -> list[dict]:
+    """Записи test_results пациента (вход validate_records), каждые ~10% - без результата."""
+    records = []
+    for i in range(count):
+        is_result = rng.random() >= 0.1
+        records.append({
+            **patient,
+            "test_id": f"{BENCH_PERSON_PREFIX}{id_offset + i}",
+            "prefix": "tests",
+            "test_date": start_day + datetime.timedelta(days=rng.randrange(365)),
+            "service": rng.choice(SERVICES),
+            "analyzer_name": rng.choice(ANALYZERS),
+            "test_code": f"B03.016.{rng.randrange(1, 20):03d}",
+            "test_name": "Общий (клинический) анализ крови развернутый",
+            "is_result": is_result,
+            "test_result": lab_html(rng, rng.randrange(6, 25), styled=False) if is_result else "Результат пуст",
+        })
+    return records
@@ -0,0 +1,23 @@
+import pytest
+
+from app.service.utils.utils import _parse_reference
+
+
+@pytest.mark.parametrize("reference, expected", [
+    ("120 - 160", (120.0, 160.0)),
+    ("3,3-5,5", (3.3, 5.5)),
+    ("3.5 - 5.0", (3.5, 5.0)),
+    ("-2,3 - +2,3", (-2.3, 2.3)),
+    ("-1 - 5", (-1.0, 5.0)),
+    ("-5--1", (-5.0, -1.0)),
+    ("(-1,5) - 2", (-1.5, 2.0)),
+    ("< 5", (None, 5.0)),
+    ("до 5,5", (None, 5.5)),
+    ("> 1", (1.0, None)),
+    ("от 1", (1.0, None)),
+    ("<-1", (None, -1.0)),
+    ("отрицательно", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_reference(reference, expected):
+    assert _parse_reference(reference) == expected
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Модули, запускаемые как python -m: каждый импортируется в чистом интерпретаторе,
+# чтобы порядок импорта не маскировал циклы между app.core и app.service
+CLI_MODULES = [
+    "app.worker",
+    "app.service.dbase.analytes",
+    "app.service.dbase.archive",
+    "app.service.dbase.bulk_import",
+    "app.service.dbase.dump_bd",
+    "app.service.dbase.partitions",
+    "app.service.dbase.snapshots",
+    "app.service.dbase.stats",
+    "benchmarks.run",
+]
+
+
+@pytest.mark.parametrize("module", CLI_MODULES)
+def test_cli_module_imports(module):
+    result = subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr